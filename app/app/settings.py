@@ -78,15 +78,49 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 
 # Database
-# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+# https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+# The development profile opens a connection per request. The production profile (DB_PROFILE=production) keeps the
+# connections of the WSGI workers open for DB_CONN_MAX_AGE seconds, checked before being reused, and cancels the
+# statements running longer than DB_STATEMENT_TIMEOUT_MS (0 disables it, for the long running commands).
+# DB_POOLER=pgbouncer is for a PgBouncer in transaction pooling mode between the app and PostgreSQL, the pool
+# to use under ASGI, where Django does not reuse connections between requests: server side cursors are disabled and
+# the statement timeout, which PgBouncer does not pass on at connection, is left to the database role
+# (ALTER ROLE ... SET statement_timeout).
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'development')
+DB_POOLER = os.environ.get('DB_POOLER', '')
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'OPTIONS': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 10))},
+    }
+}
+
+if DB_PROFILE == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if DB_POOLER != 'pgbouncer':
+        statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+        DATABASES['default']['OPTIONS']['options'] = f'-c statement_timeout={statement_timeout}'
+
+if DB_POOLER == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; deployments running several processes should use a shared backend, such as memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -142,6 +176,54 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Token lookups kept in memory by core.authentication.CachedTokenAuthentication
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL_SECONDS = 60
+
 SPECTACULAR_SETTINGS = {'COMPONENT_SPLIT_REQUEST': True}
+
+# Geocoding of merchant locations, run in the background by `manage.py geocode_merchants`
+GEOCODER_CLASS = 'geopy.geocoders.Nominatim'
+GEOCODER_OPTIONS = {'user_agent': 'random_user_agent_aec4ea386b27c56'}
+GEOCODER_MIN_DELAY_SECONDS = 1  # Nominatim usage policy: at most 1 request per second
+GEOCODER_ERROR_WAIT_SECONDS = 5
+GEOCODER_JOB_LEASE_SECONDS = 10 * 60  # time a worker has to geocode a batch before other workers claim it
+
+# Payment card recommendations: a card earning points_multiplier points per dollar is ranked as
+# points_multiplier * REWARDS_POINT_VALUE_PERCENT percent of cashback
+REWARDS_POINT_VALUE_PERCENT = 1
+CARD_RECOMMENDATIONS_TIMEOUT = 60 * 60
+
+# Merchant matching: a name resolves to the merchant at the same location whose name has the most trigrams in common
+# with it, if their similarity (shared trigrams / trigrams of either name) is at least MERCHANT_MATCH_THRESHOLD
+MERCHANT_MATCH_THRESHOLD = 0.5
+MERCHANT_INDEX_CACHE_SIZE = 1000  # users whose index each process keeps in memory
+MERCHANT_INDEX_TIMEOUT = 60 * 60
+
+# Categorization of new transactions: the classifier, trained by `manage.py train_categorizer` on at least
+# CATEGORIZER_MIN_SAMPLES categorized transactions, only assigns categories it predicts with this probability
+CATEGORIZER_MIN_SAMPLES = 20
+CATEGORIZER_MIN_CONFIDENCE = 0.8
+CATEGORIZER_CACHE_SIZE = 1000  # users whose engine each process keeps in memory
+CATEGORIZER_TIMEOUT = 60 * 60
+
+# Currency conversion with the exchange rates loaded by `manage.py load_fx_rates`. Each process keeps the rates of
+# recent (date, currency pair) lookups; a reload is seen by the other processes after FX_RATE_CACHE_TTL_SECONDS
+FX_RATE_CACHE_SIZE = 10000
+FX_RATE_CACHE_TTL_SECONDS = 60 * 60
+
+# Recurring charges: a merchant is charged on a cadence when the user has at least RECURRING_MIN_OCCURRENCES
+# expenses there, and at least RECURRING_MIN_REGULARITY of their intervals fit the cadence and of their amounts are
+# within RECURRING_AMOUNT_TOLERANCE of the median amount
+RECURRING_MIN_OCCURRENCES = 3
+RECURRING_MIN_REGULARITY = 0.75
+RECURRING_AMOUNT_TOLERANCE = 0.2
+
+# Delta sync: the returned watermark lags behind the server clock, to also return the objects saved just before it
+# but committed after; tombstones of deleted objects are kept for SYNC_TOMBSTONE_RETENTION_DAYS
+SYNC_WATERMARK_LAG_SECONDS = 5
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
@@ -29,6 +29,7 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/transaction/', include('transaction.urls')),
+    path('api/async/transaction/', include('transaction.async_urls')),
 ]
 
 if settings.DEBUG:
@@ -47,10 +47,29 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class TransactionAdmin(admin.ModelAdmin):
+    """Define the admin pages for transactions."""
+
+    list_select_related = ['merchant']
+
+
+class CreditCardMerchantCategoryAdmin(admin.ModelAdmin):
+    """Define the admin pages for credit card categories."""
+
+    list_select_related = ['credit_card', 'merchant', 'mcc']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Transaction)
+admin.site.register(models.Transaction, TransactionAdmin)
 admin.site.register(models.TransactionMerchant)
 admin.site.register(models.TransactionUserCategory)
 admin.site.register(models.PaymentCard)
 admin.site.register(models.MerchantCategoryCode)
-admin.site.register(models.CreditCardMerchantCategory)
+admin.site.register(models.ExchangeRate)
+admin.site.register(models.CreditCardMerchantCategory, CreditCardMerchantCategoryAdmin)
+admin.site.register(models.GeocodedAddress)
+admin.site.register(models.GeocodeJob)
+admin.site.register(models.CategorizationRule)
+admin.site.register(models.CategoryClassifier)
+admin.site.register(models.RecurringSeries)
+admin.site.register(models.Budget)
@@ -0,0 +1,107 @@
+"""
+Token authentication with an in-process cache of the token lookups.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Thread safe LRU cache of token key -> (user, token), whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the (user, token) of key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user, token = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user, token
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        """Drop the entries of a user, after a change that may invalidate their tokens."""
+        with self._lock:
+            for key in [key for key, (_, user, _) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_AUTH_CACHE_SIZE, settings.TOKEN_AUTH_CACHE_TTL_SECONDS)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication skipping the token and user query for the tokens seen recently.
+
+    The signal receivers drop an entry when its token is deleted or its user saved, which covers deactivations and
+    password changes made by this process. Other processes see them once the entry expires, after at most
+    TOKEN_AUTH_CACHE_TTL_SECONDS.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+            cached = user, token
+
+        user, token = cached
+        # Each request gets its own copy of the user, which views may change
+        return copy.copy(user), token
+
+
+async def aauthenticate(request):
+    """Return the (user, token) of the token in the Authorization header of a Django request, or None.
+
+    The async counterpart of CachedTokenAuthentication, for the async views: the token cache is read first, the
+    database with one async query otherwise. A missing, unknown or inactive token returns None.
+    """
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != CachedTokenAuthentication.keyword.lower().encode():
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+
+    cached = token_cache.get(key)
+    if cached is None:
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            return None
+        cached = token.user, token
+        token_cache.set(key, *cached)
+
+    user, token = cached
+    if not user.is_active:
+        return None
+    return copy.copy(user), token
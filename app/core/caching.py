@@ -0,0 +1,95 @@
+"""
+Per-process caches of objects built from the data of a user, such as indexes, and of reference data.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+
+
+class VersionedLocalCache:
+    """LRU cache of one object per user kept in the memory of each process, versioned in the shared cache.
+
+    The shared cache holds a version stamp per user, which invalidate() changes: get() costs one read of the stamp,
+    and builds the object again only when another process, or this one, changed it. The object itself is never
+    pickled, so large indexes are as cheap to read as small ones. Objects returned by get() must not be modified.
+    """
+
+    def __init__(self, name, build, maxsize, timeout):
+        self.name = name
+        self.build = build
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()  # user id -> (version, object), the most recently used last
+        self._lock = threading.Lock()
+
+    def version_key(self, user_id):
+        return f'{self.name}-version:{user_id}'
+
+    def get(self, user_id):
+        """Return the object of the user, built again when it was invalidated since."""
+        version = cache.get(self.version_key(user_id))
+        with self._lock:
+            if (entry := self._entries.get(user_id)) and version is not None and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(self.version_key(user_id), version, self.timeout)
+        value = self.build(user_id)
+        with self._lock:
+            self._entries[user_id] = (version, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def _new_version(self, user_id):
+        cache.set(self.version_key(user_id), uuid.uuid4().hex, self.timeout)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate(self, user_id):
+        """Make every process build the object of the user again on its next read, after its data changed.
+
+        Done again on commit, in case a process read the data before the change was committed.
+        """
+        self._new_version(user_id)
+        db_transaction.on_commit(lambda: self._new_version(user_id))
+
+
+class ExpiringLRUCache:
+    """Thread safe LRU cache kept in the memory of each process, whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expiry, value), the most recently used last
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value of key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,184 @@
+"""
+Categorization of transactions: the default category of the merchant, then the rules of the user, then a naive Bayes
+classifier trained on the transactions the user categorized.
+
+The engine of a user is built once per process, compiling the rules, and kept until a merchant, rule or category of
+the user changes or the classifier is trained again: categorizing a transaction is then a dictionary lookup, a pass
+over the compiled rules and a few lookups in the classifier, whatever the size of the history.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models.functions import Now
+
+from core.caching import VersionedLocalCache
+from core.models import Transaction, TransactionMerchant, TransactionUserCategory, CategorizationRule, \
+    CategoryClassifier, MonthlySpendRollup, CollectionVersion
+
+BATCH_SIZE = 5000
+
+_WORD = re.compile(r'[^\W\d_]{2,}')
+
+
+def features(merchant_id, merchant_name, details):
+    """Return the classifier features of a transaction: its merchant and the words of the merchant name and details."""
+    words = set(_WORD.findall(f'{merchant_name} {details}'.lower()))
+    if merchant_id:
+        words.add(f'merchant:{merchant_id}')
+    return words
+
+
+def train(user_id):
+    """Train the classifier of the user on their categorized transactions, read with one query, and save it.
+
+    Return the classifier, or None when the user categorized fewer than CATEGORIZER_MIN_SAMPLES transactions.
+    """
+    documents = Counter()  # category -> transactions
+    counts = defaultdict(Counter)  # category -> feature -> transactions
+    transactions = Transaction.objects.filter(user_id=user_id, user_category__isnull=False, has_children=False) \
+        .values_list('user_category_id', 'merchant_id', 'merchant__name', 'details')
+    for category_id, merchant_id, merchant_name, details in transactions.iterator():
+        documents[category_id] += 1
+        counts[category_id].update(features(merchant_id, merchant_name or '', details))
+
+    samples = sum(documents.values())
+    if samples < settings.CATEGORIZER_MIN_SAMPLES:
+        return None
+
+    # Naive Bayes over the features present, with Laplace smoothing, as log probabilities keyed by category id
+    vocabulary = set().union(*counts.values())
+    totals = {category_id: sum(category_counts.values()) + len(vocabulary)
+              for category_id, category_counts in counts.items()}
+    model = {
+        'priors': {str(category_id): math.log(count / samples) for category_id, count in documents.items()},
+        'unseen': {str(category_id): math.log(1 / total) for category_id, total in totals.items()},
+        'features': defaultdict(dict),
+    }
+    for category_id, category_counts in counts.items():
+        for feature, count in category_counts.items():
+            model['features'][feature][str(category_id)] = math.log((count + 1) / totals[category_id])
+
+    classifier, _ = CategoryClassifier.objects.update_or_create(user_id=user_id,
+                                                                defaults={'model': model, 'samples': samples})
+    invalidate(user_id)
+    return classifier
+
+
+class Classifier:
+    """Trained model of a user, predicting only their existing categories."""
+
+    def __init__(self, model, category_ids):
+        self.priors = {int(category_id): prior for category_id, prior in model['priors'].items()
+                       if int(category_id) in category_ids}
+        self.unseen = {int(category_id): unseen for category_id, unseen in model['unseen'].items()}
+        self.features = {feature: {int(category_id): p for category_id, p in probabilities.items()}
+                         for feature, probabilities in model['features'].items()}
+
+    def predict(self, transaction_features):
+        """Return the most probable category, or None when its probability is below CATEGORIZER_MIN_CONFIDENCE."""
+        known = [self.features[feature] for feature in transaction_features if feature in self.features]
+        if not known or not self.priors:
+            return None
+        scores = {category_id: prior + sum(probabilities.get(category_id, self.unseen[category_id])
+                                           for probabilities in known)
+                  for category_id, prior in self.priors.items()}
+        best = max(scores, key=scores.get)
+        confidence = 1 / sum(math.exp(score - scores[best]) for score in scores.values())
+        return best if confidence >= settings.CATEGORIZER_MIN_CONFIDENCE else None
+
+
+class Categorizer:
+    """Categorization engine of a user."""
+
+    def __init__(self, merchants, rules, classifier=None):
+        self.merchants = merchants  # merchant id -> (default category id, name)
+        self.rules = rules  # (category id, contains, compiled pattern, min amount, max amount), in priority order
+        self.classifier = classifier
+
+    def categorize(self, merchant_id, details, amount):
+        """Return the category id of a transaction, or None."""
+        default_category_id, merchant_name = self.merchants.get(merchant_id, (None, ''))
+        if default_category_id:
+            return default_category_id
+
+        text = f'{merchant_name}\n{details}'.lower()
+        for category_id, contains, pattern, min_amount, max_amount in self.rules:
+            if (contains in text and (pattern is None or pattern.search(text))
+                    and (min_amount is None or amount >= min_amount)
+                    and (max_amount is None or amount <= max_amount)):
+                return category_id
+
+        if self.classifier is not None:
+            return self.classifier.predict(features(merchant_id, merchant_name, details))
+        return None
+
+
+def compile_rule(rule):
+    """Return the compiled conditions of a rule, or None if its pattern is not a valid regular expression."""
+    try:
+        pattern = re.compile(rule.pattern, re.IGNORECASE) if rule.pattern else None
+    except re.error:
+        return None
+    return rule.user_category_id, rule.contains.lower(), pattern, rule.min_amount, rule.max_amount
+
+
+def build_categorizer(user_id):
+    """Return the engine of the user, read with four queries."""
+    merchants = {merchant_id: (category_id, name) for merchant_id, category_id, name in TransactionMerchant.objects
+                 .filter(user_id=user_id).values_list('id', 'default_user_category_id', 'name').iterator()}
+    rules = CategorizationRule.objects.filter(user_id=user_id).order_by('priority', 'id')
+    rules = [compiled for compiled in map(compile_rule, rules) if compiled is not None]
+
+    classifier = None
+    if model := CategoryClassifier.objects.filter(user_id=user_id).values_list('model', flat=True).first():
+        category_ids = set(TransactionUserCategory.objects.filter(user_id=user_id).values_list('id', flat=True))
+        classifier = Classifier(model, category_ids)
+    return Categorizer(merchants, rules, classifier)
+
+
+_categorizers = VersionedLocalCache('categorizer', build_categorizer, settings.CATEGORIZER_CACHE_SIZE,
+                                    settings.CATEGORIZER_TIMEOUT)
+
+
+def get_categorizer(user_id):
+    """Return the engine of the user, built again when their merchants, rules, categories or classifier changed."""
+    return _categorizers.get(user_id)
+
+
+def invalidate(user_id):
+    """Make every process build the engine of the user again on its next read."""
+    _categorizers.invalidate(user_id)
+
+
+def recategorize(user_id, overwrite=False, batch_size=BATCH_SIZE):
+    """Categorize the stored transactions of the user, with one UPDATE per category and batch of transactions.
+
+    Only the uncategorized transactions are categorized, unless overwrite; the split parts keep the categories they
+    were given. Return the number of transactions updated.
+    """
+    categorizer = get_categorizer(user_id)
+    queryset = Transaction.objects.filter(user_id=user_id, parent__isnull=True).order_by('id')
+    if not overwrite:
+        queryset = queryset.filter(user_category__isnull=True)
+
+    updated, last_id = 0, 0
+    with db_transaction.atomic():
+        while batch := list(queryset.filter(id__gt=last_id).values_list(
+                'id', 'merchant_id', 'details', 'amount', 'user_category_id')[:batch_size]):
+            last_id = batch[-1][0]
+            changes = defaultdict(list)
+            for transaction_id, merchant_id, details, amount, category_id in batch:
+                new_category_id = categorizer.categorize(merchant_id, details, amount)
+                if new_category_id is not None and new_category_id != category_id:
+                    changes[new_category_id].append(transaction_id)
+            for category_id, transaction_ids in changes.items():
+                updated += Transaction.objects.filter(id__in=transaction_ids).update(
+                    user_category_id=category_id, updated_at=Now())
+
+        if updated:  # update() skips the signals maintaining the rollups
+            MonthlySpendRollup.objects.rebuild(users=[user_id])
+            CollectionVersion.objects.bump_on_commit(user_id)
+    return updated
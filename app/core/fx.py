@@ -0,0 +1,154 @@
+"""
+Currency conversion with the exchange rates of the European Central Bank, stored per euro and per day.
+
+Reports convert amounts in SQL: the rates of each row are read by correlated subqueries on the (currency, date)
+unique index, so converting a whole report is still one query. Single amounts are converted with rates kept in a
+per-process LRU cache of (date, currency pair) lookups, read with the async ORM by aget_rate() in the async views.
+"""
+import csv
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Value, When
+
+from core.caching import ExpiringLRUCache
+from core.models import ExchangeRate, DatasetVersion
+
+BASE_CURRENCY = 'EUR'
+DATASET_NAME = 'fx-rates'
+BATCH_SIZE = 1000
+CENT = Decimal('0.01')
+
+RATE_FIELD = ExchangeRate._meta.get_field('rate')
+AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=8)
+
+_MISSING = object()
+_rates = ExpiringLRUCache(settings.FX_RATE_CACHE_SIZE, settings.FX_RATE_CACHE_TTL_SECONDS)
+
+
+def _date(value):
+    """Return the date of an ECB file: 2024-01-05 in the history files, 05 January 2024 in the daily ones."""
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%d %B %Y').date()
+
+
+def parse_ecb_csv(text):
+    """Yield the rates of an ECB CSV file: a Date column, then one column of rates per euro for each currency.
+
+    Missing rates, N/A or empty, are skipped. Raise ValueError for a file in another format.
+    """
+    reader = csv.reader(text)
+    header = [column.strip().upper() for column in next(reader, [])]
+    if not header or header[0] != 'DATE':
+        raise ValueError('Expected the ECB CSV format: a Date column, then one column per currency.')
+
+    for line_number, row in enumerate(reader, start=2):
+        if not row or not row[0].strip():
+            continue
+        try:
+            on_date = _date(row[0])
+        except ValueError:
+            raise ValueError(f'Line {line_number}: invalid date "{row[0]}".')
+        for currency, value in zip(header[1:], row[1:]):
+            value = value.strip()
+            if not currency or not value or value.upper() == 'N/A':
+                continue
+            try:
+                rate = Decimal(value)
+            except InvalidOperation:
+                raise ValueError(f'Line {line_number}: invalid {currency} rate "{value}".')
+            yield ExchangeRate(date=on_date, currency=currency, rate=rate)
+
+
+def load_rates(rates, checksum=None):
+    """Insert or update rates, with one upsert per batch, and return their number.
+
+    The checksum of the file they were read from is recorded in the DatasetVersion of the rates.
+    """
+    count = 0
+    with db_transaction.atomic():
+        while batch := list(islice(rates, BATCH_SIZE)):
+            batch = list({(rate.currency, rate.date): rate for rate in batch}.values())  # one upsert per key
+            ExchangeRate.objects.bulk_create(batch, update_conflicts=True, unique_fields=['currency', 'date'],
+                                             update_fields=['rate'])
+            count += len(batch)
+        if checksum:
+            DatasetVersion.objects.update_or_create(name=DATASET_NAME, defaults={'checksum': checksum})
+    _rates.clear()
+    return count
+
+
+def _rate(currency, date_field):
+    """Return the subquery of the latest rate of currency, a code or an OuterRef, on or before the date of a row."""
+    rates = ExchangeRate.objects.filter(currency=currency, date__lte=OuterRef(date_field)).order_by('-date')
+    return Subquery(rates.values('rate')[:1], output_field=RATE_FIELD)
+
+
+def converted(to_currency, amount_field='amount', currency_field='amount_currency', date_field='authorized_date'):
+    """Return the expression of the amount of a row in to_currency, with the latest rates on its date.
+
+    Amounts already in to_currency are kept as is, the others are null when a rate is missing. Rates are per euro,
+    so an amount is divided by the rate of its currency and multiplied by the rate of to_currency.
+    """
+    from_rate = Case(When(**{currency_field: BASE_CURRENCY}, then=Value(Decimal(1))),
+                     default=_rate(OuterRef(currency_field), date_field), output_field=RATE_FIELD)
+    to_rate = Value(Decimal(1)) if to_currency == BASE_CURRENCY else _rate(to_currency, date_field)
+    return Case(
+        When(**{currency_field: to_currency}, then=F(amount_field)),
+        default=ExpressionWrapper(F(amount_field) * to_rate / from_rate, output_field=AMOUNT_FIELD),
+        output_field=AMOUNT_FIELD,
+    )
+
+
+def _latest_rates(from_currency, to_currency, on_date):
+    """Return the query of the (currency, rate) per euro of the currencies on or before a date."""
+    latest = ExchangeRate.objects.filter(currency=OuterRef('currency'), date__lte=on_date).order_by('-date')
+    return ExchangeRate.objects.filter(currency__in={from_currency, to_currency} - {BASE_CURRENCY},
+                                       date=Subquery(latest.values('date')[:1])).values_list('currency', 'rate')
+
+
+def _cross_rate(rates, from_currency, to_currency):
+    """Return the rate converting from_currency to to_currency from their rates per euro, or None."""
+    rates = {**rates, BASE_CURRENCY: Decimal(1)}
+    if from_currency in rates and to_currency in rates:
+        return rates[to_currency] / rates[from_currency]
+    return None
+
+
+def get_rate(from_currency, to_currency, on_date):
+    """Return the rate converting from_currency to to_currency on a date, or None when a rate is missing."""
+    if from_currency == to_currency:
+        return Decimal(1)
+    key = (on_date, from_currency, to_currency)
+    rate = _rates.get(key, _MISSING)
+    if rate is _MISSING:
+        rate = _cross_rate(dict(_latest_rates(from_currency, to_currency, on_date)), from_currency, to_currency)
+        _rates.set(key, rate)
+    return rate
+
+
+async def aget_rate(from_currency, to_currency, on_date):
+    """Async get_rate(), sharing its cache: once awaited, get_rate() and convert() return without a query."""
+    if from_currency == to_currency:
+        return Decimal(1)
+    key = (on_date, from_currency, to_currency)
+    rate = _rates.get(key, _MISSING)
+    if rate is _MISSING:
+        rates = {currency: rate async for currency, rate in _latest_rates(from_currency, to_currency, on_date)}
+        rate = _cross_rate(rates, from_currency, to_currency)
+        _rates.set(key, rate)
+    return rate
+
+
+def convert(amount, from_currency, to_currency, on_date):
+    """Return an amount converted to to_currency with the rates of a date, rounded to the cent, or None."""
+    rate = get_rate(from_currency, to_currency, on_date)
+    if rate is None:
+        return None
+    return (Decimal(amount) * rate).quantize(CENT)
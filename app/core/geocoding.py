@@ -0,0 +1,108 @@
+"""
+Background geocoding of merchant locations.
+
+TransactionMerchant.save() only queues a GeocodeJob; the geocode_merchants command drains the queue in batches,
+resolving each distinct address once through the GeocodedAddress cache and a rate limited geocoder. A batch is
+leased to its worker, so that no transaction stays open while the geocoder is called.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from geopy.exc import GeopyError
+from geopy.extra.rate_limiter import RateLimiter
+
+from core.models import GeocodeJob, GeocodedAddress, TransactionMerchant, CollectionVersion
+
+
+def get_geocode():
+    """Return the geocode function of the configured geocoder, throttled and retrying on service errors."""
+    geocoder = import_string(settings.GEOCODER_CLASS)(**settings.GEOCODER_OPTIONS)
+    return RateLimiter(geocoder.geocode, min_delay_seconds=settings.GEOCODER_MIN_DELAY_SECONDS,
+                       error_wait_seconds=settings.GEOCODER_ERROR_WAIT_SECONDS, swallow_exceptions=False)
+
+
+def claim_jobs(batch_size=50, lease_seconds=None):
+    """Lease a batch of pending jobs to this worker, in a short transaction, and return them.
+
+    Jobs are locked with SKIP LOCKED while claimed, so that several workers can drain the queue concurrently; a job
+    whose worker died is claimed again once its lease expired.
+    """
+    lease_seconds = settings.GEOCODER_JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(GeocodeJob.objects.select_for_update(skip_locked=True)
+                    .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now), status=GeocodeJob.Status.PENDING)
+                    .order_by('id')[:batch_size])
+        GeocodeJob.objects.filter(id__in=[job.id for job in jobs]) \
+            .update(leased_until=now + timedelta(seconds=lease_seconds))
+    return jobs
+
+
+def process_jobs(geocode, batch_size=50, max_attempts=5):
+    """Process one batch of pending jobs and return the number of jobs handled.
+
+    The jobs are claimed, then geocoded with no transaction open: saving a merchant, which queues its job, never
+    waits for the geocoder. The results are written in a second short transaction. Resolved jobs are deleted, failed
+    ones stay pending until they reach max_attempts; a job queued again meanwhile for another address is left for
+    the next batch. Only the merchants still at the address of their job get its coordinates.
+    """
+    jobs = claim_jobs(batch_size)
+    if not jobs:
+        return 0
+
+    merchants_by_address = {}
+    for job in jobs:
+        merchants_by_address.setdefault(job.address, []).append(job.merchant_id)
+
+    cached = GeocodedAddress.objects.in_bulk(merchants_by_address.keys(), field_name='address')
+    errors = {}
+    for address in merchants_by_address.keys() - cached.keys():
+        try:
+            location = geocode(address)
+        except GeopyError as e:
+            errors[address] = str(e) or e.__class__.__name__
+            continue
+        cached[address] = GeocodedAddress(address=address,
+                                          latitude=location.latitude if location else None,
+                                          longitude=location.longitude if location else None)
+
+    with transaction.atomic():
+        GeocodedAddress.objects.bulk_create([entry for entry in cached.values() if entry.pk is None],
+                                            ignore_conflicts=True)
+
+        locations = TransactionMerchant.objects.filter(id__in=[job.merchant_id for job in jobs]) \
+            .values_list('id', 'user_id', 'location')
+        current = {}  # address -> ids of the merchants still at it, moved merchants have another job or none
+        users = set()
+        for merchant_id, user_id, location in locations:
+            address = GeocodedAddress.normalize(location or '')
+            if merchant_id in merchants_by_address.get(address, ()) and address in cached:
+                current.setdefault(address, []).append(merchant_id)
+                users.add(user_id)
+        for address, merchant_ids in current.items():
+            TransactionMerchant.objects.filter(id__in=merchant_ids).update(
+                latitude=cached[address].latitude, longitude=cached[address].longitude, updated_at=Now())
+        for user_id in users:
+            CollectionVersion.objects.bump_on_commit(user_id)  # the spend map of the user changed
+
+        # Each statement only matches the jobs still for the address geocoded
+        for address, merchant_ids in merchants_by_address.items():
+            claimed = GeocodeJob.objects.filter(merchant_id__in=merchant_ids, address=address)
+            if address not in errors:
+                claimed.delete()
+                continue
+            claimed.update(
+                attempts=F('attempts') + 1,
+                last_error=errors[address],
+                status=Case(When(attempts__gte=max_attempts - 1, then=Value(GeocodeJob.Status.FAILED)),
+                            default=F('status')),
+                leased_until=None,
+                updated_at=Now(),
+            )
+
+    return len(jobs)
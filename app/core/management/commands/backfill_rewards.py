@@ -0,0 +1,40 @@
+"""
+Django command to compute the rewards earned by the stored transactions
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from core.models import Transaction, CollectionVersion
+
+BATCH_SIZE = 50000
+
+
+class Command(BaseCommand):
+    """Django command to backfill the cashback and points earned by the transactions."""
+
+    help = 'Compute the cashback and points earned by the transactions from their credit card category'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only backfill the transactions of this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of transaction ids updated per statement')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        queryset = Transaction.objects.order_by('id')
+        if options['users']:
+            queryset = queryset.filter(user__in=options['users'])
+
+        # Update id ranges, so that each statement locks a bounded number of rows
+        count, last_id = 0, 0
+        while ids := list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:options['batch_size']]):
+            count += queryset.filter(id__gte=ids[0], id__lte=ids[-1]).update_rewards()
+            last_id = ids[-1]
+
+        versions = CollectionVersion.objects.all()
+        if options['users']:
+            versions = versions.filter(user__in=options['users'])
+        versions.update(version=F('version') + 1)  # the rewards are in the transaction lists
+
+        self.stdout.write(self.style.SUCCESS(f'Rewards computed for {count} transactions.'))
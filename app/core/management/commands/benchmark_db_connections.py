@@ -0,0 +1,71 @@
+"""
+Django command to measure the connection setup overhead per request with and without persistent connections
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_started, request_finished
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+PROFILES = [
+    ('connection per request', 0, False),
+    ('persistent', 600, False),
+    ('persistent, health checks', 600, True),
+]
+
+
+class Command(BaseCommand):
+    """Django command running the same one query requests with each connection profile of the default database.
+
+    The requests go through the request_started and request_finished signals, which open and close the connections
+    like under a WSGI server, without the cost of the views. Run it with the database settings of the deployment,
+    e.g. DB_HOST pointing at the database server, or at PgBouncer with DB_POOLER=pgbouncer.
+    """
+
+    help = 'Benchmark the time per request spent opening database connections, with and without CONN_MAX_AGE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Number of requests per profile')
+
+    def _run(self, label, max_age, health_checks, requests):
+        """Send the requests with a connection profile and return the mean milliseconds per request."""
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+        opened = []
+
+        def count(sender, **kwargs):
+            opened.append(kwargs['connection'])
+        connection_created.connect(count, dispatch_uid='benchmark_db_connections')
+
+        try:
+            start = time.perf_counter()
+            for _ in range(requests):
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+            elapsed = time.perf_counter() - start
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark_db_connections')
+            connection.close()
+
+        per_request = elapsed * 1000 / requests
+        self.stdout.write(f'{label}: {per_request:.3f} ms per request, {len(opened)} connections opened')
+        return per_request
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        settings_dict = dict(connection.settings_dict)
+        try:
+            times = [self._run(label, max_age, health_checks, options['requests'])
+                     for label, max_age, health_checks in PROFILES]
+        finally:
+            connection.settings_dict.update(settings_dict)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Connection setup costs {times[0] - times[1]:.3f} ms per request, '
+            f'health checks {times[2] - times[1]:.3f} ms.'))
@@ -0,0 +1,51 @@
+"""
+Django command to compare the requests per second of the cached and the plain token authentication
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import CachedTokenAuthentication, token_cache
+from user.views import ManageUserView
+
+
+class Command(BaseCommand):
+    """Django command to benchmark token authentication. All the data is rolled back afterwards."""
+
+    help = 'Benchmark GET /api/user/me/ with TokenAuthentication and CachedTokenAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Number of requests per run')
+
+    def _run(self, authentication_class, token, requests):
+        """Send the requests to the view and return the requests per second."""
+        view = ManageUserView.as_view(authentication_classes=[authentication_class])
+        request = APIRequestFactory().get('/api/user/me/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = view(request)
+            assert response.status_code == 200, response.status_code
+        rate = requests / (time.perf_counter() - start)
+        self.stdout.write(f'{authentication_class.__name__}: {rate:.0f} requests/s')
+        return rate
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with db_transaction.atomic():
+            user = get_user_model().objects.create_user(email='benchmark-auth@example.com', password='benchmark')
+            token = Token.objects.create(user=user)
+            token_cache.clear()
+
+            plain = self._run(TokenAuthentication, token, options['requests'])
+            cached = self._run(CachedTokenAuthentication, token, options['requests'])
+
+            db_transaction.set_rollback(True)
+        token_cache.clear()
+
+        self.stdout.write(self.style.SUCCESS(f'Cached token authentication is {cached / plain:.1f}x faster.'))
@@ -0,0 +1,29 @@
+"""
+Django command to categorize the stored transactions
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.categorization import BATCH_SIZE, recategorize
+
+
+class Command(BaseCommand):
+    """Django command to categorize the stored transactions with the merchant defaults, rules and classifiers."""
+
+    help = 'Categorize the stored transactions with bulk updates, by default only the uncategorized ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only categorize the transactions of this user id (repeatable)')
+        parser.add_argument('--overwrite', action='store_true', help='Also change the categorized transactions')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of transactions categorized per batch')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        users = options['users'] or get_user_model().objects.order_by('id').values_list('id', flat=True)
+
+        updated = sum(recategorize(user_id, overwrite=options['overwrite'], batch_size=options['batch_size'])
+                      for user_id in users)
+
+        self.stdout.write(self.style.SUCCESS(f'Categorized {updated} transactions.'))
@@ -0,0 +1,27 @@
+"""
+Django command to detect the recurring charges of the users
+"""
+from django.core.management.base import BaseCommand
+
+from core import recurring
+
+
+class Command(BaseCommand):
+    """Django command to replace the recurring series of the users with the ones found in their expenses."""
+
+    help = 'Detect recurring charges, such as subscriptions, in the expenses of the users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only analyze the expenses of this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=recurring.USER_BATCH_SIZE,
+                            help='Users analyzed per query')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['users']:
+            found = recurring.detect(options['users'])
+        else:
+            found = recurring.detect_all(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Found {found} recurring series.'))
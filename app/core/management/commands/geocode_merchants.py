@@ -0,0 +1,35 @@
+"""
+Django command to geocode the merchant locations waiting in the geocoding queue
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.geocoding import get_geocode, process_jobs
+
+
+class Command(BaseCommand):
+    """Django command to drain the geocoding queue."""
+
+    help = 'Geocode queued merchant locations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Jobs processed per database transaction')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before a job is marked failed')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        geocode = get_geocode()
+        processed = 0
+        while True:
+            count = process_jobs(geocode, batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+            processed += count
+            if count:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} geocoding jobs processed.'))
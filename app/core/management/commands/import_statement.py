@@ -0,0 +1,44 @@
+"""
+Django command to import the transactions of a bank statement file
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import PaymentCard
+from transaction.importer import LAYOUTS, StatementError, import_statement
+
+
+class Command(BaseCommand):
+    """Django command to import a CSV or OFX/QFX bank statement for a user."""
+
+    help = 'Import the transactions of a CSV or OFX/QFX bank statement, skipping the ones already recorded'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user owning the transactions')
+        parser.add_argument('file', help='Statement file')
+        parser.add_argument('--layout', choices=list(LAYOUTS), help='Layout of a CSV file, detected by default')
+        parser.add_argument('--currency', default='CAD', help='Currency of the amounts without one in the file')
+        parser.add_argument('--payment-card', type=int, help='Id of the payment card of the transactions')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with the email {options["email"]}.')
+        if options['payment_card'] and not PaymentCard.objects.filter(user=user, id=options['payment_card']).exists():
+            raise CommandError(f'The user has no payment card {options["payment_card"]}.')
+
+        try:
+            with open(options['file'], 'rb') as statement_file:
+                result = import_statement(user, statement_file, layout=options['layout'],
+                                          default_currency=options['currency'],
+                                          payment_card_id=options['payment_card'])
+        except StatementError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(self.style.WARNING(f'Row {error["row"]}: {" ".join(error["errors"])}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result["created"]} transactions ({result["duplicates"]} duplicates, '
+            f'{result["error_count"]} invalid rows).'))
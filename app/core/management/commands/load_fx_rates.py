@@ -0,0 +1,33 @@
+"""
+Django command to load exchange rates from a CSV file of the European Central Bank
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import fx
+from core.management.commands.populate_mcc import file_checksum
+from core.models import DatasetVersion
+
+
+class Command(BaseCommand):
+    """Django command to load the exchange rates of an ECB file, such as eurofxref-hist.csv."""
+
+    help = 'Load exchange rates per euro from an ECB CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='ECB CSV file: a Date column, then one column of rates per currency')
+        parser.add_argument('--force', action='store_true', help='Load the file even if it is unchanged')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        checksum = file_checksum(options['file'])
+        if not options['force'] and DatasetVersion.objects.filter(name=fx.DATASET_NAME, checksum=checksum).exists():
+            self.stdout.write(self.style.WARNING('Rates already loaded. Skipping...'))
+            return
+
+        with open(options['file'], newline='', encoding='utf-8-sig') as csv_file:
+            try:
+                count = fx.load_rates(fx.parse_ecb_csv(csv_file), checksum=checksum)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Exchange rates loaded ({count} rates).'))
@@ -2,34 +2,57 @@
 Django command to populate Merchant Category Codes from the mcc.csv to the database
 """
 import csv
-import os
+import hashlib
+from itertools import islice
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from core.models import MerchantCategoryCode
+from django.db import transaction
+
+from core.mcc import DATASET_NAME
+from core.models import MerchantCategoryCode, DatasetVersion
+
+BATCH_SIZE = 1000
+DESCRIPTION_FIELDS = ['edited_description', 'combined_description', 'usda_description', 'irs_description']
+
+
+def file_checksum(path):
+    """Return the SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 class Command(BaseCommand):
     help = 'Populate database with CSV data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.BASE_DIR / 'core' / 'assets' / 'mcc.csv',
+                            help='CSV file with the columns mcc and the four descriptions')
+        parser.add_argument('--force', action='store_true', help='Load the file even if it is unchanged')
+
+    def _rows(self, csv_file):
+        """Yield the merchant category codes of the file, one per row."""
+        for row in csv.DictReader(csv_file):
+            yield MerchantCategoryCode(mcc=int(row['mcc']), **{field: row[field] for field in DESCRIPTION_FIELDS})
+
     def handle(self, *args, **options):
         """Entrypoint for command."""
-        if MerchantCategoryCode.objects.exists():
+        checksum = file_checksum(options['file'])
+        if not options['force'] and DatasetVersion.objects.filter(name=DATASET_NAME, checksum=checksum).exists():
             self.stdout.write(self.style.WARNING('Database already populated. Skipping...'))
+            return
 
-        csv_path = os.path.join(os.getcwd(), 'core/assets/mcc.csv')
-        with open(csv_path) as csv_file:
-            csv_reader = csv.reader(csv_file)
-            next(csv_reader)  # skip header row if exists
-
-            for row in csv_reader:
-                field_mcc = row[0]
-                field_edited_description = row[1]
-                field_combined_description = row[2]
-                field_usda_description = row[3]
-                field_irs_description = row[4]
-
-                MerchantCategoryCode.objects.create(
-                    mcc=field_mcc, edited_description=field_edited_description,
-                    combined_description=field_combined_description, usda_description=field_usda_description,
-                    irs_description=field_irs_description)
+        count = 0
+        with transaction.atomic(), open(options['file'], newline='') as csv_file:
+            rows = self._rows(csv_file)
+            while batch := list(islice(rows, BATCH_SIZE)):
+                batch = list({code.mcc: code for code in batch}.values())  # one upsert per code and statement
+                MerchantCategoryCode.objects.bulk_create(batch, update_conflicts=True, unique_fields=['mcc'],
+                                                         update_fields=DESCRIPTION_FIELDS)
+                count += len(batch)
+            DatasetVersion.objects.update_or_create(name=DATASET_NAME, defaults={'checksum': checksum})
 
-        self.stdout.write(self.style.SUCCESS('Database populated successfully.'))
+        self.stdout.write(self.style.SUCCESS(f'Database populated successfully ({count} codes).'))
@@ -0,0 +1,25 @@
+"""
+Django command to delete the tombstones no longer needed by the syncing clients
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    """Django command to prune the tombstones."""
+
+    help = 'Delete the tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS, and the ones of deleted users'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        count, _ = Tombstone.objects.filter(deleted_at__lt=expired).delete()
+        orphans, _ = Tombstone.objects.exclude(user__in=get_user_model().objects.values('id')).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'{count + orphans} tombstones deleted.'))
@@ -0,0 +1,22 @@
+"""
+Django command to rebuild the monthly spend rollups from the transactions
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import MonthlySpendRollup
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the monthly spend rollups."""
+
+    help = 'Rebuild the monthly spend rollups from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only rebuild the rollups of this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = MonthlySpendRollup.objects.rebuild(users=options['users'])
+
+        self.stdout.write(self.style.SUCCESS(f'{count} monthly rollups rebuilt.'))
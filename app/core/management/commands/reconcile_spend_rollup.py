@@ -0,0 +1,42 @@
+"""
+Django command to check the monthly spend rollups against the transactions
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.models import MonthlySpendRollup
+
+USER_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Django command to compare the monthly spend rollups with a full aggregate of the transactions and fix drift."""
+
+    help = 'Check the monthly spend rollups, read by the budgets, against the transactions and fix the drifted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only check the rollups of this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=USER_BATCH_SIZE,
+                            help='Users checked per query')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the drifted rollups without fixing them')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        drifted = []
+        if options['users']:
+            drifted = MonthlySpendRollup.objects.reconcile(options['users'], fix=not options['dry_run'])
+        else:
+            last_id = 0
+            users = get_user_model().objects.order_by('id').values_list('id', flat=True)
+            while batch := list(users.filter(id__gt=last_id)[:options['batch_size']]):
+                drifted += MonthlySpendRollup.objects.reconcile(batch, fix=not options['dry_run'])
+                last_id = batch[-1]
+
+        for user_id, month, user_category_id, payment_card_id, currency in drifted:
+            self.stdout.write(f'Drift: user {user_id}, {month:%Y-%m}, category {user_category_id}, '
+                              f'card {payment_card_id}, {currency}')
+
+        action = 'found' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{len(drifted)} drifted monthly rollups {action}.'))
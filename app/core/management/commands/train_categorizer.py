@@ -0,0 +1,28 @@
+"""
+Django command to train the classifiers categorizing new transactions
+"""
+from django.core.management.base import BaseCommand
+
+from core.categorization import train
+from core.models import Transaction
+
+
+class Command(BaseCommand):
+    """Django command to train the classifier of each user on their categorized transactions."""
+
+    help = 'Train the classifiers predicting the category of new transactions from the categorized ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only train the classifier of this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        users = options['users']
+        if not users:
+            users = Transaction.objects.filter(user_category__isnull=False).order_by('user_id') \
+                .values_list('user_id', flat=True).distinct()
+
+        trained = sum(train(user_id) is not None for user_id in users)
+
+        self.stdout.write(self.style.SUCCESS(f'Trained {trained} classifiers.'))
@@ -0,0 +1,133 @@
+"""
+In-memory index of the merchant category codes.
+
+The codes are static reference data, reloaded only by the populate_mcc command. Each process loads them once and
+serves lookups and searches from memory; the DatasetVersion row written by populate_mcc is the version stamp that
+tells a process its copy is stale.
+"""
+import re
+import threading
+from bisect import bisect_left
+
+from django.db.models import Count, Max
+
+from core.models import MerchantCategoryCode, DatasetVersion
+
+DATASET_NAME = 'mcc'
+FIELDS = ['id', 'mcc', 'edited_description', 'combined_description', 'usda_description', 'irs_description']
+SEARCH_FIELDS = FIELDS[2:]
+
+_WORD = re.compile(r'\w+')
+
+
+def _words(text):
+    return _WORD.findall(text.lower())
+
+
+class MccIndex:
+    """Immutable snapshot of the merchant category codes with a prefix search over the description words."""
+
+    def __init__(self, version, codes):
+        self.version = version
+        self.codes = codes  # ordered by mcc
+        self.by_mcc = {code['mcc']: code for code in codes}
+        self.by_id = {code['id']: code for code in codes}
+
+        postings = {}
+        for position, code in enumerate(codes):
+            for field in SEARCH_FIELDS:
+                for word in _words(code[field]):
+                    postings.setdefault(word, set()).add(position)
+            postings.setdefault(str(code['mcc']).zfill(4), set()).add(position)
+        self.words = sorted(postings)
+        self.postings = [postings[word] for word in self.words]
+
+    @property
+    def etag(self):
+        return f'"mcc-{self.version}"'
+
+    def _prefix_matches(self, term):
+        """Return the positions of the codes having a word, or code, starting with term."""
+        matches = set()
+        for i in range(bisect_left(self.words, term), len(self.words)):
+            if not self.words[i].startswith(term):
+                break
+            matches |= self.postings[i]
+        return matches
+
+    def search(self, query):
+        """Return the codes matching every word of query, each word being a prefix of a description word or code.
+
+        An empty query returns every code.
+        """
+        matches = None
+        for term in _words(query):
+            term_matches = self._prefix_matches(term)
+            matches = term_matches if matches is None else matches & term_matches
+            if not matches:
+                return []
+        if matches is None:
+            return self.codes
+        return [self.codes[position] for position in sorted(matches)]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def current_version():
+    """Return the version stamp of the codes in the database.
+
+    Codes not loaded by populate_mcc, such as the ones of the tests, are versioned by their count and last id.
+    """
+    stamp = DatasetVersion.objects.filter(name=DATASET_NAME).values_list('checksum', 'updated_at').first()
+    if stamp is None:
+        codes = MerchantCategoryCode.objects.aggregate(count=Count('id'), last_id=Max('id'))
+        return f'{codes["count"]}-{codes["last_id"]}'
+    checksum, updated_at = stamp
+    return f'{checksum[:16]}-{int(updated_at.timestamp() * 1e6)}'
+
+
+async def acurrent_version():
+    """Async current_version(), for the async views."""
+    stamp = await DatasetVersion.objects.filter(name=DATASET_NAME).values_list('checksum', 'updated_at').afirst()
+    if stamp is None:
+        codes = await MerchantCategoryCode.objects.aaggregate(count=Count('id'), last_id=Max('id'))
+        return f'{codes["count"]}-{codes["last_id"]}'
+    checksum, updated_at = stamp
+    return f'{checksum[:16]}-{int(updated_at.timestamp() * 1e6)}'
+
+
+def get_index(check_version=True):
+    """Return the index of the merchant category codes, loading it on first use or when the codes were reloaded.
+
+    Checking the version costs one query on the DatasetVersion table; without check_version, the index loaded
+    last is returned as is.
+    """
+    global _index
+    index = _index
+    if index is not None and not check_version:
+        return index
+
+    version = current_version()
+    if index is not None and index.version == version:
+        return index
+
+    with _lock:
+        if _index is None or _index.version != version:
+            codes = list(MerchantCategoryCode.objects.order_by('mcc').values(*FIELDS))
+            _index = MccIndex(version, codes)
+        return _index
+
+
+async def aget_index():
+    """Async get_index(): the version is checked with an async query, and the codes loaded with the async ORM when
+    the index is stale. Concurrent loads of the same version build equal indexes, the last one is kept.
+    """
+    global _index
+    version = await acurrent_version()
+    index = _index
+    if index is None or index.version != version:
+        codes = [code async for code in MerchantCategoryCode.objects.order_by('mcc').values(*FIELDS)]
+        index = _index = MccIndex(version, codes)
+    return index
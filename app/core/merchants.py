@@ -0,0 +1,207 @@
+"""
+Matching of merchant names to the merchants of a user, and merging of duplicate merchants.
+
+Names are compared by their trigrams, like the similarity() function of the PostgreSQL pg_trgm extension, using a
+per-user inverted index. Each process keeps the indexes of its recent users in memory, versioned in the shared cache
+by the signal receivers when a merchant is saved or deleted: resolving a name costs one cache read of the version
+stamp and a few dictionary lookups, with no query and no unpickling of the index.
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Case, OuterRef, Q, Subquery, When
+from django.db.models.functions import Now
+
+from core.models import Transaction, TransactionMerchant, CreditCardMerchantCategory, GeocodeJob, \
+    CollectionVersion
+from core import categorization, recommendations
+from core.caching import VersionedLocalCache
+
+BULK_CREATE_BATCH_SIZE = 500
+
+_NOISE = re.compile(r'#\s*\d+|\b\d{3,}\b|[^\w\s]')
+
+
+def normalize_name(name):
+    """Return the matching key of a merchant name: lowercase words, without store numbers and punctuation."""
+    name = (name or '').lower()
+    return ' '.join(_NOISE.sub(' ', name).split()) or ' '.join(name.split())
+
+
+def normalize_location(location):
+    """Return the matching key of a merchant location, empty for no location."""
+    return ' '.join((location or '').lower().split())
+
+
+def trigrams(key):
+    """Return the trigrams of a normalized name, each word padded with two spaces before and one after."""
+    grams = set()
+    for word in key.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class MerchantIndex:
+    """Trigram index of the merchants of a user, matching names within the same location."""
+
+    def __init__(self):
+        self.keys = {}  # (location key, name key) -> merchant id, the oldest merchant first
+        self.entries = {}  # merchant id -> (location key, name key, trigram count)
+        self.postings = {}  # trigram -> ids of the merchants having it
+
+    def add(self, merchant_id, name, location=None):
+        location_key, key = normalize_location(location), normalize_name(name)
+        if not key:
+            return
+        grams = trigrams(key)
+        self.entries[merchant_id] = (location_key, key, len(grams))
+        if self.keys.get((location_key, key), merchant_id) >= merchant_id:
+            self.keys[(location_key, key)] = merchant_id
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(merchant_id)
+
+    def match(self, name, location=None, threshold=None):
+        """Return the id of the merchant at the location with the most similar name, or None below threshold.
+
+        An identical normalized name is found with one lookup; otherwise the merchants sharing trigrams with the
+        name are scored by similarity: shared trigrams / trigrams of either name.
+        """
+        location_key, key = normalize_location(location), normalize_name(name)
+        if not key:
+            return None
+        if (merchant_id := self.keys.get((location_key, key))) is not None:
+            return merchant_id
+
+        threshold = settings.MERCHANT_MATCH_THRESHOLD if threshold is None else threshold
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        best, best_score = None, threshold
+        for merchant_id, count in shared.items():
+            merchant_location, _, size = self.entries[merchant_id]
+            if merchant_location != location_key:
+                continue
+            score = count / (len(grams) + size - count)
+            if score > best_score or (score == best_score and (best is None or merchant_id < best)):
+                best, best_score = merchant_id, score
+        return best
+
+
+def build_index(user_id):
+    """Return the index of the merchants of the user, read with one query."""
+    index = MerchantIndex()
+    merchants = TransactionMerchant.objects.filter(user_id=user_id).order_by('id') \
+        .values_list('id', 'name', 'location')
+    for merchant_id, name, location in merchants.iterator():
+        index.add(merchant_id, name, location)
+    return index
+
+
+_indexes = VersionedLocalCache('merchant-index', build_index, settings.MERCHANT_INDEX_CACHE_SIZE,
+                               settings.MERCHANT_INDEX_TIMEOUT)
+
+
+def get_index(user_id):
+    """Return the index of the user, built again when a merchant of the user changed since it was built."""
+    return _indexes.get(user_id)
+
+
+def invalidate(user_id):
+    """Make every process build the index of the user again on its next read, after a merchant changed."""
+    _indexes.invalidate(user_id)
+
+
+def match(user, name, location=None, retry=True):
+    """Return the merchant of the user matching a name and location, or None."""
+    merchant_id = get_index(user.id).match(name, location)
+    if merchant_id is None:
+        return None
+    merchant = TransactionMerchant.objects.filter(user=user, id=merchant_id).first()
+    if merchant is None and retry:  # indexed by a rolled back transaction, or deleted since: rebuild the index
+        invalidate(user.id)
+        return match(user, name, location, retry=False)
+    return merchant
+
+
+def resolve(user, merchants):
+    """Return the merchant ids of (name, location) pairs for the user, creating the unmatched merchants.
+
+    Matched ids are checked with one query, and the new merchants created with one bulk insert: one per normalized
+    name and location.
+    """
+    merchants = set(merchants)
+    index = get_index(user.id)
+    ids = {merchant: index.match(*merchant) for merchant in merchants}
+    matched = {merchant_id for merchant_id in ids.values() if merchant_id is not None}
+    if TransactionMerchant.objects.filter(user=user, id__in=matched).count() != len(matched):
+        invalidate(user.id)  # indexed by a rolled back transaction, or deleted since: rebuild the index
+        index = get_index(user.id)
+        ids = {merchant: index.match(*merchant) for merchant in merchants}
+
+    missing = {}
+    for (name, location), merchant_id in ids.items():
+        if merchant_id is None and normalize_name(name):
+            missing.setdefault((normalize_location(location), normalize_name(name)), (name, location))
+    created = TransactionMerchant.objects.bulk_create(
+        [TransactionMerchant(user=user, name=name, location=location or None) for name, location in missing.values()],
+        batch_size=BULK_CREATE_BATCH_SIZE)
+    if created:  # bulk_create skips save() and the signals
+        GeocodeJob.objects.enqueue(created)
+        invalidate(user.id)
+        categorization.invalidate(user.id)  # categorized by their names
+        CollectionVersion.objects.bump_on_commit(user.id)
+
+    created_ids = {key: merchant.id for key, merchant in zip(missing, created)}
+    for (name, location), merchant_id in ids.items():
+        if merchant_id is None:
+            ids[(name, location)] = created_ids.get((normalize_location(location), normalize_name(name)))
+    return ids
+
+
+def merge(user, target, sources):
+    """Merge the source merchants of the user into the target one, and delete them.
+
+    The transactions and credit card categories of the sources are moved with set-based updates. For each credit
+    card, the category of the target is kept, or else the oldest category of the sources; the transactions of the
+    sources, and those of the target on the cards it gets a category for, then get the category of their card at the
+    target, with the rewards it earns.
+    Return the number of transactions moved.
+    """
+    source_ids = [source.id for source in sources if source.id != target.id]
+    if not source_ids:
+        return 0
+
+    with db_transaction.atomic():
+        kept, replaced, added_cards = {}, [], []
+        categories = CreditCardMerchantCategory.objects.filter(user=user, merchant_id__in=[target.id, *source_ids]) \
+            .order_by(Case(When(merchant_id=target.id, then=0), default=1), 'id') \
+            .values_list('id', 'credit_card_id', 'merchant_id')
+        for category_id, card_id, merchant_id in categories:
+            if card_id in kept:
+                replaced.append(category_id)
+            else:
+                kept[card_id] = category_id
+                if merchant_id != target.id:
+                    added_cards.append(card_id)
+        CreditCardMerchantCategory.objects.filter(id__in=replaced).delete()
+        CreditCardMerchantCategory.objects.filter(id__in=kept.values(), merchant_id__in=source_ids) \
+            .update(merchant=target, updated_at=Now())
+
+        transactions = Transaction.objects.filter(user=user, merchant_id__in=source_ids)
+        recategorized = Transaction.objects.filter(
+            Q(merchant_id__in=source_ids) | Q(merchant=target, payment_card_id__in=added_cards), user=user)
+        category = CreditCardMerchantCategory.objects.filter(credit_card=OuterRef('payment_card'), merchant=target)
+        recategorized.update(credit_card_category=Case(  # the rule of Transaction.save(), split parts have none
+            When(parent__isnull=True, then=Subquery(category.values('id')[:1])), default=None))
+        recategorized.update_rewards()
+        moved = transactions.update(merchant=target, updated_at=Now())
+
+        TransactionMerchant.objects.filter(user=user, id__in=source_ids).delete()
+        recommendations.invalidate(user.id)  # categories moved by update() skip the signals
+        CollectionVersion.objects.bump_on_commit(user.id)
+    return moved
@@ -0,0 +1,122 @@
+# Turn TimeStampedModel into an abstract base class.
+#
+# The concrete parent table forced a JOIN on every read and made bulk_create
+# impossible on its children (Django refuses to bulk insert multi-table
+# inherited models). Timestamps are copied into each child table and the
+# parent link becomes a plain auto-incrementing primary key, keeping ids.
+
+from django.core.management.color import no_style
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.migrations.operations.base import Operation
+
+
+CHILD_MODELS = [
+    'paymentcard',
+    'transactionusercategory',
+    'transactionmerchant',
+    'creditcardmerchantcategory',
+    'transaction',
+]
+
+
+class DetachFromParent(Operation):
+    """Drop the multi-table inheritance base of a model from the migration state only."""
+
+    reduces_to_sql = False
+    reversible = False
+
+    def __init__(self, name):
+        self.name = name
+
+    def deconstruct(self):
+        return (self.__class__.__name__, [self.name], {})
+
+    def state_forwards(self, app_label, state):
+        model_state = state.models[app_label, self.name]
+        model_state.bases = (models.Model,)
+        state.reload_model(app_label, self.name, delay=True)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        pass
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        pass
+
+    def describe(self):
+        return f'Detach {self.name} from its parent model'
+
+
+def copy_timestamps(apps, schema_editor):
+    TimeStampedModel = apps.get_model('core', 'TimeStampedModel')
+    for name in CHILD_MODELS:
+        model = apps.get_model('core', name)
+        parent = TimeStampedModel.objects.filter(pk=OuterRef('timestampedmodel_ptr'))
+        model.objects.update(
+            created_at=Subquery(parent.values('created_at')[:1]),
+            updated_at=Subquery(parent.values('updated_at')[:1]),
+        )
+
+
+def reset_sequences(apps, schema_editor):
+    child_models = [apps.get_model('core', name) for name in CHILD_MODELS]
+    for sql in schema_editor.connection.ops.sequence_reset_sql(no_style(), child_models):
+        schema_editor.execute(sql)
+
+
+def _timestamp_fields(name):
+    return [
+        migrations.AddField(
+            model_name=name,
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=name,
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
+
+
+def _primary_key(name):
+    return [
+        migrations.RenameField(
+            model_name=name,
+            old_name='timestampedmodel_ptr',
+            new_name='id',
+        ),
+        migrations.AlterField(
+            model_name=name,
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AlterField(
+            model_name=name,
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name=name,
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_transaction_has_children'),
+    ]
+
+    operations = (
+        [DetachFromParent(name) for name in CHILD_MODELS]
+        + [op for name in CHILD_MODELS for op in _timestamp_fields(name)]
+        + [migrations.RunPython(copy_timestamps, migrations.RunPython.noop)]
+        + [op for name in CHILD_MODELS for op in _primary_key(name)]
+        + [
+            migrations.RunPython(reset_sequences, migrations.RunPython.noop),
+            migrations.DeleteModel(name='TimeStampedModel'),
+        ]
+    )
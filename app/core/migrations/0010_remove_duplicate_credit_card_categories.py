@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:41
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_credit_card_categories(apps, schema_editor):
+    """Keep the oldest category of each (credit_card, merchant) and point transactions to it."""
+    CreditCardMerchantCategory = apps.get_model('core', 'CreditCardMerchantCategory')
+    Transaction = apps.get_model('core', 'Transaction')
+    duplicated = (CreditCardMerchantCategory.objects.values('credit_card', 'merchant')
+                  .annotate(count=Count('id'), kept=Min('id')).filter(count__gt=1))
+    for group in duplicated:
+        duplicates = CreditCardMerchantCategory.objects.filter(
+            credit_card=group['credit_card'], merchant=group['merchant']).exclude(id=group['kept'])
+        Transaction.objects.filter(credit_card_category__in=duplicates).update(credit_card_category_id=group['kept'])
+        duplicates.delete()
+
+
+# Kept apart from the unique constraint of 0011: PostgreSQL cannot alter a table in the transaction that updated and
+# deleted its rows, their foreign key checks are still pending.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_transaction_user_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_credit_card_categories, migrations.RunPython.noop),
+    ]
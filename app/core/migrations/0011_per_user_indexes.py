@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_remove_duplicate_credit_card_categories'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='merchantcategorycode',
+            name='mcc',
+            field=models.PositiveIntegerField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='creditcardmerchantcategory',
+            index=models.Index(fields=['user', '-id'], name='cc_category_user_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='creditcardmerchantcategory',
+            constraint=models.UniqueConstraint(fields=('credit_card', 'merchant'), name='unique_credit_card_merchant', violation_error_message='Combination of credit card and merchant already exists.'),
+        ),
+    ]
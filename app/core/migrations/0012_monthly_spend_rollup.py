@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:44
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+
+def build_rollups(apps, schema_editor):
+    """Fill the rollups from the existing transactions, like `manage.py rebuild_spend_rollup`."""
+    Transaction = apps.get_model('core', 'Transaction')
+    MonthlySpendRollup = apps.get_model('core', 'MonthlySpendRollup')
+    totals = Transaction.objects.filter(has_children=False).values(
+        'user_id', 'user_category_id', 'payment_card_id',
+        month=models.functions.TruncMonth('authorized_date'), currency=models.F('amount_currency'),
+    ).annotate(
+        spend=models.functions.Coalesce(models.Sum('amount', filter=models.Q(type='Expense')), Decimal(0),
+                                        output_field=models.DecimalField()),
+        income=models.functions.Coalesce(models.Sum('amount', filter=models.Q(type='Income')), Decimal(0),
+                                         output_field=models.DecimalField()),
+        count=models.Count('id'),
+    ).order_by()
+    MonthlySpendRollup.objects.bulk_create((MonthlySpendRollup(**row) for row in totals.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_per_user_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySpendRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('currency', models.CharField(max_length=3)),
+                ('spend', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('income', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('payment_card', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.paymentcard')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('user_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.transactionusercategory')),
+            ],
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='monthlyspendrollup',
+            constraint=models.UniqueConstraint(models.F('user'), models.F('month'), django.db.models.functions.comparison.Coalesce('user_category', 0), django.db.models.functions.comparison.Coalesce('payment_card', 0), models.F('currency'), name='unique_monthly_spend_rollup'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:45
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_mccs(apps, schema_editor):
+    """Keep the first row of each code, populate_mcc used to insert the whole table on every start."""
+    MerchantCategoryCode = apps.get_model('core', 'MerchantCategoryCode')
+    CreditCardMerchantCategory = apps.get_model('core', 'CreditCardMerchantCategory')
+    duplicated = MerchantCategoryCode.objects.values('mcc').annotate(count=Count('id'), kept=Min('id')).filter(
+        count__gt=1)
+    for group in duplicated:
+        duplicates = MerchantCategoryCode.objects.filter(mcc=group['mcc']).exclude(id=group['kept'])
+        CreditCardMerchantCategory.objects.filter(mcc__in=duplicates).update(mcc_id=group['kept'])
+        duplicates.delete()
+
+
+# Kept apart from the unique code of 0014: PostgreSQL cannot alter a table in the transaction that updated and
+# deleted its rows, their foreign key checks are still pending.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_monthly_spend_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_mccs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_collection_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('transaction', 'Transaction'), ('payment_card', 'Payment card'), ('user_category', 'User category'), ('merchant', 'Merchant'), ('cc_merchant_category', 'Credit card category')], max_length=25)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='creditcardmerchantcategory',
+            index=models.Index(fields=['user', 'updated_at'], name='cc_category_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentcard',
+            index=models.Index(fields=['user', 'updated_at'], name='payment_card_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'updated_at'], name='transaction_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionmerchant',
+            index=models.Index(fields=['user', 'updated_at'], name='merchant_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionusercategory',
+            index=models.Index(fields=['user', 'updated_at'], name='user_category_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sync_indexes_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClassifier',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('model', models.JSONField()),
+                ('samples', models.PositiveIntegerField()),
+                ('trained_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategorizationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contains', models.CharField(blank=True, max_length=100)),
+                ('pattern', models.CharField(blank=True, max_length=255)),
+                ('min_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('priority', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('user_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules', to='core.transactionusercategory')),
+            ],
+            options={
+                'verbose_name': 'categorization rule',
+                'verbose_name_plural': 'categorization rules',
+                'indexes': [models.Index(fields=['user', 'priority', 'id'], name='rule_user_priority_idx')],
+            },
+        ),
+    ]
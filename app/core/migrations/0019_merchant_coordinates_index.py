@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_categorization'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactionmerchant',
+            index=models.Index(fields=['user', 'latitude', 'longitude'], name='merchant_user_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:45
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_recurring_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('period', models.CharField(choices=[('month', 'Month'), ('year', 'Year')], default='month', max_length=5)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('currency', models.CharField(default='CAD', max_length=3)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='monthlyspendrollup',
+            index=models.Index(fields=['user_category', 'month'], name='rollup_category_month_idx'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='user_category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budgets', to='core.transactionusercategory'),
+        ),
+        migrations.AddConstraint(
+            model_name='budget',
+            constraint=models.UniqueConstraint(fields=('user_category', 'period', 'currency'), name='unique_budget'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_budgets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodejob',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_geocode_job_lease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='resource',
+            field=models.CharField(choices=[('transaction', 'Transaction'), ('payment_card', 'Payment card'), ('user_category', 'User category'), ('merchant', 'Merchant'), ('cc_merchant_category', 'Credit card category'), ('categorization_rule', 'Categorization rule')], max_length=25),
+        ),
+        migrations.AddIndex(
+            model_name='categorizationrule',
+            index=models.Index(fields=['user', 'updated_at'], name='rule_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_sync_categorization_rules'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='resource',
+            field=models.CharField(choices=[('transaction', 'Transaction'), ('payment_card', 'Payment card'), ('user_category', 'User category'), ('merchant', 'Merchant'), ('cc_merchant_category', 'Credit card category'), ('categorization_rule', 'Categorization rule'), ('budget', 'Budget')], max_length=25),
+        ),
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ),
+    ]
@@ -1,18 +1,20 @@
 """
 Database models.
 """
+import re
+
 from django.conf import settings
-from django.db import models
-from django.core.exceptions import ValidationError
+from django.db import models, transaction as db_transaction, IntegrityError
+from django.db.models.functions import Coalesce, Now, Round, TruncMonth
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager, PermissionsMixin)
 
 from djmoney.models.fields import MoneyField
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import (RegexValidator, MinValueValidator, MaxValueValidator)
 
-from decimal import Decimal
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
 
 
 class TimeStampedModel(models.Model):
@@ -21,11 +23,25 @@ class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  # editable = false
     updated_at = models.DateTimeField(auto_now=True)  # editable = false
 
+    class Meta:
+        abstract = True
+
+
+class DatasetVersion(models.Model):
+    """Checksum of the last load of a reference dataset, such as the merchant category codes."""
+
+    name = models.CharField(max_length=50, unique=True)
+    checksum = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.checksum[:12]})'
+
 
 class MerchantCategoryCode(models.Model):
     """Merchant Category Code (MCC) object."""
 
-    mcc = models.PositiveIntegerField()
+    mcc = models.PositiveIntegerField(unique=True)
     edited_description = models.CharField(max_length=255)
     combined_description = models.CharField(max_length=255)
     usda_description = models.CharField(max_length=255)
@@ -39,6 +55,23 @@ class MerchantCategoryCode(models.Model):
         return f'{self.irs_description} ({self.mcc})'
 
 
+class ExchangeRate(models.Model):
+    """Rate of a currency per euro on a day, as published by the European Central Bank. Loaded by load_fx_rates."""
+
+    date = models.DateField()
+    currency = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=18, decimal_places=6)
+
+    class Meta:
+        constraints = [
+            # Also the index of the lookups of the latest rate of a currency on or before a date
+            models.UniqueConstraint(fields=['currency', 'date'], name='unique_exchange_rate'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} EUR/{self.currency} {self.rate}'
+
+
 class UserManager(BaseUserManager):
     """Manager for users."""
 
@@ -69,6 +102,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    home_currency = models.CharField(max_length=3, default='CAD')
 
     objects = UserManager()
 
@@ -92,6 +126,11 @@ class PaymentCard(TimeStampedModel):
         validators=[MinValueValidator(0000, 'Must be 4 digits.'),
                     MaxValueValidator(9999, 'Must be 4 digits.')])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='payment_card_user_updated_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name} ({self.card_type})'
 
@@ -107,6 +146,9 @@ class TransactionUserCategory(TimeStampedModel):
     class Meta:
         verbose_name = "user category"
         verbose_name_plural = "user categories"
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='user_category_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name}'
@@ -125,37 +167,105 @@ class TransactionMerchant(TimeStampedModel):
     class Meta:
         verbose_name = "merchant"
         verbose_name_plural = "merchants"
-
-    def _get_coordinates(self, address, attempt=1, max_attempts=5):
-        geolocator = Nominatim(user_agent="random_user_agent_aec4ea386b27c56")
-        try:
-            geocode = geolocator.geocode(self.location)
-            if geocode:
-                print(geocode.raw)
-                lat = geocode.latitude if geocode.latitude else None
-                lon = geocode.longitude if geocode.longitude else None
-                location = geocode.address.split(',')[0] if geocode.address else self.location
-                return lat, lon, location
-        except GeocoderTimedOut:
-            if attempt <= max_attempts:
-                return self._get_coordinates(address, attempt=attempt+1)  # Retry if geocoding times out
-        return None, None, None  # Return None if geocoding fails
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='merchant_user_updated_idx'),
+            models.Index(fields=['user', 'latitude', 'longitude'], name='merchant_user_lat_lon_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        previous_location = None
         if self.pk:  # Record exists, it is an update
-            previous_record = TransactionMerchant.objects.filter(pk=self.pk).first()
-        else:  # Record doesn't exist, it is an insertion
-            pass
+            previous_location = TransactionMerchant.objects.filter(
+                pk=self.pk).values_list('location', flat=True).first()
+
+        needs_geocoding = False
         if not self.location:
             self.latitude, self.longitude = None, None
-        elif ((previous_record and previous_record.location != self.location) or (not self.latitude or not self.longitude)) and self.location:
-            self.latitude, self.longitude, self.location = self._get_coordinates(self.location)
+        elif previous_location != self.location or self.latitude is None or self.longitude is None:
+            # Coordinates are filled in later by the geocoding worker, see core/geocoding.py
+            self.latitude, self.longitude = None, None
+            needs_geocoding = True
         super().save(*args, **kwargs)
 
+        if needs_geocoding:
+            GeocodeJob.objects.enqueue([self])
+        elif previous_location and not self.location:
+            GeocodeJob.objects.filter(merchant=self).delete()
+
     def __str__(self):
         return f'{self.name} ({str(self.location)})'
 
 
+class GeocodedAddress(TimeStampedModel):
+    """Geocoding result cached by normalized address. Coordinates are null when the address was not found."""
+
+    address = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "geocoded address"
+        verbose_name_plural = "geocoded addresses"
+
+    @staticmethod
+    def normalize(address):
+        """Return the cache key of an address: lowercase, single spaced and without surrounding punctuation."""
+        return re.sub(r'\s*,\s*', ', ', ' '.join(address.lower().split())).strip(' ,.')
+
+    def __str__(self):
+        return f'{self.address} ({self.latitude}, {self.longitude})'
+
+
+class GeocodeJobManager(models.Manager):
+    """Manager for geocoding jobs."""
+
+    def enqueue(self, merchants):
+        """Fill in merchants coordinates from the cache, and queue a job for the addresses not cached yet.
+
+        The pending jobs of the merchants found in the cache are deleted: they are for a previous address.
+        """
+        merchants = [merchant for merchant in merchants if merchant.location]
+        addresses = {merchant.pk: GeocodedAddress.normalize(merchant.location) for merchant in merchants}
+        cached = GeocodedAddress.objects.in_bulk(set(addresses.values()), field_name='address')
+
+        jobs, resolved = [], []
+        for merchant in merchants:
+            entry = cached.get(addresses[merchant.pk])
+            if entry is None:
+                jobs.append(self.model(merchant=merchant, address=addresses[merchant.pk]))
+                continue
+            resolved.append(merchant.pk)
+            if entry.latitude is not None and entry.longitude is not None:
+                merchant.latitude, merchant.longitude = entry.latitude, entry.longitude
+                TransactionMerchant.objects.filter(pk=merchant.pk).update(
+                    latitude=entry.latitude, longitude=entry.longitude)
+
+        self.filter(merchant_id__in=resolved).delete()
+        return self.bulk_create(jobs, update_conflicts=True, unique_fields=['merchant'],
+                                update_fields=['address', 'status', 'attempts', 'last_error', 'leased_until',
+                                               'updated_at'])
+
+
+class GeocodeJob(TimeStampedModel):
+    """Pending geocoding of a merchant location, drained by the geocode_merchants command."""
+
+    class Status(models.TextChoices):
+        PENDING = 'Pending', _('Pending')
+        FAILED = 'Failed', _('Failed')
+
+    merchant = models.OneToOneField(TransactionMerchant, on_delete=models.CASCADE, related_name='geocode_job')
+    address = models.CharField(max_length=255)
+    status = models.CharField(max_length=25, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)  # claimed by a worker until then
+
+    objects = GeocodeJobManager()
+
+    def __str__(self):
+        return f'{self.address} ({self.status})'
+
+
 class CreditCardMerchantCategory(TimeStampedModel):
     """Transaction category defined by credit card networks."""
 
@@ -175,22 +285,68 @@ class CreditCardMerchantCategory(TimeStampedModel):
     class Meta:
         verbose_name = "credit card category"
         verbose_name_plural = "credit card categories"
-
-    def clean(self):
-        # Only insert or update records that their combination of credit_card and merchant is unique.
-        if CreditCardMerchantCategory.objects.exclude(pk=self.pk).filter(
-                credit_card=self.credit_card, merchant=self.merchant).exists():
-            raise ValidationError("Combination of credit card and merchant already exists.")
-
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        constraints = [
+            # Only one category per combination of credit card and merchant, also used by Transaction.save()
+            models.UniqueConstraint(fields=['credit_card', 'merchant'], name='unique_credit_card_merchant',
+                                    violation_error_message='Combination of credit card and merchant already exists.'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-id'], name='cc_category_user_id_idx'),
+            models.Index(fields=['user', 'updated_at'], name='cc_category_user_updated_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.credit_card.name} + {self.merchant.name} ({self.mcc.irs_description if self.mcc else "No MCC Description"}) \
+        from core.mcc import get_index  # the codes are read from the in-memory index, not one query per category
+        if self.mcc_id is None:
+            description = 'No MCC Description'
+        elif code := get_index(check_version=False).by_id.get(self.mcc_id):
+            description = code['irs_description']
+        else:  # a code added since the index was loaded
+            description = self.mcc.irs_description
+        return f'{self.credit_card.name} + {self.merchant.name} ({description}) \
             = [{self.cash_back}%, {self.points_multiplier}x]'
 
 
+class TransactionQuerySet(models.QuerySet):
+    """QuerySet of transactions."""
+
+    def _earned(self, rate, scale):
+        """Return the expression of amount * rate / scale rounded to the cent, rate being a field of the category."""
+        rate = CreditCardMerchantCategory.objects.filter(pk=models.OuterRef('credit_card_category_id')).values(rate)
+        return models.Case(
+            models.When(type=Transaction.TransactionType.EXPENSE, credit_card_category__isnull=False,
+                        then=Round(models.F('amount') * models.Subquery(rate) / scale, 2)),
+            default=models.Value(Decimal(0)),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    def update_has_children(self):
+        """Set has_children from the stored children of the transactions, with a single UPDATE."""
+        return self.update(has_children=models.Exists(Transaction.objects.filter(parent=models.OuterRef('pk'))),
+                           updated_at=Now())
+
+    def tree(self, root):
+        """Return root and all its descendants, parents before their children, read with one recursive query.
+
+        Each transaction has a depth attribute, 0 for root.
+        """
+        table = Transaction._meta.db_table
+        return Transaction.objects.raw(f"""
+            WITH RECURSIVE tree (id, depth) AS (
+                SELECT id, 0 FROM {table} WHERE id = %s
+                UNION ALL
+                SELECT child.id, tree.depth + 1 FROM {table} child JOIN tree ON child.parent_id = tree.id
+            )
+            SELECT {table}.*, tree.depth FROM {table} JOIN tree ON {table}.id = tree.id
+            ORDER BY tree.depth, {table}.id
+        """, [root.pk])
+
+    def update_rewards(self):
+        """Compute the rewards earned by the transactions with a single UPDATE, and return the number of rows."""
+        return self.update(cashback_earned=self._earned('cash_back', 100),
+                           points_earned=self._earned('points_multiplier', 1), updated_at=Now())
+
+
 class Transaction(TimeStampedModel):
     """Transaction object."""
 
@@ -203,28 +359,370 @@ class Transaction(TimeStampedModel):
     credit_card_category = models.ForeignKey(
         CreditCardMerchantCategory, on_delete=models.SET_NULL, null=True, blank=True)
     payment_card = models.ForeignKey(PaymentCard, on_delete=models.SET_NULL,
-                                     null=True, blank=True)  # null if parent exists
+                                     null=True, blank=True)  # the card of the parent for split parts
     user_category = models.ForeignKey(TransactionUserCategory, on_delete=models.SET_NULL,
-                                      null=True, blank=True)  # null if parent exists
+                                      null=True, blank=True)
     merchant = models.ForeignKey(TransactionMerchant, on_delete=models.SET_NULL, null=True)
     type = models.CharField(max_length=25, choices=TransactionType.choices, default=TransactionType.EXPENSE)
     amount = MoneyField(max_digits=10, decimal_places=2, default=0, default_currency='CAD')
     authorized_date = models.DateField()
     details = models.TextField(blank=True)
     has_children = models.BooleanField(default=False)
+    # Rewards of the credit card category, maintained by save() and TransactionQuerySet.update_rewards()
+    cashback_earned = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal(0), editable=False)
+    points_earned = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal(0), editable=False)
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-authorized_date', '-id'], name='transaction_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='transaction_user_updated_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Update credit_card_category base on the combination of the two fields: payment_card and merchant
-        if self.credit_card_category and not self.payment_card:
-            self.payment_card = self.credit_card_category.credit_card
-        elif self.payment_card and self.merchant and CreditCardMerchantCategory.objects.filter(
-                credit_card=self.payment_card, merchant=self.merchant).exists():
-            self.credit_card_category = CreditCardMerchantCategory.objects.get(
-                credit_card=self.payment_card, merchant=self.merchant)
+        if self.parent_id:  # split parts share the rewards earned by their parent
+            self.credit_card_category = None
+        elif self.credit_card_category_id and not self.payment_card_id:
+            self.payment_card_id = self.credit_card_category.credit_card_id
+        elif self.payment_card_id and self.merchant_id:
+            self.credit_card_category = CreditCardMerchantCategory.objects.filter(
+                credit_card_id=self.payment_card_id, merchant_id=self.merchant_id).first()
         else:
             self.credit_card_category = None
 
-        super(Transaction, self).save(*args, **kwargs)
+        if self._state.adding and not self.user_category_id and not self.parent_id:
+            from core.categorization import get_categorizer  # the engine reads the models of this module
+            self.user_category_id = get_categorizer(self.user_id).categorize(
+                self.merchant_id, self.details, self.amount.amount)
+
+        self.set_rewards()
+        with db_transaction.atomic():  # with the rollups updated by the signals, see core/signals.py
+            super(Transaction, self).save(*args, **kwargs)
+
+    def set_rewards(self):
+        """Compute the rewards earned with the credit card category, like TransactionQuerySet.update_rewards()."""
+        category = self.credit_card_category
+        if category is None or self.type != self.TransactionType.EXPENSE:
+            self.cashback_earned = self.points_earned = Decimal(0)
+            return
+        amount = Decimal(self.amount.amount)
+        self.cashback_earned = (amount * category.cash_back / 100).quantize(CENT, ROUND_HALF_UP)
+        self.points_earned = (amount * category.points_multiplier).quantize(CENT, ROUND_HALF_UP)
+
+    def __str__(self):
+        return f'{self.merchant.name if self.merchant else "No Merchant"} ({str(Decimal(self.amount.amount))})'
+
+
+class MonthlySpendRollupManager(models.Manager):
+    """Manager maintaining the monthly rollups from the transactions."""
+
+    def _key(self, transaction):
+        authorized_date = Transaction._meta.get_field('authorized_date').to_python(transaction.authorized_date)
+        return (transaction.user_id, authorized_date.replace(day=1), transaction.user_category_id,
+                transaction.payment_card_id, str(transaction.amount.currency))
+
+    def add(self, transactions, sign=1):
+        """Add (or with sign=-1 remove) transactions to the rollups, with one upsert per rollup row."""
+        deltas = {}
+        for transaction in transactions:
+            if transaction.has_children:  # split transactions are counted through their parts
+                continue
+            spend, income, count = deltas.get(self._key(transaction), (Decimal(0), Decimal(0), 0))
+            amount = sign * transaction.amount.amount
+            if transaction.type == Transaction.TransactionType.INCOME:
+                income += amount
+            else:
+                spend += amount
+            deltas[self._key(transaction)] = (spend, income, count + sign)
+
+        for (user_id, month, user_category_id, payment_card_id, currency), delta in deltas.items():
+            self._apply(dict(user_id=user_id, month=month, user_category_id=user_category_id,
+                             payment_card_id=payment_card_id, currency=currency), *delta)
+
+    def _apply(self, key, spend, income, count):
+        changes = dict(spend=models.F('spend') + spend, income=models.F('income') + income,
+                       count=models.F('count') + count)
+        if self.filter(**key).update(**changes) or count <= 0:  # nothing to remove from a deleted rollup
+            return
+        try:
+            with db_transaction.atomic():
+                self.create(spend=spend, income=income, count=count, **key)
+        except IntegrityError:  # created concurrently
+            self.filter(**key).update(**changes)
+
+    def totals(self, users=None):
+        """Return the rollup rows of the users, or of everyone, aggregated from their transactions."""
+        transactions = Transaction.objects.filter(has_children=False)
+        if users is not None:
+            transactions = transactions.filter(user__in=users)
+
+        return transactions.values(
+            'user_id', 'user_category_id', 'payment_card_id',
+            month=TruncMonth('authorized_date'), currency=models.F('amount_currency'),
+        ).annotate(
+            spend=Coalesce(models.Sum('amount', filter=models.Q(type=Transaction.TransactionType.EXPENSE)),
+                           Decimal(0), output_field=models.DecimalField()),
+            income=Coalesce(models.Sum('amount', filter=models.Q(type=Transaction.TransactionType.INCOME)),
+                            Decimal(0), output_field=models.DecimalField()),
+            count=models.Count('id'),
+        ).order_by()
+
+    def rebuild(self, users=None):
+        """Recompute the rollups of the users, or of everyone, from their transactions."""
+        rollups = self.all() if users is None else self.filter(user__in=users)
+        with db_transaction.atomic():
+            rollups.delete()
+            return len(self.bulk_create((self.model(**row) for row in self.totals(users).iterator()),
+                                        batch_size=1000))
+
+    def reconcile(self, users, fix=True):
+        """Compare the rollups of the users with the totals of their transactions, and return the drifted keys.
+
+        With fix, each drifted rollup is corrected by the difference, like a transaction write would, so that the
+        writes committed meanwhile are kept.
+        """
+        fields = ['user_id', 'month', 'user_category_id', 'payment_card_id', 'currency']
+        expected = {tuple(row[field] for field in fields): (row['spend'], row['income'], row['count'])
+                    for row in self.totals(users).iterator()}
+        actual = {tuple(row[field] for field in fields): (row['spend'], row['income'], row['count'])
+                  for row in self.filter(user__in=users).values(*fields, 'spend', 'income', 'count').iterator()}
+
+        drifted = []
+        for key in expected.keys() | actual.keys():
+            spend, income, count = expected.get(key, (Decimal(0), Decimal(0), 0))
+            rollup_spend, rollup_income, rollup_count = actual.get(key, (Decimal(0), Decimal(0), 0))
+            if (spend, income, count) != (rollup_spend, rollup_income, rollup_count):
+                drifted.append(key)
+                if fix:
+                    self._apply(dict(zip(fields, key)), spend - rollup_spend, income - rollup_income,
+                                count - rollup_count)
+        return sorted(drifted, key=str)
+
+
+class MonthlySpendRollup(models.Model):
+    """Spend and income totals of a user per month, user category, payment card and currency.
+
+    Maintained incrementally by the Transaction signals (see core/signals.py), rebuilt from scratch by
+    the rebuild_spend_rollup command and checked for drift by the reconcile_spend_rollup command.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    month = models.DateField()
+    user_category = models.ForeignKey(TransactionUserCategory, on_delete=models.CASCADE, null=True, blank=True)
+    payment_card = models.ForeignKey(PaymentCard, on_delete=models.CASCADE, null=True, blank=True)
+    currency = models.CharField(max_length=3)
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal(0))
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal(0))
+    count = models.IntegerField(default=0)
+
+    objects = MonthlySpendRollupManager()
+
+    class Meta:
+        constraints = [
+            # Null categories and cards are part of the key, hence the Coalesce
+            models.UniqueConstraint(
+                'user', 'month', Coalesce('user_category', 0), Coalesce('payment_card', 0), 'currency',
+                name='unique_monthly_spend_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['user_category', 'month'], name='rollup_category_month_idx'),  # budgets
+        ]
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} {self.currency} (-{self.spend} +{self.income})'
+
+
+class BudgetQuerySet(models.QuerySet):
+    """Queries of the budgets, with their spend read from the monthly rollups."""
+
+    def with_spent(self, on_date):
+        """Annotate the budgets with the start of their period containing on_date, and their spend and remaining
+        amount in that period up to on_date's month.
+
+        The spend of a budget is the sum of the few rollups of its category, currency and period: reading it
+        never scans transactions.
+        """
+        month = on_date.replace(day=1)
+        year = month.replace(month=1)
+        rollups = MonthlySpendRollup.objects.filter(user_category=models.OuterRef('user_category'),
+                                                    currency=models.OuterRef('currency'), month__lte=month)
+
+        def spent(start):
+            totals = rollups.filter(month__gte=start).values('user_category').annotate(total=models.Sum('spend'))
+            return models.Subquery(totals.values('total'), output_field=models.DecimalField())
+
+        monthly = models.Q(period=Budget.Period.MONTH)
+        return self.annotate(
+            period_start=models.Case(models.When(monthly, then=models.Value(month)), default=models.Value(year),
+                                     output_field=models.DateField()),
+            spent=Coalesce(models.Case(models.When(monthly, then=spent(month)), default=spent(year)), Decimal(0),
+                           output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+            remaining=models.F('amount') - models.F('spent'),
+        )
+
+
+class Budget(TimeStampedModel):
+    """Spending limit of a user category per month or year, in one currency."""
+
+    class Period(models.TextChoices):
+        MONTH = 'month', _('Month')
+        YEAR = 'year', _('Year')
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    user_category = models.ForeignKey(TransactionUserCategory, on_delete=models.CASCADE, related_name='budgets')
+    period = models.CharField(max_length=5, choices=Period.choices, default=Period.MONTH)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
+    currency = models.CharField(max_length=3, default='CAD')
+
+    objects = BudgetQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_category', 'period', 'currency'], name='unique_budget'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_category_id} {self.amount} {self.currency} per {self.period}'
+
+
+class CollectionVersionManager(models.Manager):
+    """Manager of the versions of the collections of the users."""
+
+    def bump(self, user_id):
+        """Increment the version of the collections of a user."""
+        if self.filter(user_id=user_id).update(version=models.F('version') + 1):
+            return
+        try:
+            with db_transaction.atomic():
+                self.create(user_id=user_id, version=1)
+        except IntegrityError:  # created concurrently, or the user was deleted
+            self.filter(user_id=user_id).update(version=models.F('version') + 1)
+
+    def bump_on_commit(self, user_id):
+        """Increment the version once the current transaction commits, so readers see the version with the data."""
+        db_transaction.on_commit(lambda: self.bump(user_id))
+
+    def get_version(self, user_id):
+        return self.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+
+    async def aget_version(self, user_id):
+        return await self.filter(user_id=user_id).values_list('version', flat=True).afirst() or 0
+
+
+class CollectionVersion(models.Model):
+    """Version of the transactions, cards, categories and merchants of a user, bumped by every write to them.
+
+    Used as the ETag of the list responses, which are not modified while it stays the same.
+    """
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    objects = CollectionVersionManager()
+
+    def __str__(self):
+        return f'{self.user_id} (version {self.version})'
+
+
+class Tombstone(models.Model):
+    """Deleted object of a user, kept for the clients syncing their copy of the user's data."""
+
+    class Resource(models.TextChoices):
+        TRANSACTION = 'transaction', _('Transaction')
+        PAYMENT_CARD = 'payment_card', _('Payment card')
+        USER_CATEGORY = 'user_category', _('User category')
+        MERCHANT = 'merchant', _('Merchant')
+        CC_MERCHANT_CATEGORY = 'cc_merchant_category', _('Credit card category')
+        CATEGORIZATION_RULE = 'categorization_rule', _('Categorization rule')
+        BUDGET = 'budget', _('Budget')
+
+    # Without database constraint: the objects of a user are deleted, writing tombstones, before the user itself
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False)
+    resource = models.CharField(max_length=25, choices=Resource.choices)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.resource} {self.object_id}'
+
+
+class CategorizationRule(TimeStampedModel):
+    """Rule of a user assigning a category to the new transactions matching all of its conditions.
+
+    Text conditions are case insensitive and match the merchant name or the details of the transaction.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    user_category = models.ForeignKey(TransactionUserCategory, on_delete=models.CASCADE, related_name='rules')
+    contains = models.CharField(max_length=100, blank=True)
+    pattern = models.CharField(max_length=255, blank=True)  # regular expression
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    priority = models.PositiveIntegerField(default=0)  # rules are tried by priority, then oldest first
+
+    class Meta:
+        verbose_name = "categorization rule"
+        verbose_name_plural = "categorization rules"
+        indexes = [
+            models.Index(fields=['user', 'priority', 'id'], name='rule_user_priority_idx'),
+            models.Index(fields=['user', 'updated_at'], name='rule_user_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.contains or self.pattern or "Any"} -> {self.user_category_id}'
+
+
+class CategoryClassifier(models.Model):
+    """Naive Bayes model predicting the category of a user's transaction, trained on their categorized ones."""
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
+    model = models.JSONField()
+    samples = models.PositiveIntegerField()  # number of transactions trained on
+    trained_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id} ({self.samples} samples)'
+
+
+class RecurringSeries(models.Model):
+    """Recurring charge of a user at a merchant, such as a subscription, found by the detect_recurring command.
+
+    The series of a user are replaced each time their transactions are analyzed, see core/recurring.py.
+    """
+
+    class Cadence(models.TextChoices):
+        WEEKLY = 'weekly', _('Weekly')
+        BIWEEKLY = 'biweekly', _('Biweekly')
+        MONTHLY = 'monthly', _('Monthly')
+        QUARTERLY = 'quarterly', _('Quarterly')
+        YEARLY = 'yearly', _('Yearly')
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    merchant = models.ForeignKey(TransactionMerchant, on_delete=models.CASCADE)
+    currency = models.CharField(max_length=3)
+    cadence = models.CharField(max_length=10, choices=Cadence.choices)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)  # median amount of the charges
+    occurrences = models.PositiveIntegerField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    next_date = models.DateField()  # expected date of the next charge
+    detected_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "recurring series"
+        indexes = [
+            models.Index(fields=['user', 'next_date'], name='recurring_user_next_date_idx'),
+        ]
 
     def __str__(self):
-        return f'{self.merchant.name} ({str(Decimal(self.amount.amount))})'
+        return f'{self.merchant_id} {self.cadence} {self.amount} {self.currency}'
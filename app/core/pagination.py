@@ -0,0 +1,131 @@
+"""
+Keyset (seek) pagination for API lists.
+"""
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination seeking on every field of the view `ordering`, which must end with a unique field.
+
+    Unlike DRF's CursorPagination, which seeks on the first field and then skips duplicates with an OFFSET,
+    each page is a `WHERE (fields) > (position) ... LIMIT` range scan of the matching index, so deep pages
+    cost the same as the first one.
+    """
+
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async paginate_queryset(), reading the page with the async ORM, for the async views."""
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([instance async for instance in queryset])
+
+    def _page_queryset(self, queryset, request, view):
+        """Return the query of the requested page and of one more row, telling whether there is a next page."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset.model)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = [self._invert(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._seek(ordering, self.cursor.position))
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        reverse = self.cursor is not None and self.cursor.reverse
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = (self.cursor is not None) if reverse else has_more
+        self.has_previous = has_more if reverse else (self.cursor is not None)
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering of the view, falling back to the pagination default."""
+        return tuple(getattr(view, 'ordering', None) or self.ordering)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _seek(ordering, position):
+        """Return the filter of the rows after position.
+
+        (a, b) > (x, y) is written a >= x AND (a > x OR (a = x AND b > y)); the redundant leading range on the
+        first field lets the database bound its index scan.
+        """
+        lookups = [(field.lstrip('-'), 'lt' if field.startswith('-') else 'gt') for field in ordering]
+        name, lookup = lookups[-1]
+        after = Q(**{f'{name}__{lookup}': position[-1]})
+        for (name, lookup), value in reversed(list(zip(lookups[:-1], position[:-1]))):
+            after = Q(**{f'{name}__{lookup}': value}) | (Q(**{name: value}) & after)
+
+        name, lookup = lookups[0]
+        return Q(**{f'{name}__{lookup}e': position[0]}) & after
+
+    def decode_cursor(self, request, model=None):
+        """Given a request with a cursor, return a `Cursor` with the position values converted to python."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            reverse, position = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            fields = [model._meta.get_field(field.lstrip('-')) for field in self.ordering]
+            position = [field.to_python(value) for field, value in zip(fields, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=bool(reverse), position=position)
+
+    def encode_cursor(self, cursor):
+        """Given a Cursor instance, return an url with encoded cursor."""
+        position = [str(value) for value in cursor.position]
+        encoded = b64encode(json.dumps([int(cursor.reverse), position]).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _position(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(reverse=True, position=self._position(self.page[0])))
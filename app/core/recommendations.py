@@ -0,0 +1,148 @@
+"""
+Per-user index of the payment cards earning the most at each merchant and merchant category code.
+
+The index is built from the credit card categories of the user in one query and kept in the cache. When a category
+change is committed, only the rankings of its merchant and codes are recomputed, so a recommendation is a cache read.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.db.models import Q
+
+from core.models import CreditCardMerchantCategory
+
+FIELDS = ['id', 'merchant_id', 'mcc__mcc', 'credit_card_id', 'credit_card__name', 'cash_back', 'points_multiplier',
+          'rewards_type']
+LOCK_TIMEOUT = 10  # seconds, longer than a refresh
+
+
+def cache_key(user_id):
+    return f'card-recommendations:{user_id}'
+
+
+def _categories(user_id, *filters):
+    return CreditCardMerchantCategory.objects.filter(*filters, user_id=user_id).values(*FIELDS)
+
+
+def _rank(categories):
+    """Return the cards of the categories, best rate first, each with its best category."""
+    point_value = Decimal(str(settings.REWARDS_POINT_VALUE_PERCENT))
+    cards = {}
+    for category in categories:
+        rate = category['cash_back'] + category['points_multiplier'] * point_value
+        card = cards.get(category['credit_card_id'])
+        if card is None or rate > card['rate']:
+            cards[category['credit_card_id']] = {
+                'payment_card': category['credit_card_id'],
+                'payment_card_name': category['credit_card__name'],
+                'credit_card_category': category['id'],
+                'cash_back': category['cash_back'],
+                'points_multiplier': category['points_multiplier'],
+                'rewards_type': category['rewards_type'],
+                'rate': rate,
+            }
+    return sorted(cards.values(), key=lambda card: (-card['rate'], card['payment_card']))
+
+
+def _group(categories, index, merchant_ids, mccs):
+    """Set the rankings of merchant_ids and mccs in index from their categories."""
+    by_merchant = {merchant_id: [] for merchant_id in merchant_ids}
+    by_mcc = {mcc: [] for mcc in mccs}
+    for category in categories:
+        if category['merchant_id'] in by_merchant:
+            by_merchant[category['merchant_id']].append(category)
+        if category['mcc__mcc'] in by_mcc:
+            by_mcc[category['mcc__mcc']].append(category)
+
+    for key, groups in (('merchants', by_merchant), ('mccs', by_mcc)):
+        for group, group_categories in groups.items():
+            if group_categories:
+                index[key][group] = _rank(group_categories)
+            else:
+                index[key].pop(group, None)
+
+
+def build_index(user_id):
+    """Return the index of the user: the ranked cards per merchant id and per merchant category code."""
+    categories = list(_categories(user_id))
+    index = {'categories': {}, 'merchants': {}, 'mccs': {}}
+    for category in categories:
+        index['categories'][category['id']] = (category['merchant_id'], category['mcc__mcc'])
+    _group(categories, index, {category['merchant_id'] for category in categories},
+           {category['mcc__mcc'] for category in categories if category['mcc__mcc'] is not None})
+    return index
+
+
+def get_index(user_id):
+    """Return the index of the user from the cache, building it on a miss."""
+    index = cache.get(cache_key(user_id))
+    if index is None:
+        index = build_index(user_id)
+        cache.set(cache_key(user_id), index, settings.CARD_RECOMMENDATIONS_TIMEOUT)
+    return index
+
+
+def refresh_category(user_id, category_id, merchant_id, mcc_id):
+    """Recompute the rankings affected by a saved or deleted category in the cached index of its owner.
+
+    Only the merchant and codes of the category, before and after the change, are queried again. The stored row, if
+    any, gives the code of the category, so the refresh must see the committed change: see refresh_on_commit().
+    Refreshes of the same user are serialized by a cache lock, one that finds it taken drops the index instead.
+    """
+    key, lock_key, stale_key = cache_key(user_id), f'{cache_key(user_id)}:lock', f'{cache_key(user_id)}:stale'
+    if not cache.add(lock_key, True, LOCK_TIMEOUT):
+        cache.set(stale_key, True, LOCK_TIMEOUT)  # tells the holder its index may miss this change
+        cache.delete(key)
+        return
+    try:
+        cache.delete(stale_key)
+        index = cache.get(key)
+        if index is None:  # built on the next read
+            return
+
+        merchant_ids, mccs = {merchant_id}, set()
+        if previous := index['categories'].pop(category_id, None):
+            merchant_ids.add(previous[0])
+            mccs.add(previous[1])
+        mccs.discard(None)
+
+        filters = Q(merchant_id__in=merchant_ids) | Q(mcc__mcc__in=mccs) | Q(id=category_id)
+        if mcc_id is not None:
+            filters |= Q(mcc_id=mcc_id)
+        categories = list(_categories(user_id, filters))
+        for category in categories:
+            if category['id'] == category_id:
+                index['categories'][category_id] = (category['merchant_id'], category['mcc__mcc'])
+                merchant_ids.add(category['merchant_id'])
+                if category['mcc__mcc'] is not None:
+                    mccs.add(category['mcc__mcc'])
+        _group(categories, index, merchant_ids, mccs)
+        cache.set(key, index, settings.CARD_RECOMMENDATIONS_TIMEOUT)
+        if cache.get(stale_key):
+            cache.delete(key)
+    finally:
+        cache.delete(lock_key)
+
+
+def refresh_on_commit(category):
+    """Refresh the index of the owner of a saved or deleted category once the change is committed.
+
+    Nothing is refreshed if the transaction rolls back, and the rankings are computed from committed rows only.
+    """
+    user_id, category_id, merchant_id, mcc_id = category.user_id, category.pk, category.merchant_id, category.mcc_id
+    db_transaction.on_commit(lambda: refresh_category(user_id, category_id, merchant_id, mcc_id))
+
+
+def invalidate(user_id):
+    """Drop the cached index of the user, to rebuild it on the next read."""
+    cache.delete(cache_key(user_id))
+
+
+def recommend(user_id, merchant_id=None, mcc=None):
+    """Return the cards of the user ranked for a merchant, or else for a merchant category code."""
+    index = get_index(user_id)
+    if merchant_id is not None:
+        return index['merchants'].get(merchant_id, [])
+    return index['mccs'].get(mcc, [])
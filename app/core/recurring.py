@@ -0,0 +1,179 @@
+"""
+Detection of recurring charges, such as subscriptions, in the expenses of the users.
+
+The expenses of a batch of users are read with one query into NumPy arrays, sorted by user, merchant, currency and
+date. Every candidate series, the expenses of a user at one merchant in one currency, is then analyzed at once by
+vectorized passes over the arrays: the intervals between charges, their median per series and the cadence it fits,
+and the share of intervals and amounts that are regular. Only the series found are handled one by one, to compute
+their next expected charge.
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+
+from core.models import Transaction, RecurringSeries
+
+USER_BATCH_SIZE = 1000
+BULK_CREATE_BATCH_SIZE = 1000
+EPOCH = date(1970, 1, 1)
+
+# (cadence, shortest and longest regular interval in days, step between charges in days or in months)
+CADENCES = [
+    (RecurringSeries.Cadence.WEEKLY, 6, 8, 7, 0),
+    (RecurringSeries.Cadence.BIWEEKLY, 13, 15, 14, 0),
+    (RecurringSeries.Cadence.MONTHLY, 27, 33, 0, 1),
+    (RecurringSeries.Cadence.QUARTERLY, 85, 97, 0, 3),
+    (RecurringSeries.Cadence.YEARLY, 355, 375, 0, 12),
+]
+STEPS = {cadence: (days, months) for cadence, _, _, days, months in CADENCES}
+
+
+def add_months(day, months):
+    """Return the same day of the month, months later, or the last day of a shorter month."""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def advance(day, cadence, count=1):
+    """Return the date count charges of the cadence after day."""
+    days, months = STEPS[cadence]
+    return add_months(day, months * count) if months else day + timedelta(days=days * count)
+
+
+def _medians(values, groups, counts):
+    """Return the lower median of the values of each group, 0 for the empty groups.
+
+    groups must be sorted; counts is the number of values of each group.
+    """
+    if not len(values):
+        return np.zeros(len(counts))
+    ordered = values[np.lexsort((values, groups))]
+    middles = np.cumsum(counts) - counts + np.maximum(counts - 1, 0) // 2
+    return np.where(counts > 0, ordered[np.minimum(middles, len(ordered) - 1)], 0)
+
+
+def analyze(groups, days, amounts):
+    """Return, per group, whether its charges are recurring, the index of their cadence and their median amount.
+
+    The charges must be sorted by group, then day: groups numbers them from 0 and days is their date as a number.
+    """
+    count = int(groups[-1]) + 1 if len(groups) else 0
+    occurrences = np.bincount(groups, minlength=count)
+
+    # Intervals between consecutive charges of the same group
+    same = groups[1:] == groups[:-1]
+    gap_groups = groups[1:][same]
+    gaps = np.diff(days)[same]
+    gap_counts = np.bincount(gap_groups, minlength=count)
+    median_gaps = _medians(gaps, gap_groups, gap_counts)
+
+    cadences = np.full(count, -1)
+    lows, highs = np.array([cadence[1] for cadence in CADENCES]), np.array([cadence[2] for cadence in CADENCES])
+    for i, (low, high) in enumerate(zip(lows, highs)):
+        cadences[(median_gaps >= low) & (median_gaps <= high)] = i
+    gap_cadences = cadences[gap_groups]
+    regular = (gap_cadences >= 0) & (gaps >= lows[gap_cadences]) & (gaps <= highs[gap_cadences])
+    gap_regularity = np.bincount(gap_groups, weights=regular, minlength=count) / np.maximum(gap_counts, 1)
+
+    median_amounts = _medians(amounts, groups, occurrences)
+    stable = np.abs(amounts - median_amounts[groups]) <= settings.RECURRING_AMOUNT_TOLERANCE * median_amounts[groups]
+    amount_regularity = np.bincount(groups, weights=stable, minlength=count) / np.maximum(occurrences, 1)
+
+    recurring = ((occurrences >= settings.RECURRING_MIN_OCCURRENCES) & (cadences >= 0)
+                 & (gap_regularity >= settings.RECURRING_MIN_REGULARITY)
+                 & (amount_regularity >= settings.RECURRING_MIN_REGULARITY))
+    return recurring, cadences, median_amounts
+
+
+def _expenses(user_ids):
+    """Return the arrays of user, merchant, currency code, day and amount of the expenses of the users, sorted."""
+    rows = Transaction.objects.filter(user_id__in=user_ids, type=Transaction.TransactionType.EXPENSE,
+                                      has_children=False, merchant__isnull=False) \
+        .values_list('user_id', 'merchant_id', 'amount_currency', 'authorized_date', 'amount')
+    columns = list(zip(*rows.iterator(chunk_size=10000))) or [()] * 5
+    users, merchants = np.array(columns[0], dtype=np.int64), np.array(columns[1], dtype=np.int64)
+    currency_names, currencies = np.unique(np.array(columns[2], dtype='U3'), return_inverse=True)
+    days = np.array(columns[3], dtype='datetime64[D]').astype(np.int64)
+    amounts = np.array(columns[4], dtype=np.float64)
+
+    order = np.lexsort((days, currencies, merchants, users))
+    return users[order], merchants[order], currency_names, currencies[order], days[order], amounts[order]
+
+
+def detect(user_ids):
+    """Replace the recurring series of the users with the ones found in their expenses, and return their number."""
+    users, merchants, currency_names, currencies, days, amounts = _expenses(user_ids)
+    starts = np.ones(len(users), dtype=bool)
+    starts[1:] = (np.diff(users) != 0) | (np.diff(merchants) != 0) | (np.diff(currencies) != 0)
+    groups = np.cumsum(starts) - 1
+    recurring, cadences, median_amounts = analyze(groups, days, amounts)
+
+    first_charges = np.flatnonzero(starts)
+    last_charges = np.append(first_charges[1:], len(users)) - 1
+    series = []
+    for group in np.flatnonzero(recurring):
+        first, last = first_charges[group], last_charges[group]
+        cadence = CADENCES[cadences[group]][0]
+        last_date = EPOCH + timedelta(days=int(days[last]))
+        series.append(RecurringSeries(
+            user_id=int(users[first]),
+            merchant_id=int(merchants[first]),
+            currency=str(currency_names[currencies[first]]),
+            cadence=cadence,
+            amount=Decimal(f'{median_amounts[group]:.2f}'),
+            occurrences=int(last - first + 1),
+            first_date=EPOCH + timedelta(days=int(days[first])),
+            last_date=last_date,
+            next_date=advance(last_date, cadence),
+        ))
+
+    with db_transaction.atomic():
+        RecurringSeries.objects.filter(user_id__in=user_ids).delete()
+        RecurringSeries.objects.bulk_create(series, batch_size=BULK_CREATE_BATCH_SIZE)
+    return len(series)
+
+
+def detect_all(batch_size=USER_BATCH_SIZE):
+    """Detect the recurring series of every user, batch_size users at a time, and return their number."""
+    found, last_id = 0, 0
+    users = get_user_model().objects.order_by('id').values_list('id', flat=True)
+    while batch := list(users.filter(id__gt=last_id)[:batch_size]):
+        found += detect(batch)
+        last_id = batch[-1]
+    return found
+
+
+def upcoming_charges(user, days=30, today=None):
+    """Return the charges of the recurring series of the user expected in the next days, by date.
+
+    A series whose expected charge is late by more than half its interval has ended; a charge late by less is still
+    returned, with its past expected date.
+    """
+    today = today or date.today()
+    end = today + timedelta(days=days)
+    charges = []
+    for series in RecurringSeries.objects.filter(user=user, next_date__lte=end).select_related('merchant'):
+        grace = (advance(series.next_date, series.cadence) - series.next_date) / 2
+        if series.next_date + grace < today:
+            continue
+        count, expected = 1, series.next_date
+        while expected <= end:
+            if expected >= today or count == 1:
+                charges.append({
+                    'series': series.id,
+                    'merchant': series.merchant_id,
+                    'merchant_name': series.merchant.name,
+                    'cadence': series.cadence,
+                    'date': expected,
+                    'amount': series.amount,
+                    'currency': series.currency,
+                })
+            count += 1
+            expected = advance(series.last_date, series.cadence, count)
+    return sorted(charges, key=lambda charge: (charge['date'], charge['series']))
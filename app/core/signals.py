@@ -0,0 +1,161 @@
+"""
+Signal receivers keeping derived data in sync with the transactions.
+"""
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.contrib.auth import get_user_model
+from django.db.models.functions import Now
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.models import Transaction, PaymentCard, TransactionUserCategory, MonthlySpendRollup, \
+    CreditCardMerchantCategory, TransactionMerchant, CollectionVersion, Tombstone, CategorizationRule, Budget
+from core import categorization, merchants, recommendations
+from core.authentication import token_cache
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of an updated transaction, to remove it from the rollups after saving.
+
+    The row is locked until the save commits, so that concurrent updates move the amount from the right rollup.
+    """
+    instance._previous = None
+    if not raw and not instance._state.adding and instance.pk:
+        instance._previous = Transaction.objects.select_for_update().filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    """Move the transaction amount from its previous rollup to its current one."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        MonthlySpendRollup.objects.add([previous], sign=-1)
+    MonthlySpendRollup.objects.add([instance])
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Remove a deleted transaction from its rollup."""
+    MonthlySpendRollup.objects.add([instance], sign=-1)
+
+
+@receiver(post_delete, sender=PaymentCard)
+@receiver(post_delete, sender=TransactionUserCategory)
+def rebuild_rollup_on_key_delete(sender, instance, **kwargs):
+    """Rebuild the rollups of the owner, whose transactions were moved to no card or category.
+
+    Deferred to the commit, the card or category may be deleted along with its user.
+    """
+    db_transaction.on_commit(lambda: MonthlySpendRollup.objects.rebuild(users=[instance.user_id]))
+
+
+@receiver(post_save, sender=CreditCardMerchantCategory)
+def update_rewards_on_category_save(sender, instance, raw=False, **kwargs):
+    """Recompute the rewards of the transactions of a category, whose rates may have changed."""
+    if not raw:
+        Transaction.objects.filter(credit_card_category=instance).update_rewards()
+
+
+@receiver(pre_delete, sender=CreditCardMerchantCategory)
+def clear_rewards_on_category_delete(sender, instance, **kwargs):
+    """Clear the rewards of the transactions of a category, before they are moved to no category."""
+    Transaction.objects.filter(credit_card_category=instance).update(
+        cashback_earned=Decimal(0), points_earned=Decimal(0), updated_at=Now())
+
+
+@receiver(post_save, sender=CreditCardMerchantCategory)
+def refresh_recommendations_on_category_save(sender, instance, raw=False, **kwargs):
+    """Re-rank the cards of the merchant and code of a saved category, once committed."""
+    if not raw:
+        recommendations.refresh_on_commit(instance)
+
+
+@receiver(post_delete, sender=CreditCardMerchantCategory)
+def refresh_recommendations_on_category_delete(sender, instance, **kwargs):
+    """Re-rank the cards of the merchant and code of a deleted category, once committed."""
+    recommendations.refresh_on_commit(instance)
+
+
+@receiver(post_save, sender=TransactionMerchant)
+@receiver(post_delete, sender=TransactionMerchant)
+def invalidate_merchant_index(sender, instance, raw=False, **kwargs):
+    """Match names against the current merchants of the owner of a saved or deleted merchant."""
+    merchants.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=TransactionMerchant)
+@receiver(post_delete, sender=TransactionMerchant)
+@receiver(post_save, sender=CategorizationRule)
+@receiver(post_delete, sender=CategorizationRule)
+@receiver(post_delete, sender=TransactionUserCategory)
+def invalidate_categorizer(sender, instance, raw=False, **kwargs):
+    """Categorize with the current merchants, rules and categories of the owner of a changed object."""
+    categorization.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=PaymentCard)
+@receiver(post_delete, sender=PaymentCard)
+def invalidate_recommendations_on_card_change(sender, instance, raw=False, **kwargs):
+    """Drop the recommendations of the owner of a card, which hold its name."""
+    recommendations.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token."""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def uncache_user_tokens(sender, instance, **kwargs):
+    """Drop the cached tokens of a changed user, who may be deactivated or have a new password."""
+    token_cache.delete_user(instance.pk)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=PaymentCard)
+@receiver(post_delete, sender=PaymentCard)
+@receiver(post_save, sender=TransactionUserCategory)
+@receiver(post_delete, sender=TransactionUserCategory)
+@receiver(post_save, sender=TransactionMerchant)
+@receiver(post_delete, sender=TransactionMerchant)
+@receiver(post_save, sender=CreditCardMerchantCategory)
+@receiver(post_delete, sender=CreditCardMerchantCategory)
+@receiver(post_save, sender=CategorizationRule)
+@receiver(post_delete, sender=CategorizationRule)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def bump_collection_version(sender, instance, raw=False, **kwargs):
+    """Change the ETag of the lists of the owner of a written object."""
+    if not raw:
+        CollectionVersion.objects.bump_on_commit(instance.user_id)
+
+
+TOMBSTONE_RESOURCES = {
+    Transaction: Tombstone.Resource.TRANSACTION,
+    PaymentCard: Tombstone.Resource.PAYMENT_CARD,
+    TransactionUserCategory: Tombstone.Resource.USER_CATEGORY,
+    TransactionMerchant: Tombstone.Resource.MERCHANT,
+    CreditCardMerchantCategory: Tombstone.Resource.CC_MERCHANT_CATEGORY,
+    CategorizationRule: Tombstone.Resource.CATEGORIZATION_RULE,
+    Budget: Tombstone.Resource.BUDGET,
+}
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=PaymentCard)
+@receiver(post_delete, sender=TransactionUserCategory)
+@receiver(post_delete, sender=TransactionMerchant)
+@receiver(post_delete, sender=CreditCardMerchantCategory)
+@receiver(post_delete, sender=CategorizationRule)
+@receiver(post_delete, sender=Budget)
+def record_tombstone(sender, instance, **kwargs):
+    """Record the deletion for the clients syncing the data of the owner."""
+    Tombstone.objects.create(user_id=instance.user_id, resource=TOMBSTONE_RESOURCES[sender], object_id=instance.pk)
@@ -1,11 +1,15 @@
 """
 Test for the Django admin modifications.
 """
+from datetime import date
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
 
+from core.models import Transaction, TransactionMerchant
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin."""
@@ -48,3 +52,14 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_transactions_list(self):
+        """Test the transactions list page works, including transactions without merchant."""
+        merchant = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        Transaction.objects.create(user=self.user, merchant=merchant, amount=10, authorized_date=date(2023, 1, 1))
+        Transaction.objects.create(user=self.user, amount=5, authorized_date=date(2023, 1, 2))
+        url = reverse('admin:core_transaction_changelist')
+        res = self.client.get(url)
+
+        self.assertContains(res, 'Grocer (10.00)')
+        self.assertContains(res, 'No Merchant (5.00)')
@@ -0,0 +1,67 @@
+"""
+Tests for the cached token authentication.
+"""
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenCache, token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test the token is only looked up by the first request."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'user@example.com')
+
+    def test_invalidated_on_token_delete(self):
+        """Test a deleted token stops authenticating."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalidated_on_user_change(self):
+        """Test a deactivated user stops authenticating, and an updated user is reloaded."""
+        self.client.patch(ME_URL, {'name': 'New name'})
+        self.assertEqual(self.client.get(ME_URL).data['name'], 'New name')
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_bounded_and_expiring(self):
+        """Test the least recently used entries are evicted and expired ones missed."""
+        cache = TokenCache(maxsize=2, ttl=60)
+        for key in ('a', 'b'):
+            cache.set(key, self.user, None)
+        cache.get('a')
+        cache.set('c', self.user, None)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        expiring = TokenCache(maxsize=2, ttl=0)
+        expiring.set('a', self.user, None)
+        self.assertIsNone(expiring.get('a'))
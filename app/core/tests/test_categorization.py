@@ -0,0 +1,98 @@
+"""
+Tests for the categorization of transactions.
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import categorization
+from core.models import Transaction, TransactionMerchant, TransactionUserCategory, CategorizationRule, \
+    CategoryClassifier, MonthlySpendRollup
+
+
+class CategorizationTests(TestCase):
+    """Test categorizing transactions with merchant defaults, rules and the classifier."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        self.travel = TransactionUserCategory.objects.create(user=self.user, name='Travel')
+        self.bills = TransactionUserCategory.objects.create(user=self.user, name='Bills')
+
+    def create_transaction(self, merchant=None, details='', amount=10, **params):
+        return Transaction.objects.create(user=self.user, merchant=merchant, details=details, amount=amount,
+                                          authorized_date=date(2023, 1, 1), **params)
+
+    def test_merchant_default_first(self):
+        """Test the default category of the merchant wins over the rules, and a given category over both."""
+        cafe = TransactionMerchant.objects.create(user=self.user, name='Cafe', default_user_category=self.food)
+        CategorizationRule.objects.create(user=self.user, user_category=self.travel, contains='cafe')
+
+        self.assertEqual(self.create_transaction(cafe).user_category, self.food)
+        self.assertEqual(self.create_transaction(cafe, user_category=self.bills).user_category, self.bills)
+
+    def test_rules(self):
+        """Test rules match the merchant name or details and amounts, tried by priority."""
+        CategorizationRule.objects.create(user=self.user, user_category=self.travel, pattern=r'air\s*line',
+                                          min_amount=Decimal('100'))
+        CategorizationRule.objects.create(user=self.user, user_category=self.bills, contains='AIR', priority=1)
+        airline = TransactionMerchant.objects.create(user=self.user, name='Great Airline')
+
+        self.assertEqual(self.create_transaction(airline, amount=300).user_category, self.travel)
+        self.assertEqual(self.create_transaction(airline, amount=50).user_category, self.bills)
+        self.assertEqual(self.create_transaction(details='Hot air balloon').user_category, self.bills)
+        self.assertIsNone(self.create_transaction(details='Groceries').user_category)
+
+    def test_engine_cached_until_rules_change(self):
+        """Test the engine is built once, and again after a rule changes."""
+        categorization.get_categorizer(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertIsNone(categorization.get_categorizer(self.user.id).categorize(None, 'Rent', Decimal(900)))
+
+        CategorizationRule.objects.create(user=self.user, user_category=self.bills, contains='rent')
+
+        self.assertEqual(categorization.get_categorizer(self.user.id).categorize(None, 'Rent', Decimal(900)),
+                         self.bills.id)
+
+    def test_classifier(self):
+        """Test the trained classifier predicts the category of similar transactions, when confident enough."""
+        grocer = TransactionMerchant.objects.create(user=self.user, name='Fresh Grocer')
+        for i in range(12):
+            self.create_transaction(grocer, f'Weekly groceries {i}', user_category=self.food)
+            self.create_transaction(details=f'Flight ticket {i}', user_category=self.travel)
+        self.assertIsNone(self.create_transaction(details='Flight to Paris').user_category)
+
+        call_command('train_categorizer', stdout=StringIO())
+
+        self.assertEqual(CategoryClassifier.objects.get(user=self.user).samples, 24)
+        self.assertEqual(self.create_transaction(details='Flight to Paris').user_category, self.travel)
+        self.assertEqual(self.create_transaction(grocer).user_category, self.food)
+        self.assertIsNone(self.create_transaction(details='Something else').user_category)
+
+    def test_train_needs_samples(self):
+        """Test no classifier is trained on too few categorized transactions."""
+        self.create_transaction(details='Flight', user_category=self.travel)
+
+        self.assertIsNone(categorization.train(self.user.id))
+        self.assertFalse(CategoryClassifier.objects.exists())
+
+    def test_recategorize_history(self):
+        """Test stored transactions are categorized in bulk, only the uncategorized ones unless overwriting."""
+        transactions = [self.create_transaction(details='Hydro bill'), self.create_transaction(details='Hydro'),
+                        self.create_transaction(details='Hydro', user_category=self.food)]
+        CategorizationRule.objects.create(user=self.user, user_category=self.bills, contains='hydro')
+
+        call_command('categorize_transactions', user=[self.user.id], batch_size=1, stdout=StringIO())
+
+        self.assertEqual([Transaction.objects.get(id=t.id).user_category for t in transactions],
+                         [self.bills, self.bills, self.food])
+        self.assertEqual(MonthlySpendRollup.objects.get(user=self.user, user_category=self.bills).count, 2)
+
+        self.assertEqual(categorization.recategorize(self.user.id, overwrite=True), 1)
+        self.assertEqual(Transaction.objects.filter(user_category=self.bills).count(), 3)
@@ -1,14 +1,23 @@
 """
 Test custom Django management commands.
 """
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch  # mock the behavior of the database
 
 # OperationalError error returned when database is not ready
 from psycopg2 import OperationalError as Psycopg2Error
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.management.commands.populate_mcc import file_checksum
+from core.models import MerchantCategoryCode, DatasetVersion, Transaction, ExchangeRate
+
+MCC_HEADER = 'mcc,edited_description,combined_description,usda_description,irs_description,irs_reportable\n'
 
 
 # Mock the method check
@@ -37,3 +46,72 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class PopulateMccTests(TestCase):
+    """Test the populate_mcc command."""
+
+    def write_csv(self, content):
+        """Write content to a temporary CSV file and return its path."""
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, csv_file.name)
+        with csv_file:
+            csv_file.write(MCC_HEADER + content)
+        return csv_file.name
+
+    def test_populate_bundled_file(self):
+        """Test the bundled CSV file is loaded once."""
+        call_command('populate_mcc', stdout=StringIO())
+        count = MerchantCategoryCode.objects.count()
+
+        with self.assertNumQueries(1):
+            call_command('populate_mcc', stdout=StringIO())
+
+        self.assertGreater(count, 900)
+        self.assertEqual(MerchantCategoryCode.objects.count(), count)
+
+    def test_populate_upserts_changed_file(self):
+        """Test loading a changed file updates existing codes and adds new ones."""
+        call_command('populate_mcc', file=self.write_csv('0742,Vets,Vets,Vets,Vets,Yes\n'), stdout=StringIO())
+        path = self.write_csv('0742,Veterinary,Vets,Vets,Veterinary Services,Yes\n5411,Grocery,G,G,Grocery,No\n')
+
+        call_command('populate_mcc', file=path, stdout=StringIO())
+
+        self.assertEqual(MerchantCategoryCode.objects.count(), 2)
+        self.assertEqual(MerchantCategoryCode.objects.get(mcc=742).irs_description, 'Veterinary Services')
+        self.assertEqual(DatasetVersion.objects.get(name='mcc').checksum, file_checksum(path))
+
+
+class ImportStatementTests(TestCase):
+    """Test the import_statement command."""
+
+    def test_import_statement(self):
+        """Test a statement file is imported for the user."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        statement = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, statement.name)
+        with statement:
+            statement.write('Date,Description,Amount\n2023-01-05,Cafe,-4.50\n')
+
+        call_command('import_statement', user.email, statement.name, stdout=StringIO())
+
+        self.assertEqual(Transaction.objects.get(user=user).amount.amount, 4.5)
+        with self.assertRaises(CommandError):
+            call_command('import_statement', 'nobody@example.com', statement.name, stdout=StringIO())
+
+
+class LoadFxRatesTests(TestCase):
+    """Test the load_fx_rates command."""
+
+    def test_load_fx_rates(self):
+        """Test the rates of an ECB file are loaded once."""
+        rates = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, rates.name)
+        with rates:
+            rates.write('Date,USD,CAD,\n2023-01-03,1.0545,1.4321,\n')
+
+        call_command('load_fx_rates', rates.name, stdout=StringIO())
+        with self.assertNumQueries(1):
+            call_command('load_fx_rates', rates.name, stdout=StringIO())
+
+        self.assertEqual(ExchangeRate.objects.count(), 2)
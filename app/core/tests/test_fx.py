@@ -0,0 +1,81 @@
+"""
+Tests for the currency conversion.
+"""
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from djmoney.money import Money
+
+from core import fx
+from core.models import ExchangeRate, Transaction
+
+ECB_CSV = """Date,USD,JPY,CAD,CYP,
+2023-01-03,1.0545,139.34,1.4321,N/A,
+2023-01-02,1.0683,140.80,1.4440,N/A,
+"""
+
+
+class FxTests(TestCase):
+    """Test loading exchange rates and converting amounts with them."""
+
+    def setUp(self):
+        fx._rates.clear()
+        fx.load_rates(fx.parse_ecb_csv(io.StringIO(ECB_CSV)))
+
+    def test_parse_ecb_csv(self):
+        """Test the rates of the file are read, without the missing ones."""
+        rates = list(fx.parse_ecb_csv(io.StringIO(ECB_CSV)))
+
+        self.assertEqual(len(rates), 6)
+        self.assertEqual((rates[0].date, rates[0].currency, rates[0].rate),
+                         (date(2023, 1, 3), 'USD', Decimal('1.0545')))
+
+    def test_parse_daily_file(self):
+        """Test the date format of the daily ECB file is read."""
+        rates = list(fx.parse_ecb_csv(io.StringIO('Date, USD, \n03 January 2023, 1.0545, \n')))
+
+        self.assertEqual((rates[0].date, rates[0].currency), (date(2023, 1, 3), 'USD'))
+
+    def test_parse_other_format(self):
+        """Test a file in another format is rejected."""
+        with self.assertRaises(ValueError):
+            list(fx.parse_ecb_csv(io.StringIO('currency,rate\nUSD,1.05\n')))
+
+    def test_load_updates_rates(self):
+        """Test loading rates again updates them."""
+        count = fx.load_rates(iter([ExchangeRate(date=date(2023, 1, 3), currency='USD', rate=Decimal('1.06'))]))
+
+        self.assertEqual(count, 1)
+        self.assertEqual(ExchangeRate.objects.count(), 6)
+        self.assertEqual(ExchangeRate.objects.get(date=date(2023, 1, 3), currency='USD').rate, Decimal('1.06'))
+
+    def test_convert(self):
+        """Test amounts are converted through the euro, with the latest rates on their date."""
+        self.assertEqual(fx.convert(Decimal('100'), 'EUR', 'USD', date(2023, 1, 3)), Decimal('105.45'))
+        self.assertEqual(fx.convert(Decimal('143.21'), 'CAD', 'EUR', date(2023, 1, 3)), Decimal('100.00'))
+        self.assertEqual(fx.convert(Decimal('105.45'), 'USD', 'CAD', date(2023, 1, 7)), Decimal('143.21'))
+        self.assertIsNone(fx.convert(Decimal('1'), 'USD', 'CAD', date(2022, 12, 31)))
+        self.assertIsNone(fx.convert(Decimal('1'), 'GBP', 'CAD', date(2023, 1, 3)))
+
+    def test_rates_cached(self):
+        """Test a rate is read once for a date and currency pair."""
+        with self.assertNumQueries(1):
+            fx.get_rate('USD', 'CAD', date(2023, 1, 3))
+            fx.get_rate('USD', 'CAD', date(2023, 1, 3))
+            fx.get_rate('CAD', 'CAD', date(2023, 1, 3))
+
+    def test_converted_expression(self):
+        """Test the database converts the amounts with the rates of their dates."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        for amount, authorized_date in [(Money(100, 'USD'), date(2023, 1, 2)), (Money(100, 'USD'), date(2023, 1, 5)),
+                                        (Money(100, 'CAD'), date(2023, 1, 5)), (Money(100, 'GBP'), date(2023, 1, 5))]:
+            Transaction.objects.create(user=user, amount=amount, authorized_date=authorized_date)
+
+        amounts = Transaction.objects.filter(user=user).annotate(converted=fx.converted('CAD')) \
+            .order_by('id').values_list('converted', flat=True)
+
+        self.assertEqual([amount if amount is None else round(amount, 2) for amount in amounts],
+                         [Decimal('135.17'), Decimal('135.81'), Decimal('100.00'), None])
@@ -0,0 +1,147 @@
+"""
+Tests for the background geocoding of merchants.
+"""
+from collections import namedtuple
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from geopy.exc import GeocoderTimedOut
+
+from core.geocoding import get_geocode, process_jobs, claim_jobs
+from core.models import TransactionMerchant, GeocodeJob, GeocodedAddress
+
+
+Location = namedtuple('Location', ['latitude', 'longitude'])
+
+
+class StubGeocoder:
+    """Local geocoder resolving the addresses of COORDINATES, recording each query."""
+
+    COORDINATES = {
+        '1 main street, montreal': Location(45.5, -73.5),
+        '2 main street, montreal': Location(45.6, -73.6),
+    }
+    queries = []
+
+    def __init__(self, **options):
+        pass
+
+    def geocode(self, address):
+        StubGeocoder.queries.append(address)
+        if address == 'timeout':
+            raise GeocoderTimedOut()
+        return self.COORDINATES.get(address)
+
+
+@override_settings(GEOCODER_CLASS='core.tests.test_geocoding.StubGeocoder', GEOCODER_MIN_DELAY_SECONDS=0,
+                   GEOCODER_ERROR_WAIT_SECONDS=0)
+class GeocodingTests(TestCase):
+    """Test geocoding jobs."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        StubGeocoder.queries = []
+
+    def create_merchant(self, location, name='Merchant'):
+        return TransactionMerchant.objects.create(user=self.user, name=name, location=location)
+
+    def test_save_queues_job_without_geocoding(self):
+        """Test saving a merchant returns without coordinates and queues a job."""
+        merchant = self.create_merchant('1  Main Street ,Montreal')
+
+        self.assertIsNone(merchant.latitude)
+        self.assertEqual(StubGeocoder.queries, [])
+        self.assertEqual(merchant.geocode_job.address, '1 main street, montreal')
+
+    def test_process_jobs_fills_coordinates(self):
+        """Test the worker geocodes each distinct address once and fills in the merchants."""
+        first = self.create_merchant('1 Main Street, Montreal', name='First')
+        second = self.create_merchant('1 main street, MONTREAL', name='Second')
+        unknown = self.create_merchant('Nowhere', name='Unknown')
+
+        call_command('geocode_merchants')
+
+        self.assertEqual(sorted(StubGeocoder.queries), ['1 main street, montreal', 'nowhere'])
+        for merchant in (first, second):
+            merchant.refresh_from_db()
+            self.assertEqual((merchant.latitude, merchant.longitude), (45.5, -73.5))
+        unknown.refresh_from_db()
+        self.assertIsNone(unknown.latitude)
+        self.assertFalse(GeocodeJob.objects.exists())
+        self.assertTrue(GeocodedAddress.objects.filter(address='nowhere', latitude__isnull=True).exists())
+
+    def test_cached_address_resolved_on_save(self):
+        """Test a cached address is filled in on save without queuing a job."""
+        GeocodedAddress.objects.create(address='2 main street, montreal', latitude=45.6, longitude=-73.6)
+
+        merchant = self.create_merchant('2 Main Street, Montreal')
+
+        self.assertEqual((merchant.latitude, merchant.longitude), (45.6, -73.6))
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_location_change_requeues(self):
+        """Test changing the location clears the coordinates and queues the new address."""
+        merchant = self.create_merchant('1 Main Street, Montreal')
+        call_command('geocode_merchants')
+        merchant.refresh_from_db()
+
+        merchant.location = '2 Main Street, Montreal'
+        merchant.save()
+
+        self.assertIsNone(merchant.latitude)
+        self.assertEqual(GeocodeJob.objects.get().address, '2 main street, montreal')
+
+    def test_move_to_cached_address_drops_pending_job(self):
+        """Test a merchant moved from a queued address to a cached one keeps the cached coordinates."""
+        GeocodedAddress.objects.create(address='2 main street, montreal', latitude=45.6, longitude=-73.6)
+        merchant = self.create_merchant('1 Main Street, Montreal')
+        stale_job = GeocodeJob.objects.get()
+
+        merchant.location = '2 Main Street, Montreal'
+        merchant.save()
+        self.assertFalse(GeocodeJob.objects.exists())
+
+        GeocodeJob.objects.create(merchant=merchant, address=stale_job.address)  # claimed before the move
+        call_command('geocode_merchants')
+
+        merchant.refresh_from_db()
+        self.assertEqual((merchant.latitude, merchant.longitude), (45.6, -73.6))
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_jobs_leased_while_geocoding(self):
+        """Test a batch is leased during geocoding, and a job queued again meanwhile is left for the next batch."""
+        merchant = self.create_merchant('1 Main Street, Montreal')
+        other = self.create_merchant('2 Main Street, Montreal', name='Other')
+        geocode = get_geocode()
+
+        def geocode_and_move(address):
+            if not StubGeocoder.queries:
+                self.assertEqual(claim_jobs(), [])  # another worker finds the batch leased
+            if address == '2 main street, montreal':
+                other.location = '3 Main Street, Montreal'
+                other.save()
+            return geocode(address)
+
+        self.assertEqual(process_jobs(geocode_and_move), 2)
+
+        merchant.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(merchant.latitude, 45.5)
+        self.assertIsNone(other.latitude)
+        job = GeocodeJob.objects.get()
+        self.assertEqual((job.merchant, job.address, job.leased_until), (other, '3 main street, montreal', None))
+
+    def test_failed_job_retried_until_max_attempts(self):
+        """Test geocoder errors keep the job pending until it reaches the maximum attempts."""
+        merchant = self.create_merchant('Timeout')
+        geocode = get_geocode()
+
+        process_jobs(geocode, max_attempts=2)
+        job = GeocodeJob.objects.get(merchant=merchant)
+        self.assertEqual((job.status, job.attempts), (GeocodeJob.Status.PENDING, 1))
+
+        process_jobs(geocode, max_attempts=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (GeocodeJob.Status.FAILED, 2))
+        self.assertEqual(process_jobs(geocode), 0)
@@ -0,0 +1,82 @@
+"""
+Tests that the per-user access patterns are served by their indexes, using the database query plans.
+"""
+from django.test import TestCase
+from django.db import connection
+
+from core.models import Transaction, CreditCardMerchantCategory, MerchantCategoryCode, PaymentCard, \
+    TransactionUserCategory, TransactionMerchant, Tombstone
+
+# SQLite implements unique constraints with automatic indexes instead of named ones
+UNIQUE_CREDIT_CARD_MERCHANT_INDEX = {
+    'sqlite': 'sqlite_autoindex_core_creditcardmerchantcategory',
+}.get(connection.vendor, 'unique_credit_card_merchant')
+MCC_INDEX = {
+    'sqlite': 'sqlite_autoindex_core_merchantcategorycode',
+}.get(connection.vendor, 'core_merchantcategorycode_mcc')
+
+
+class IndexUsageTests(TestCase):
+    """Test query plans use the expected indexes."""
+
+    def explain(self, queryset):
+        """Return the plan of the queryset."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # The tables are nearly empty in tests, don't let the planner prefer a sequential scan
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name, ordered=False):
+        """Assert the plan of the queryset goes through index_name, without sorting if ordered."""
+        plan = self.explain(queryset)
+
+        self.assertIn(index_name, plan)
+        if ordered:
+            self.assertNotRegex(plan, r'TEMP B-TREE|Sort')
+
+    def test_transaction_list(self):
+        """Test the transaction list of a user is read in order from its composite index."""
+        queryset = Transaction.objects.filter(user_id=1).order_by('-authorized_date', '-id')[:50]
+
+        self.assertUsesIndex(queryset, 'transaction_user_date_idx', ordered=True)
+
+    def test_transaction_list_next_page(self):
+        """Test the keyset pagination seek uses the composite index."""
+        queryset = Transaction.objects.filter(
+            user_id=1, authorized_date__lte='2023-01-01').order_by('-authorized_date', '-id')[:50]
+
+        self.assertUsesIndex(queryset, 'transaction_user_date_idx', ordered=True)
+
+    def test_credit_card_category_list(self):
+        """Test the credit card category list of a user is read in order from its composite index."""
+        queryset = CreditCardMerchantCategory.objects.filter(user_id=1).order_by('-id')[:50]
+
+        self.assertUsesIndex(queryset, 'cc_category_user_id_idx', ordered=True)
+
+    def test_credit_card_category_lookup(self):
+        """Test the credit card category lookup of Transaction.save() uses the unique constraint."""
+        queryset = CreditCardMerchantCategory.objects.filter(credit_card_id=1, merchant_id=1)
+
+        self.assertUsesIndex(queryset, UNIQUE_CREDIT_CARD_MERCHANT_INDEX)
+
+    def test_mcc_lookup(self):
+        """Test looking up a merchant category code uses its unique index."""
+        queryset = MerchantCategoryCode.objects.filter(mcc=5411)
+
+        self.assertUsesIndex(queryset, MCC_INDEX)
+
+    def test_sync_changes(self):
+        """Test the objects of a user changed since a watermark are read in order from their indexes."""
+        for model, index_name in [(Transaction, 'transaction_user_updated_idx'),
+                                  (PaymentCard, 'payment_card_user_updated_idx'),
+                                  (TransactionUserCategory, 'user_category_user_updated_idx'),
+                                  (TransactionMerchant, 'merchant_user_updated_idx'),
+                                  (CreditCardMerchantCategory, 'cc_category_user_updated_idx')]:
+            with self.subTest(model=model.__name__):
+                queryset = model.objects.filter(user_id=1, updated_at__gte='2023-01-01').order_by('updated_at')
+
+                self.assertUsesIndex(queryset, index_name, ordered=True)
+
+        queryset = Tombstone.objects.filter(user_id=1, deleted_at__gte='2023-01-01').order_by('deleted_at')
+        self.assertUsesIndex(queryset, 'tombstone_user_deleted_idx', ordered=True)
@@ -0,0 +1,117 @@
+"""
+Tests for the merchant matching and merging.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import merchants
+from core.models import Transaction, TransactionMerchant, PaymentCard, CreditCardMerchantCategory, Tombstone
+
+
+class MerchantIndexTests(TestCase):
+    """Test matching names with the trigram index."""
+
+    def setUp(self):
+        self.index = merchants.MerchantIndex()
+        self.index.add(1, 'Starbucks')
+        self.index.add(2, 'Tim Hortons', 'Toronto, ON')
+        self.index.add(3, 'Starbucks')
+
+    def test_normalize_name(self):
+        """Test store numbers, punctuation and case are ignored."""
+        self.assertEqual(merchants.normalize_name('STARBUCKS #1234  Toronto, ON'), 'starbucks toronto on')
+        self.assertEqual(merchants.normalize_name('###'), '###')
+
+    def test_match(self):
+        """Test names match the oldest identical merchant, or the most similar one at the same location."""
+        self.assertEqual(self.index.match('STARBUCKS #1234'), 1)
+        self.assertEqual(self.index.match('Starbucks Coffee'), 1)
+        self.assertEqual(self.index.match('tim hortons cafe', 'toronto,  on'), 2)
+        self.assertIsNone(self.index.match('Tim Hortons'))
+        self.assertIsNone(self.index.match('Subway'))
+
+
+class MerchantServiceTests(TestCase):
+    """Test resolving names to merchants and merging merchants."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.starbucks = TransactionMerchant.objects.create(user=self.user, name='Starbucks')
+
+    def test_index_follows_changes(self):
+        """Test the index is read from memory until a merchant of the user changes."""
+        merchants.get_index(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertIsNone(merchants.get_index(self.user.id).match('SUBWAY 00123'))
+
+        subway = TransactionMerchant.objects.create(user=self.user, name='Subway')
+        self.assertEqual(merchants.get_index(self.user.id).match('SUBWAY 00123'), subway.id)
+
+        subway.delete()
+        self.assertIsNone(merchants.get_index(self.user.id).match('SUBWAY 00123'))
+
+    def test_resolve(self):
+        """Test names are matched, and the unmatched ones created once per normalized name."""
+        ids = merchants.resolve(self.user, [('STARBUCKS #1', None), ('Subway #1', None), ('SUBWAY #2', None)])
+
+        self.assertEqual(ids[('STARBUCKS #1', None)], self.starbucks.id)
+        self.assertEqual(ids[('Subway #1', None)], ids[('SUBWAY #2', None)])
+        self.assertEqual(TransactionMerchant.objects.filter(user=self.user).count(), 2)
+
+    def test_resolve_ignores_stale_index(self):
+        """Test a cached merchant missing from the database is not returned."""
+        merchants.get_index(self.user.id).add(self.starbucks.id + 1000, 'Subway')  # e.g. by a rolled back transaction
+
+        ids = merchants.resolve(self.user, [('Subway', None)])
+
+        self.assertTrue(TransactionMerchant.objects.filter(id=ids[('Subway', None)], name='Subway').exists())
+
+    def test_merge(self):
+        """Test transactions and categories move to the target, which keeps its category of a shared card."""
+        card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1)
+        other_card = PaymentCard.objects.create(user=self.user, name='Other', card_type='Visa', four_digits=2)
+        duplicate = TransactionMerchant.objects.create(user=self.user, name='STARBUCKS #1234')
+        kept = CreditCardMerchantCategory.objects.create(user=self.user, credit_card=card, merchant=self.starbucks,
+                                                         cash_back=Decimal('5'))
+        CreditCardMerchantCategory.objects.create(user=self.user, credit_card=card, merchant=duplicate,
+                                                  cash_back=Decimal('1'))
+        moved = CreditCardMerchantCategory.objects.create(user=self.user, credit_card=other_card, merchant=duplicate,
+                                                          cash_back=Decimal('2'))
+        first = Transaction.objects.create(user=self.user, merchant=duplicate, payment_card=card, amount=100,
+                                           authorized_date=date(2023, 1, 1))
+        second = Transaction.objects.create(user=self.user, merchant=duplicate, payment_card=other_card, amount=100,
+                                            authorized_date=date(2023, 1, 1))
+
+        self.assertEqual(merchants.merge(self.user, self.starbucks, [duplicate]), 2)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.merchant_id, first.credit_card_category_id, first.cashback_earned),
+                         (self.starbucks.id, kept.id, Decimal('5.00')))
+        self.assertEqual((second.merchant_id, second.credit_card_category_id, second.cashback_earned),
+                         (self.starbucks.id, moved.id, Decimal('2.00')))
+        self.assertEqual(set(CreditCardMerchantCategory.objects.values_list('merchant_id', flat=True)),
+                         {self.starbucks.id})
+        self.assertFalse(TransactionMerchant.objects.filter(id=duplicate.id).exists())
+        self.assertTrue(Tombstone.objects.filter(resource=Tombstone.Resource.MERCHANT,
+                                                 object_id=duplicate.id).exists())
+
+    def test_merge_categorizes_target_transactions(self):
+        """Test the transactions of the target on a card it had no category for get the category moved to it."""
+        card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1)
+        duplicate = TransactionMerchant.objects.create(user=self.user, name='STARBUCKS #1234')
+        moved = CreditCardMerchantCategory.objects.create(user=self.user, credit_card=card, merchant=duplicate,
+                                                          cash_back=Decimal('3'))
+        own = Transaction.objects.create(user=self.user, merchant=self.starbucks, payment_card=card, amount=100,
+                                         authorized_date=date(2023, 1, 1))
+        self.assertIsNone(own.credit_card_category_id)
+
+        self.assertEqual(merchants.merge(self.user, self.starbucks, [duplicate]), 0)
+
+        own.refresh_from_db()
+        self.assertEqual((own.credit_card_category_id, own.cashback_earned), (moved.id, Decimal('3.00')))
@@ -3,6 +3,9 @@ Tests for models.
 """
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+
+from core.models import PaymentCard, TransactionMerchant, CreditCardMerchantCategory
 
 
 def create_user(email='user@example.com', password='testpass123'):
@@ -54,3 +57,13 @@ class ModelTests(TestCase):
 
         self.assertTrue(user.is_superuser)
         self.assertTrue(user.is_staff)
+
+    def test_credit_card_merchant_combination_unique(self):
+        """Test a credit card and merchant combination can only have one category."""
+        user = create_user()
+        card = PaymentCard.objects.create(user=user, name='Card', card_type='Visa', four_digits=1234)
+        merchant = TransactionMerchant.objects.create(user=user, name='Grocer')
+        CreditCardMerchantCategory.objects.create(user=user, credit_card=card, merchant=merchant)
+
+        with self.assertRaises(IntegrityError):
+            CreditCardMerchantCategory.objects.create(user=user, credit_card=card, merchant=merchant)
@@ -0,0 +1,101 @@
+"""
+Tests for the detection of recurring charges.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from djmoney.money import Money
+
+from core import recurring
+from core.models import Transaction, TransactionMerchant, RecurringSeries
+
+
+class AnalyzeTests(TestCase):
+    """Test the vectorized analysis of the charges."""
+
+    def analyze(self, *series):
+        """Analyze series of (day, amount) charges, each one a group."""
+        groups = np.concatenate([np.full(len(charges), i) for i, charges in enumerate(series)])
+        days = np.array([day for charges in series for day, _ in charges], dtype=np.int64)
+        amounts = np.array([amount for charges in series for _, amount in charges], dtype=np.float64)
+        return recurring.analyze(groups, days, amounts)
+
+    def test_monthly_series(self):
+        """Test monthly charges with one late payment and one different amount are recurring."""
+        found, cadences, amounts = self.analyze([(0, 10), (31, 10), (59, 10), (92, 10), (120, 12.5), (151, 10)])
+
+        self.assertEqual(list(found), [True])
+        self.assertEqual(recurring.CADENCES[cadences[0]][0], RecurringSeries.Cadence.MONTHLY)
+        self.assertEqual(amounts[0], 10)
+
+    def test_irregular_series(self):
+        """Test charges at irregular intervals, with unstable amounts or too few are not recurring."""
+        found, _, _ = self.analyze(
+            [(0, 10), (3, 10), (40, 10), (52, 10), (140, 10)],
+            [(0, 10), (7, 35), (14, 4), (21, 80)],
+            [(0, 10), (7, 10)],
+        )
+
+        self.assertEqual(list(found), [False, False, False])
+
+    def test_several_series(self):
+        """Test each group is analyzed on its own."""
+        found, cadences, _ = self.analyze([(day, 5) for day in range(0, 70, 7)], [(0, 1), (1, 1), (2, 1)],
+                                          [(day, 99) for day in range(0, 1100, 365)])
+
+        self.assertEqual(list(found), [True, False, True])
+        self.assertEqual([recurring.CADENCES[cadences[i]][0] for i in (0, 2)], ['weekly', 'yearly'])
+
+
+class DetectTests(TestCase):
+    """Test detecting and storing the recurring series of the users."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.netflix = TransactionMerchant.objects.create(user=self.user, name='Netflix')
+        self.grocer = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        for month in range(1, 6):
+            self.create(self.netflix, 15.99, date(2023, month, 31 if month in (1, 3, 5) else 28 + (month == 4)))
+        for day in (2, 3, 11, 26, 40, 41, 90):
+            self.create(self.grocer, 30 + day, date(2023, 1, 1) + timedelta(days=day))
+
+    def create(self, merchant, amount, authorized_date, currency='CAD'):
+        return Transaction.objects.create(user=self.user, merchant=merchant, amount=Money(amount, currency),
+                                          authorized_date=authorized_date)
+
+    def test_detect(self):
+        """Test the monthly subscription is found, with its next expected charge."""
+        self.assertEqual(recurring.detect([self.user.id]), 1)
+
+        series = RecurringSeries.objects.get(user=self.user)
+        self.assertEqual((series.merchant, series.cadence, series.amount, series.occurrences),
+                         (self.netflix, RecurringSeries.Cadence.MONTHLY, Decimal('15.99'), 5))
+        self.assertEqual((series.last_date, series.next_date), (date(2023, 5, 31), date(2023, 6, 30)))
+
+    def test_detect_replaces_series(self):
+        """Test detecting again replaces the series of the user, and currencies are analyzed apart."""
+        recurring.detect([self.user.id])
+        for month in range(1, 4):
+            self.create(self.netflix, 20, date(2023, month, 15), currency='USD')
+
+        call_command('detect_recurring', stdout=StringIO())
+
+        self.assertEqual(sorted(RecurringSeries.objects.filter(user=self.user).values_list('currency', flat=True)),
+                         ['CAD', 'USD'])
+
+    def test_upcoming_charges(self):
+        """Test the expected charges of the next days are listed, and ended series are not."""
+        recurring.detect([self.user.id])
+
+        charges = recurring.upcoming_charges(self.user, days=62, today=date(2023, 6, 1))
+        self.assertEqual([charge['date'] for charge in charges], [date(2023, 6, 30), date(2023, 7, 31)])
+        self.assertEqual(charges[0]['merchant_name'], 'Netflix')
+
+        charges = recurring.upcoming_charges(self.user, today=date(2023, 7, 10))  # the June charge is late
+        self.assertEqual([charge['date'] for charge in charges], [date(2023, 6, 30), date(2023, 7, 31)])
+        self.assertEqual(recurring.upcoming_charges(self.user, today=date(2023, 9, 1)), [])  # ended
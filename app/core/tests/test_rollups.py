@@ -0,0 +1,112 @@
+"""
+Tests for the incremental maintenance of the monthly spend rollups.
+"""
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from djmoney.money import Money
+
+from core.models import Transaction, TransactionUserCategory, PaymentCard, MonthlySpendRollup
+
+
+def rollup_totals(user):
+    """Return the non empty rollups of the user as comparable tuples."""
+    return sorted(MonthlySpendRollup.objects.filter(user=user, count__gt=0).values_list(
+        'month', 'user_category', 'payment_card', 'currency', 'spend', 'income', 'count'), key=str)
+
+
+class MonthlySpendRollupTests(TestCase):
+    """Test the rollups follow the transactions."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+
+    def create(self, amount, authorized_date=date(2023, 1, 15), **params):
+        return Transaction.objects.create(user=self.user, amount=amount, authorized_date=authorized_date, **params)
+
+    def assertRollupsMatchRebuild(self):
+        """Assert the incrementally maintained rollups equal a rebuild from the transactions."""
+        incremental = rollup_totals(self.user)
+        MonthlySpendRollup.objects.rebuild(users=[self.user])
+        self.assertEqual(incremental, rollup_totals(self.user))
+
+    def test_create_adds_to_rollup(self):
+        """Test creating transactions adds to the rollup of their month, category and card."""
+        self.create(10, user_category=self.food, payment_card=self.card)
+        self.create(Decimal('2.50'), date(2023, 1, 31), user_category=self.food, payment_card=self.card)
+        self.create(100, type=Transaction.TransactionType.INCOME, user_category=self.food, payment_card=self.card)
+
+        rollup = MonthlySpendRollup.objects.get(user=self.user)
+        self.assertEqual(rollup.month, date(2023, 1, 1))
+        self.assertEqual((rollup.spend, rollup.income, rollup.count), (Decimal('12.50'), Decimal('100.00'), 3))
+
+    def test_update_moves_between_rollups(self):
+        """Test changing the amount, date, category or currency moves the amount between rollups."""
+        transaction = self.create(10, user_category=self.food)
+        self.create(5)
+
+        transaction.amount = Money(20, 'USD')
+        transaction.authorized_date = date(2023, 2, 1)
+        transaction.user_category = None
+        transaction.save()
+
+        self.assertEqual(rollup_totals(self.user), [
+            (date(2023, 1, 1), None, None, 'CAD', Decimal('5.00'), Decimal('0.00'), 1),
+            (date(2023, 2, 1), None, None, 'USD', Decimal('20.00'), Decimal('0.00'), 1),
+        ])
+        self.assertRollupsMatchRebuild()
+
+    def test_delete_removes_from_rollup(self):
+        """Test deleting a transaction removes it from its rollup."""
+        transaction = self.create(10)
+        self.create(7)
+
+        transaction.delete()
+
+        self.assertEqual(MonthlySpendRollup.objects.get(user=self.user).spend, Decimal('7.00'))
+        self.assertRollupsMatchRebuild()
+
+    def test_deleted_card_moves_to_no_card(self):
+        """Test deleting a payment card rebuilds the rollups under no card."""
+        self.create(10, payment_card=self.card)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.card.delete()
+
+        self.assertEqual(rollup_totals(self.user),
+                         [(date(2023, 1, 1), None, None, 'CAD', Decimal('10.00'), Decimal('0.00'), 1)])
+
+    def test_rebuild_command(self):
+        """Test the rebuild command recomputes drifted rollups."""
+        self.create(10, user_category=self.food)
+        MonthlySpendRollup.objects.update(spend=0)
+
+        call_command('rebuild_spend_rollup')
+
+        self.assertEqual(MonthlySpendRollup.objects.get(user=self.user).spend, Decimal('10.00'))
+
+    def test_reconcile_command(self):
+        """Test the reconcile command fixes the drifted rollups only, and reports them with --dry-run."""
+        self.create(10, user_category=self.food)
+        self.create(4, date(2023, 2, 1))
+        MonthlySpendRollup.objects.filter(month=date(2023, 1, 1)).update(spend=3, count=5)
+        MonthlySpendRollup.objects.create(user=self.user, month=date(2023, 3, 1), currency='CAD', spend=1, count=1)
+
+        out = StringIO()
+        call_command('reconcile_spend_rollup', '--dry-run', stdout=out)
+        self.assertIn('2 drifted monthly rollups found', out.getvalue())
+        self.assertEqual(MonthlySpendRollup.objects.get(month=date(2023, 1, 1)).spend, Decimal('3.00'))
+
+        call_command('reconcile_spend_rollup', user=[self.user.id], stdout=StringIO())
+
+        self.assertEqual(rollup_totals(self.user), [
+            (date(2023, 1, 1), self.food.id, None, 'CAD', Decimal('10.00'), Decimal('0.00'), 1),
+            (date(2023, 2, 1), None, None, 'CAD', Decimal('4.00'), Decimal('0.00'), 1),
+        ])
+        self.assertEqual(MonthlySpendRollup.objects.reconcile([self.user.id]), [])
@@ -0,0 +1,17 @@
+"""
+URL mappings for the async views of the transaction app, served under /api/async/transaction/.
+"""
+from django.urls import path
+
+from transaction import async_views
+
+app_name = 'async-transaction'
+
+urlpatterns = [
+    path('transactions/', async_views.transaction_list, name='transaction-list'),
+    path('transactions/<int:pk>/', async_views.transaction_detail, name='transaction-detail'),
+    path('reports/', async_views.spending_report, name='report'),
+    path('reports/rewards/', async_views.rewards_report, name='rewards-report'),
+    path('merchant-category-codes/', async_views.mcc_list, name='merchantcategorycode-list'),
+    path('merchant-category-codes/<int:mcc_code>/', async_views.mcc_detail, name='merchantcategorycode-detail'),
+]
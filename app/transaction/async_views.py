@@ -0,0 +1,163 @@
+"""
+Async views of the hot read endpoints: the transaction list and detail, the spending and rewards reports and the
+merchant category codes.
+
+They answer the same requests as the sync views of transaction.views, with the same representations, and read with
+the async ORM. Served under ASGI (app/asgi.py, with uvicorn), a request waiting for the database holds no worker: one
+process serves many concurrent requests, where a WSGI worker serves one at a time. The rows are fully loaded before
+being serialized, so the DRF serializers run no query. DRF views are sync only, hence plain Django views handling
+the token authentication, the ETags and the errors the way the sync views do.
+"""
+import functools
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import status
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import APIException, NotAuthenticated, AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from core import fx, mcc
+from core.authentication import aauthenticate
+from core.models import Transaction, CollectionVersion
+from core.pagination import KeysetPagination
+from transaction import serializers, reports
+from transaction.views import TransactionViewSet, format_collection_etag
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, safe=False)
+
+
+def async_api_view(view):
+    """Make an async view answer GET requests of authenticated users, with the errors of the DRF views."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = _json({'detail': f'Method "{request.method}" not allowed.'},
+                             status.HTTP_405_METHOD_NOT_ALLOWED)
+            response['Allow'] = 'GET, HEAD'
+            return response
+
+        auth = await aauthenticate(request)
+        if auth is None:
+            error = AuthenticationFailed() if get_authorization_header(request) else NotAuthenticated()
+            response = _json({'detail': error.detail}, error.status_code)
+            response['WWW-Authenticate'] = 'Token'
+            return response
+        request.user, request.auth = auth
+
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as e:
+            return _json({'detail': e.detail} if isinstance(e.detail, str) else e.detail, e.status_code)
+    return wrapper
+
+
+async def _collection_etag(request):
+    """Async transaction.views.collection_etag(), the async views rendering JSON only."""
+    version = await CollectionVersion.objects.aget_version(request.user.id)
+    return format_collection_etag(request.user.id, version, f'{request.get_full_path()} json')
+
+
+async def _conditional(request, etag, build):
+    """Return 304 Not Modified when the client has the etag, or else the response of the coroutine function build."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await build()
+    response['ETag'] = etag
+    return response
+
+
+class _BadRequest(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+def _params(serializer_class, request):
+    """Return the validated query parameters, raising their errors as a 400 response."""
+    params = serializer_class(data=request.GET)
+    if not params.is_valid():
+        raise _BadRequest(params.errors)
+    return params.validated_data
+
+
+@async_api_view
+async def transaction_list(request):
+    """List the transactions of the user, like TransactionViewSet.list: keyset paginated, newest first."""
+    async def build():
+        queryset = Transaction.objects.filter(user=request.user) \
+            .select_related('merchant', 'payment_card', 'user_category', 'credit_card_category')
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(queryset, Request(request), view=TransactionViewSet)
+        data = serializers.TransactionSerializer(page, many=True, context={'request': request}).data
+        return _json(paginator.get_paginated_response(data).data)
+
+    return await _conditional(request, await _collection_etag(request), build)
+
+
+@async_api_view
+async def transaction_detail(request, pk):
+    """Retrieve a transaction of the user, like TransactionViewSet.retrieve."""
+    try:
+        transaction = await Transaction.objects.filter(user=request.user) \
+            .select_related('merchant', 'payment_card', 'user_category', 'credit_card_category') \
+            .prefetch_related('children').aget(pk=pk)
+    except Transaction.DoesNotExist:
+        return _json({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+
+    if transaction.amount:  # cached for the home_amount of the serializer
+        await fx.aget_rate(str(transaction.amount.currency), request.user.home_currency,
+                           transaction.authorized_date)
+    return _json(serializers.TransactionDetailSerializer(transaction, context={'request': request}).data)
+
+
+@async_api_view
+async def spending_report(request):
+    """Return the rows of the spending report, like SpendingReportView."""
+    params = _params(serializers.SpendingReportQuerySerializer, request)
+    convert = params.pop('convert')
+
+    async def build():
+        rows = await reports.aspending_report(
+            request.user, currency=request.user.home_currency if convert else None, **params)
+        return _json(serializers.SpendingReportSerializer(rows, many=True).data)
+
+    return await _conditional(request, await _collection_etag(request), build)
+
+
+@async_api_view
+async def rewards_report(request):
+    """Return the rows of the rewards report, like RewardsReportView."""
+    params = _params(serializers.RewardsReportQuerySerializer, request)
+
+    async def build():
+        rows = await reports.arewards_report(request.user, **params)
+        return _json(serializers.RewardsReportSerializer(rows, many=True).data)
+
+    return await _conditional(request, await _collection_etag(request), build)
+
+
+@async_api_view
+async def mcc_list(request):
+    """List the merchant category codes, all of them or those matching the search, like MerchantCategoryCodeViewSet."""
+    index = await mcc.aget_index()
+
+    async def build():
+        return _json(index.search(request.GET.get('search', '')))
+
+    return await _conditional(request, index.etag, build)
+
+
+@async_api_view
+async def mcc_detail(request, mcc_code):
+    """Retrieve a merchant category code by its number."""
+    index = await mcc.aget_index()
+
+    async def build():
+        code = index.by_mcc.get(mcc_code)
+        if code is None:
+            return _json({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+        return _json(code)
+
+    return await _conditional(request, index.etag, build)
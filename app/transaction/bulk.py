@@ -0,0 +1,128 @@
+"""
+Batched creation of transactions for the bulk import API.
+"""
+import csv
+import io
+
+from django.db import transaction as db_transaction
+from djmoney.money import Money
+
+from core import categorization, merchants
+from core.models import Transaction, TransactionUserCategory, PaymentCard, CreditCardMerchantCategory, \
+    MonthlySpendRollup, CollectionVersion
+from transaction.serializers import TransactionBulkRowSerializer
+
+BULK_CREATE_BATCH_SIZE = 500
+
+# CSV columns holding the merchant fields of a row
+CSV_MERCHANT_COLUMNS = {'merchant_name': 'name', 'merchant_location': 'location'}
+
+
+def rows_from_csv(csv_file):
+    """Yield bulk import rows from an uploaded CSV file, empty cells being left out."""
+    reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding='utf-8-sig'))
+    for row in reader:
+        row = {column: value for column, value in row.items() if column and value not in (None, '')}
+        merchant = {field: row.pop(column) for column, field in CSV_MERCHANT_COLUMNS.items() if column in row}
+        if merchant:
+            row['merchant'] = merchant
+        yield row
+
+
+def _owned_ids(model, user, ids):
+    """Return the subset of ids that belong to the user, in one query."""
+    if not ids:
+        return set()
+    return set(model.objects.filter(user=user, id__in=ids).values_list('id', flat=True))
+
+
+def _merchant_key(merchant):
+    return merchant['name'], merchant.get('location') or None
+
+
+def _credit_card_categories(user, pairs):
+    """Map (credit card id, merchant id) pairs to their credit card category id, in one query."""
+    if not pairs:
+        return {}
+    categories = CreditCardMerchantCategory.objects.filter(
+        user=user,
+        credit_card_id__in={card_id for card_id, _ in pairs},
+        merchant_id__in={merchant_id for _, merchant_id in pairs},
+    ).values_list('credit_card_id', 'merchant_id', 'id')
+    return {(card_id, merchant_id): category_id for card_id, merchant_id, category_id in categories}
+
+
+def save_transactions(user, transactions):
+    """Insert new transactions of the user, doing what Transaction.save() and the signals do for one.
+
+    Must run in a database transaction. Return the created transactions.
+    """
+    categorizer = categorization.get_categorizer(user.id)
+    for t in transactions:
+        if not t.user_category_id and not t.parent_id:
+            t.user_category_id = categorizer.categorize(t.merchant_id, t.details, t.amount.amount)
+
+    # Same rule as Transaction.save(): the category follows the (payment card, merchant) combination
+    categories = _credit_card_categories(user, {(t.payment_card_id, t.merchant_id) for t in transactions
+                                                if t.payment_card_id and t.merchant_id})
+    for t in transactions:
+        t.credit_card_category_id = categories.get((t.payment_card_id, t.merchant_id))
+
+    created = Transaction.objects.bulk_create(transactions, batch_size=BULK_CREATE_BATCH_SIZE)
+    MonthlySpendRollup.objects.add(created)  # bulk_create skips the signals maintaining the rollups
+    Transaction.objects.filter(id__in=[transaction.id for transaction in created]).update_rewards()
+    CollectionVersion.objects.bump_on_commit(user.id)
+    return created
+
+
+def bulk_create_transactions(user, rows):
+    """Validate rows and insert the valid ones for the user in a single database transaction.
+
+    Invalid rows do not abort the batch, they are reported as {'row': index, 'errors': {...}}.
+    Return the created transactions and the list of row errors.
+    """
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = TransactionBulkRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'row': index, 'errors': serializer.errors})
+
+    owned = {
+        'payment_card': _owned_ids(PaymentCard, user, {data['payment_card'] for _, data in valid
+                                                       if data.get('payment_card') is not None}),
+        'user_category': _owned_ids(TransactionUserCategory, user, {data['user_category'] for _, data in valid
+                                                                    if data.get('user_category') is not None}),
+    }
+    rows_to_create = []
+    for index, data in valid:
+        row_errors = {field: [f'Invalid pk "{data[field]}" - object does not exist.']
+                      for field, ids in owned.items() if data.get(field) is not None and data[field] not in ids}
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+        else:
+            rows_to_create.append(data)
+
+    with db_transaction.atomic():
+        # Names are matched to the merchants of the user, the unmatched ones created with one bulk insert
+        merchant_ids = merchants.resolve(user, {_merchant_key(data['merchant']) for data in rows_to_create
+                                                if data.get('merchant')})
+
+        transactions = []
+        for data in rows_to_create:
+            transactions.append(Transaction(
+                user=user,
+                payment_card_id=data.get('payment_card'),
+                user_category_id=data.get('user_category'),
+                merchant_id=merchant_ids[_merchant_key(data['merchant'])] if data.get('merchant') else None,
+                type=data['type'],
+                amount=Money(data['amount'], data['amount_currency']),
+                authorized_date=data['authorized_date'],
+                details=data['details'],
+            ))
+
+        created = save_transactions(user, transactions)
+
+    errors.sort(key=lambda error: error['row'])
+    return created, errors
@@ -0,0 +1,72 @@
+"""
+Streaming export of the transaction history of a user.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Transaction
+
+CHUNK_SIZE = 2000
+
+# Exported columns: name in the file, and field of the query, related names being joined by the query
+COLUMNS = [
+    ('id', 'id'),
+    ('authorized_date', 'authorized_date'),
+    ('type', 'type'),
+    ('amount', 'amount'),
+    ('amount_currency', 'amount_currency'),
+    ('merchant', 'merchant__name'),
+    ('merchant_location', 'merchant__location'),
+    ('payment_card', 'payment_card__name'),
+    ('user_category', 'user_category__name'),
+    ('mcc', 'credit_card_category__mcc__mcc'),
+    ('cashback_earned', 'cashback_earned'),
+    ('points_earned', 'points_earned'),
+    ('parent', 'parent_id'),
+    ('has_children', 'has_children'),
+    ('details', 'details'),
+]
+HEADER = [name for name, _ in COLUMNS]
+
+
+def export_rows(user, start_date=None, end_date=None):
+    """Yield the transactions of the user as tuples of COLUMNS, oldest first.
+
+    The rows are read from a server-side cursor in chunks, so memory does not grow with the history.
+    """
+    queryset = Transaction.objects.filter(user=user)
+    if start_date:
+        queryset = queryset.filter(authorized_date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(authorized_date__lte=end_date)
+
+    return queryset.order_by('authorized_date', 'id').values_list(*[field for _, field in COLUMNS]) \
+        .iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer to build lines one by one."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(HEADER, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+# Export formats: content type and line generator
+FORMATS = {
+    'csv': ('text/csv', stream_csv),
+    'ndjson': ('application/x-ndjson', stream_ndjson),
+}
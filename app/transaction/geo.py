@@ -0,0 +1,99 @@
+"""
+Geospatial queries on the merchant coordinates, on plain PostgreSQL or SQLite.
+
+Nearby merchants are prefiltered by the bounding box of the search circle, which the (user, latitude, longitude)
+index answers, then refined with the haversine distance. The spend map is aggregated by the database on a grid of
+cells of a given size in degrees, so that the client only receives one row per cell and currency.
+"""
+import math
+
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Floor
+
+from core.models import Transaction, TransactionMerchant
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180  # along a meridian
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+    """Return the great-circle distance between two points in kilometers."""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min latitude, max latitude, min longitude, max longitude) of a box around a circle.
+
+    The longitudes go past -180 or 180 when the box crosses the antimeridian, and span 360 degrees when it reaches a
+    pole.
+    """
+    d_latitude = radius_km / KM_PER_DEGREE
+    if abs(latitude) + d_latitude >= 90:
+        return max(-90, latitude - d_latitude), min(90, latitude + d_latitude), -180, 180
+    # The circle is widest north of the center in the northern hemisphere, hence asin rather than a plain division
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))
+    d_longitude = math.degrees(math.asin(min(1, ratio)))
+    return latitude - d_latitude, latitude + d_latitude, longitude - d_longitude, longitude + d_longitude
+
+
+def longitude_filter(min_longitude, max_longitude, field='longitude'):
+    """Return the condition on a longitude field for a range that may cross the antimeridian."""
+    if max_longitude - min_longitude >= 360:
+        return Q()
+    if min_longitude < -180:
+        return Q(**{f'{field}__gte': min_longitude + 360}) | Q(**{f'{field}__lte': max_longitude})
+    if max_longitude > 180:
+        return Q(**{f'{field}__gte': min_longitude}) | Q(**{f'{field}__lte': max_longitude - 360})
+    return Q(**{f'{field}__range': (min_longitude, max_longitude)})
+
+
+def nearby_merchants(user, latitude, longitude, radius_km=1, limit=20):
+    """Return the geocoded merchants of the user within radius_km of a point, nearest first.
+
+    Each merchant has its distance_km set.
+    """
+    min_latitude, max_latitude, min_longitude, max_longitude = bounding_box(latitude, longitude, radius_km)
+    candidates = TransactionMerchant.objects.filter(user=user, latitude__range=(min_latitude, max_latitude)) \
+        .filter(longitude_filter(min_longitude, max_longitude))
+
+    merchants = []
+    for merchant in candidates:
+        merchant.distance_km = haversine_km(latitude, longitude, merchant.latitude, merchant.longitude)
+        if merchant.distance_km <= radius_km:
+            merchants.append(merchant)
+    merchants.sort(key=lambda merchant: (merchant.distance_km, merchant.id))
+    return merchants[:limit]
+
+
+def spend_heatmap(user, cell_size=0.01, min_latitude=None, max_latitude=None, min_longitude=None,
+                  max_longitude=None, start_date=None, end_date=None):
+    """Return the spend per cell of a grid and currency, computed in one query.
+
+    A cell is identified by the indexes of its south-west corner: floor(latitude / cell_size) and
+    floor(longitude / cell_size). Split transactions are counted through their parts, like in the spending reports.
+    """
+    transactions = Transaction.objects.filter(user=user, has_children=False, type=Transaction.TransactionType.EXPENSE,
+                                              merchant__latitude__isnull=False, merchant__longitude__isnull=False)
+    if min_latitude is not None:
+        transactions = transactions.filter(merchant__latitude__range=(min_latitude, max_latitude)) \
+            .filter(longitude_filter(min_longitude, max_longitude, field='merchant__longitude'))
+    if start_date:
+        transactions = transactions.filter(authorized_date__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(authorized_date__lte=end_date)
+
+    size = Value(cell_size, output_field=FloatField())
+    rows = transactions.values(
+        row=Floor(F('merchant__latitude') / size), column=Floor(F('merchant__longitude') / size),
+        currency=F('amount_currency'),
+    ).annotate(spend=Sum('amount'), count=Count('id'), merchants=Count('merchant', distinct=True)) \
+        .order_by('row', 'column', 'currency')
+
+    return [{
+        'latitude': (row.pop('row') + 0.5) * cell_size,  # center of the cell
+        'longitude': (row.pop('column') + 0.5) * cell_size,
+        **row,
+    } for row in rows]
@@ -0,0 +1,278 @@
+"""
+Streaming import of bank statements: CSV files in one of the LAYOUTS, or OFX/QFX files.
+
+A statement goes through a pipeline of generators: the text is read lazily, parsed into records, and the records
+are written in chunks of CHUNK_SIZE with one database transaction per chunk. Besides the current chunk, an import
+keeps in memory the hashes of the transactions already recorded on the dates seen so far, so that files of any size
+can be imported. Merchant names are resolved with the cached index of core.merchants.
+"""
+import csv
+import hashlib
+import io
+import re
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction as db_transaction
+from djmoney.money import Money
+from djmoney.settings import CURRENCY_CHOICES
+
+from core import merchants, recurring
+from core.models import Transaction
+from transaction.bulk import save_transactions
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 100  # row errors reported, the others are only counted
+OFX_READ_SIZE = 1 << 16
+CENT = Decimal('0.01')
+MAX_AMOUNT = 10 ** 8  # Transaction.amount has 10 digits with 2 decimal places
+CURRENCIES = {code for code, _ in CURRENCY_CHOICES}
+
+# CSV layouts, matched on the header row (case insensitive): the column of each field and the date format. The
+# amount is either one signed column, negative for expenses, or separate debit and credit columns.
+LAYOUTS = {
+    'generic': {
+        'columns': {'date': 'date', 'description': 'description', 'amount': 'amount'},
+        'date_format': '%Y-%m-%d',
+    },
+    'debit_credit': {
+        'columns': {'date': 'date', 'description': 'description', 'debit': 'debit', 'credit': 'credit'},
+        'date_format': '%Y-%m-%d',
+    },
+    'posting_date': {
+        'columns': {'date': 'posting date', 'description': 'description', 'amount': 'amount'},
+        'date_format': '%m/%d/%Y',
+    },
+}
+# Columns read when present, whatever the layout
+OPTIONAL_COLUMNS = {'currency': 'currency', 'details': 'memo'}
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class StatementError(Exception):
+    """Raised for a statement file that cannot be imported."""
+
+
+def _text(statement_file):
+    """Return a text stream over a binary file, decoded as it is read."""
+    return io.TextIOWrapper(statement_file, encoding='utf-8-sig', errors='replace', newline='')
+
+
+def is_ofx(statement_file):
+    """Return whether a binary file is an OFX/QFX statement, looking at its first bytes only."""
+    head = statement_file.read(1024)
+    statement_file.seek(0)
+    return b'OFXHEADER' in head or b'<OFX>' in head.upper()
+
+
+def detect_layout(header):
+    """Return the name of the first layout whose columns are all in the header."""
+    for name, layout in LAYOUTS.items():
+        if set(layout['columns'].values()) <= set(header):
+            return name
+    raise StatementError(f'Unknown CSV layout, expected the columns of one of: {", ".join(LAYOUTS)}.')
+
+
+def csv_records(text, layout=None):
+    """Yield (row number, fields) for the rows of a CSV statement."""
+    reader = csv.reader(text)
+    header = [column.strip().lower() for column in next(reader, [])]
+    layout = LAYOUTS[layout or detect_layout(header)]
+    positions = {column: i for i, column in enumerate(header)}
+    missing = set(layout['columns'].values()) - set(positions)
+    if missing:
+        raise StatementError(f'Missing CSV columns: {", ".join(sorted(missing))}.')
+
+    columns = {**{field: column for field, column in OPTIONAL_COLUMNS.items() if column in positions},
+               **layout['columns']}
+    for row_number, row in enumerate(reader, start=2):
+        if not any(row):
+            continue
+        fields = {field: row[positions[column]] if positions[column] < len(row) else ''
+                  for field, column in columns.items()}
+        fields['date_format'] = layout['date_format']
+        yield row_number, fields
+
+
+def _ofx_tags(text):
+    """Yield (closing, tag, text) for the tags of an OFX document, reading it in blocks."""
+    rest = ''
+    while block := text.read(OFX_READ_SIZE):
+        rest += block
+        end = rest.rfind('<')  # the last tag may be incomplete
+        if end < 0:
+            continue
+        yield from ((m[1] == '/', m[2].upper(), m[3].strip()) for m in _OFX_TAG.finditer(rest, 0, end))
+        rest = rest[end:]
+    yield from ((m[1] == '/', m[2].upper(), m[3].strip()) for m in _OFX_TAG.finditer(rest))
+
+
+def ofx_records(text):
+    """Yield (transaction number, fields) for the transactions of an OFX statement.
+
+    Both the SGML (OFX 1.x, leaf elements without end tags) and XML (OFX 2.x) formats are read.
+    """
+    currency, record, number = None, None, 0
+    for closing, tag, value in _ofx_tags(text):
+        if tag == 'CURDEF' and not closing:
+            currency = value
+        elif tag == 'STMTTRN':
+            if closing and record is not None:
+                number += 1
+                yield number, {
+                    'date': record.get('DTPOSTED', '')[:8],
+                    'date_format': '%Y%m%d',
+                    'amount': record.get('TRNAMT', ''),
+                    'description': record.get('NAME') or record.get('PAYEE') or record.get('MEMO', ''),
+                    'details': record.get('MEMO', ''),
+                    'currency': record.get('CURRENCY') or currency or '',
+                }
+            record = None if closing else {}
+        elif record is not None and not closing and value:
+            record[tag] = value
+
+
+def _amount(value):
+    """Return the decimal of an amount cell, reading currency symbols, thousands separators and (negatives)."""
+    value = value.strip().replace(',', '').replace('$', '').replace(' ', '')
+    negative = value.startswith('(') and value.endswith(')')
+    try:
+        amount = Decimal(value.strip('()') or 0).quantize(CENT)
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount "{value}".')
+    return -amount if negative else amount
+
+
+def parse_record(fields, default_currency):
+    """Return the transaction fields of a statement record, raising ValueError for invalid values."""
+    try:
+        authorized_date = datetime.strptime(fields['date'].strip(), fields['date_format']).date()
+    except ValueError:
+        raise ValueError(f'Invalid date "{fields["date"]}", expected the format {fields["date_format"]}.')
+    if 'amount' in fields:
+        amount = _amount(fields['amount'])
+    else:
+        amount = _amount(fields['credit']) - _amount(fields['debit'])
+    if abs(amount) >= MAX_AMOUNT:
+        raise ValueError(f'Amount {amount} is too large.')
+
+    currency = (fields.get('currency') or default_currency).strip().upper()
+    if currency not in CURRENCIES:
+        raise ValueError(f'Invalid currency "{currency}".')
+
+    return {
+        'authorized_date': authorized_date,
+        'type': Transaction.TransactionType.EXPENSE if amount < 0 else Transaction.TransactionType.INCOME,
+        'amount': abs(amount),
+        'amount_currency': currency,
+        'merchant_name': ' '.join(fields['description'].split())[:100],
+        'details': fields.get('details', '').strip(),
+    }
+
+
+def record_hash(authorized_date, transaction_type, amount, currency, merchant_id):
+    """Return the deduplication hash of a transaction: its date, amount and merchant."""
+    amount = Decimal(amount).quantize(CENT)
+    key = f'{authorized_date.isoformat()}|{transaction_type}|{amount}|{currency}|{merchant_id}'
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class StatementImport:
+    """Import of the records of one statement for a user, in chunks."""
+
+    def __init__(self, user, default_currency='CAD', payment_card_id=None):
+        self.user = user
+        self.default_currency = default_currency
+        self.payment_card_id = payment_card_id
+        self.recorded = Counter()  # hashes of the transactions recorded on the dates seen, before this import
+        self.loaded_dates = set()
+        self.result = {'created': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+
+    def _error(self, row_number, message):
+        self.result['error_count'] += 1
+        if len(self.result['errors']) < MAX_ERRORS:
+            self.result['errors'].append({'row': row_number, 'errors': [message]})
+
+    def _parsed(self, records):
+        for row_number, fields in records:
+            try:
+                yield parse_record(fields, self.default_currency)
+            except ValueError as e:
+                self._error(row_number, str(e))
+
+    def _load_recorded(self, dates):
+        """Count the hashes of the transactions of the user on dates not seen yet, in one query."""
+        dates = dates - self.loaded_dates
+        if not dates:
+            return
+        transactions = Transaction.objects.filter(user=self.user, authorized_date__in=dates, parent__isnull=True) \
+            .values_list('authorized_date', 'type', 'amount', 'amount_currency', 'merchant_id')
+        for fields in transactions.iterator():
+            self.recorded[record_hash(*fields)] += 1
+        self.loaded_dates |= dates
+
+    def write_chunk(self, records):
+        """Write the records that are not duplicates of recorded transactions.
+
+        A statement listing the same transaction n times keeps n copies of it: a record is a duplicate only while
+        there are recorded transactions with its hash left to match.
+        """
+        with db_transaction.atomic():
+            merchant_ids = merchants.resolve(self.user, {(record['merchant_name'], None) for record in records
+                                                         if record['merchant_name']})
+            self._load_recorded({record['authorized_date'] for record in records})
+
+            transactions = []
+            for record in records:
+                merchant_id = merchant_ids.get((record['merchant_name'], None))
+                digest = record_hash(record['authorized_date'], record['type'], record['amount'],
+                                     record['amount_currency'], merchant_id)
+                if self.recorded[digest] > 0:
+                    self.recorded[digest] -= 1
+                    self.result['duplicates'] += 1
+                    continue
+                transactions.append(Transaction(
+                    user=self.user,
+                    payment_card_id=self.payment_card_id,
+                    merchant_id=merchant_id,
+                    type=record['type'],
+                    amount=Money(record['amount'], record['amount_currency']),
+                    authorized_date=record['authorized_date'],
+                    details=record['details'],
+                ))
+            if transactions:
+                self.result['created'] += len(save_transactions(self.user, transactions))
+
+    def run(self, records):
+        """Import (row number, fields) records and return the counts of created, duplicate and invalid rows."""
+        parsed = self._parsed(records)
+        while chunk := list(islice(parsed, CHUNK_SIZE)):
+            self.write_chunk(chunk)
+        return self.result
+
+
+def import_statement(user, statement_file, layout=None, default_currency='CAD', payment_card_id=None):
+    """Import the transactions of a CSV or OFX bank statement, given as a binary file, for the user.
+
+    Each chunk is committed on its own. Importing a statement again only creates the transactions that are not
+    recorded yet, so an import interrupted by an error can be run again. The recurring charges of the user are
+    detected again once the statement is imported.
+    """
+    if layout and layout not in LAYOUTS:
+        raise StatementError(f'Unknown CSV layout "{layout}", expected one of: {", ".join(LAYOUTS)}.')
+    ofx = is_ofx(statement_file)
+    text = _text(statement_file)
+    try:
+        records = ofx_records(text) if ofx else csv_records(text, layout)
+        result = StatementImport(user, default_currency, payment_card_id).run(records)
+    except csv.Error as e:
+        raise StatementError(f'Invalid CSV file: {e}')
+    finally:
+        text.detach()  # leave the file open for its owner
+
+    if result['created']:
+        recurring.detect([user.id])
+    return result
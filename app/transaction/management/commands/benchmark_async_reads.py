@@ -0,0 +1,103 @@
+"""
+Django command to load test the read endpoints served by a sync WSGI server and by the async views under ASGI
+"""
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+# (URL name in the transaction and async-transaction namespaces, query string)
+ENDPOINTS = {
+    'list': ('transaction-list', ''),
+    'report': ('report', '?group_by=merchant'),
+    'rewards': ('rewards-report', ''),
+    'mcc': ('merchantcategorycode-list', '?search=groc'),
+}
+
+
+class Command(BaseCommand):
+    """Django command sending the same GET requests, at several concurrency levels, to two running servers.
+
+    For example, with the same database:
+        python manage.py runserver 8000 (or the WSGI server of the deployment)
+        uvicorn app.asgi:application --port 8001 --workers 4
+        python manage.py benchmark_async_reads user@example.com --concurrency 1 --concurrency 50
+    """
+
+    help = 'Compare the throughput and latency of the sync read endpoints (WSGI) and of the async ones (ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User whose token authenticates the requests')
+        parser.add_argument('--sync-url', default='http://localhost:8000', help='Base URL of the WSGI server')
+        parser.add_argument('--async-url', default='http://localhost:8001', help='Base URL of the ASGI server')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=sorted(ENDPOINTS),
+                            help='Endpoint to load (repeatable), all of them by default')
+        parser.add_argument('--concurrency', type=int, action='append', dest='levels',
+                            help='Concurrent clients (repeatable), 1, 10 and 50 by default')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and concurrency level')
+
+    def _load(self, base_url, path, concurrency, requests):
+        """Send the requests from concurrency client threads with kept alive connections.
+
+        Return the requests per second, the latencies in milliseconds and the number of failed requests.
+        """
+        url = urlsplit(base_url)
+        local = threading.local()
+        headers = {'Authorization': f'Token {self.token}', 'Accept': 'application/json'}
+
+        def send(_):
+            if not hasattr(local, 'connection'):
+                local.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            start = time.perf_counter()
+            try:
+                local.connection.request('GET', path, headers=headers)
+                response = local.connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                local.connection.close()
+                del local.connection
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(requests)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        return requests / elapsed, latencies, sum(not ok for _, ok in results)
+
+    def _report(self, label, rate, latencies, errors):
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(f'  {label:5} {rate:8.0f} req/s  p50 {percentiles[49]:7.1f} ms  '
+                          f'p95 {percentiles[94]:7.1f} ms  p99 {percentiles[98]:7.1f} ms  {errors} errors')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = get_user_model().objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f'No user with the email "{options["email"]}".')
+        self.token = Token.objects.get_or_create(user=user)[0].key
+
+        for endpoint in options['endpoints'] or sorted(ENDPOINTS):
+            name, query = ENDPOINTS[endpoint]
+            paths = {'sync': reverse(f'transaction:{name}') + query,
+                     'async': reverse(f'async-transaction:{name}') + query}
+            for concurrency in options['levels'] or [1, 10, 50]:
+                self.stdout.write(f'{endpoint}, {concurrency} concurrent clients:')
+                rates = {}
+                for label, base_url in (('sync', options['sync_url']), ('async', options['async_url'])):
+                    rate, latencies, errors = self._load(base_url, paths[label], concurrency, options['requests'])
+                    self._report(label, rate, latencies, errors)
+                    rates[label] = rate
+                self.stdout.write(f'  async/sync throughput: {rates["async"] / rates["sync"]:.2f}x')
+
+        self.stdout.write(self.style.SUCCESS('Load test done.'))
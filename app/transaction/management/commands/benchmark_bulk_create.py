@@ -0,0 +1,74 @@
+"""
+Django command to compare the bulk transaction endpoint against single POST requests
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import PaymentCard, TransactionMerchant, CreditCardMerchantCategory
+
+
+class Command(BaseCommand):
+    """Django command to benchmark transaction creation. All the data is rolled back afterwards."""
+
+    help = 'Benchmark bulk transaction creation against N single POST requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Number of transactions to create')
+        parser.add_argument('--merchants', type=int, default=50, help='Number of distinct merchants')
+
+    def _client(self, email):
+        """Return an API client authenticated as a new user, with a card having rewards on half the merchants."""
+        user = get_user_model().objects.create_user(email=email, password='benchmark')
+        card = PaymentCard.objects.create(user=user, name=f'Benchmark card {email}', card_type='Visa',
+                                          four_digits=1234)
+        for i in range(0, self.merchants, 2):
+            merchant = TransactionMerchant.objects.create(user=user, name=f'Merchant {i}')
+            CreditCardMerchantCategory.objects.create(user=user, credit_card=card, merchant=merchant)
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        return client, card
+
+    def _payloads(self, card):
+        return [{
+            'amount': f'{i % 200}.99',
+            'authorized_date': f'2023-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+            'payment_card': card.id,
+            'merchant': {'name': f'Merchant {i % self.merchants}'},
+        } for i in range(self.rows)]
+
+    def _run(self, label, requests):
+        """Time the requests and return the elapsed seconds and the number of queries."""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            requests()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label}: {elapsed:.3f}s, {len(queries)} queries')
+        return elapsed
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.rows = options['rows']
+        self.merchants = options['merchants']
+
+        with db_transaction.atomic():
+            client, card = self._client('benchmark-single@example.com')
+            payloads = self._payloads(card)
+            url = reverse('transaction:transaction-list')
+            single = self._run(f'{self.rows} single POST', lambda: [
+                client.post(url, payload, format='json') for payload in payloads])
+
+            client, card = self._client('benchmark-bulk@example.com')
+            payloads = self._payloads(card)
+            url = reverse('transaction:transaction-bulk')
+            batched = self._run('1 bulk POST', lambda: client.post(url, payloads, format='json'))
+
+            db_transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(f'Bulk endpoint is {single / batched:.1f}x faster.'))
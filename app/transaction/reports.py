@@ -0,0 +1,172 @@
+"""
+Spending reports aggregated by the database.
+
+Each report is one query, built by a *_query function and read by the sync report function or its async
+counterpart, for the async views.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+from core import fx
+from core.models import Transaction, MonthlySpendRollup
+
+# Report grouping: (key expression, label expression). The label defaults to the key.
+GROUPINGS = {
+    'month': (TruncMonth('authorized_date'), None),
+    'week': (TruncWeek('authorized_date'), None),
+    'user_category': (F('user_category'), F('user_category__name')),
+    'merchant': (F('merchant'), F('merchant__name')),
+    'payment_card': (F('payment_card'), F('payment_card__name')),
+    'mcc': (F('credit_card_category__mcc__mcc'), F('credit_card_category__mcc__irs_description')),
+}
+
+# Groupings that can be answered from the monthly rollups
+ROLLUP_GROUPINGS = {
+    'month': (F('month'), None),
+    'user_category': (F('user_category'), F('user_category__name')),
+    'payment_card': (F('payment_card'), F('payment_card__name')),
+}
+
+# Periods of the rewards reports
+REWARD_PERIODS = {
+    'month': TruncMonth('authorized_date'),
+    'week': TruncWeek('authorized_date'),
+}
+
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _total(transaction_type, amount='amount'):
+    """Sum the amounts of one transaction type, 0 when there are none."""
+    return Coalesce(Sum(amount, filter=Q(type=transaction_type)), Value(Decimal(0)), output_field=AMOUNT_FIELD)
+
+
+def report_transactions(user, start_date=None, end_date=None):
+    """Return the transactions counted in the reports of the user, between the dates included.
+
+    Split transactions are counted through their parts, not the parent.
+    """
+    queryset = Transaction.objects.filter(user=user, has_children=False)
+    if start_date:
+        queryset = queryset.filter(authorized_date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(authorized_date__lte=end_date)
+    return queryset
+
+
+def is_month_aligned(start_date=None, end_date=None):
+    """Return whether the date range is made of whole months."""
+    starts_month = start_date is None or start_date.day == 1
+    ends_month = end_date is None or (end_date + timedelta(days=1)).day == 1
+    return starts_month and ends_month
+
+
+def rollup_query(user, group_by, start_date=None, end_date=None):
+    """Return the query of the totals of spending_report from the monthly rollups, for month aligned date ranges."""
+    key, label = ROLLUP_GROUPINGS[group_by]
+    rollups = MonthlySpendRollup.objects.filter(user=user)
+    if start_date:
+        rollups = rollups.filter(month__gte=start_date)
+    if end_date:
+        rollups = rollups.filter(month__lte=end_date)
+
+    return (
+        rollups.values('currency', key=key, label=label or key)
+        .annotate(spend=Sum('spend'), income=Sum('income'), count=Sum('count'))
+        .filter(count__gt=0)
+        .order_by('key', 'currency')
+    )
+
+
+def converted_query(user, group_by, currency, start_date=None, end_date=None):
+    """Return the query of the totals of spending_report converted to currency, with the exchange rates of each
+    transaction date.
+
+    The conversion is done by the database in the same query. Transactions in a currency without rates on their
+    date are totaled in their own currency, in separate rows.
+    """
+    key, label = GROUPINGS[group_by]
+    amount = Coalesce('converted', 'amount', output_field=fx.AMOUNT_FIELD)
+    return (
+        report_transactions(user, start_date, end_date)
+        .annotate(converted=fx.converted(currency))
+        .values(key=key, label=label or key,
+                currency=Case(When(converted__isnull=True, then=F('amount_currency')), default=Value(currency)))
+        .annotate(
+            spend=_total(Transaction.TransactionType.EXPENSE, amount),
+            income=_total(Transaction.TransactionType.INCOME, amount),
+            count=Count('id'),
+        )
+        .order_by('key', 'currency')
+    )
+
+
+def spending_query(user, group_by, start_date=None, end_date=None, currency=None):
+    """Return the query of the spend and income totals per group and currency.
+
+    Amounts of different currencies are never added together: each row is for one currency, unless the totals are
+    converted to currency. Reports by month, user category or payment card over whole months are read from the
+    monthly rollups, so their cost does not depend on the number of transactions.
+    """
+    if currency:
+        return converted_query(user, group_by, currency, start_date, end_date)
+    if group_by in ROLLUP_GROUPINGS and is_month_aligned(start_date, end_date):
+        return rollup_query(user, group_by, start_date, end_date)
+
+    key, label = GROUPINGS[group_by]
+    return (
+        report_transactions(user, start_date, end_date)
+        .values(key=key, label=label or key, currency=F('amount_currency'))
+        .annotate(
+            spend=_total(Transaction.TransactionType.EXPENSE),
+            income=_total(Transaction.TransactionType.INCOME),
+            count=Count('id'),
+        )
+        .order_by('key', 'currency')
+    )
+
+
+def spending_report(user, group_by, start_date=None, end_date=None, currency=None):
+    """Return spend and income totals per group and currency, computed in one query, see spending_query."""
+    return list(spending_query(user, group_by, start_date, end_date, currency))
+
+
+async def aspending_report(user, group_by, start_date=None, end_date=None, currency=None):
+    """Async spending_report()."""
+    return [row async for row in spending_query(user, group_by, start_date, end_date, currency)]
+
+
+def rewards_query(user, period='month', start_date=None, end_date=None):
+    """Return the query of the cashback and points earned per period, payment card and currency.
+
+    The rewards are the ones stored on the expenses by Transaction.save() and the backfill_rewards command. A split
+    transaction earns them as a whole: its parts share its payment card but have no credit card category.
+    """
+    queryset = Transaction.objects.filter(user=user, type=Transaction.TransactionType.EXPENSE,
+                                          credit_card_category__isnull=False)
+    if start_date:
+        queryset = queryset.filter(authorized_date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(authorized_date__lte=end_date)
+
+    return (
+        queryset
+        .values('payment_card', period=REWARD_PERIODS[period], payment_card_name=F('payment_card__name'),
+                currency=F('amount_currency'))
+        .annotate(spend=Sum('amount'), cashback=Sum('cashback_earned'), points=Sum('points_earned'),
+                  count=Count('id'))
+        .order_by('period', 'payment_card', 'currency')
+    )
+
+
+def rewards_report(user, period='month', start_date=None, end_date=None):
+    """Return the cashback and points earned per period, payment card and currency, computed in one query."""
+    return list(rewards_query(user, period, start_date, end_date))
+
+
+async def arewards_report(user, period='month', start_date=None, end_date=None):
+    """Async rewards_report()."""
+    return [row async for row in rewards_query(user, period, start_date, end_date)]
@@ -1,20 +1,29 @@
 """
 Serializers for Transaction APIs
 """
+import re
+
+from djmoney.settings import CURRENCY_CHOICES
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 
+from core import fx, merchants
 from core.models import Transaction, TransactionMerchant, TransactionUserCategory, \
-    PaymentCard, MerchantCategoryCode, CreditCardMerchantCategory
+    PaymentCard, MerchantCategoryCode, CreditCardMerchantCategory, CategorizationRule, Budget
+from transaction.export import FORMATS as EXPORT_FORMATS
+from transaction.reports import GROUPINGS, REWARD_PERIODS
 
 
-class MerchantCategoryCode(serializers.ModelSerializer):
+class MerchantCategoryCodeSerializer(serializers.ModelSerializer):
     """Serializer for Merchant categories codes."""
 
     class Meta:
         model = MerchantCategoryCode
         fields = ['id', 'mcc', 'edited_description', 'combined_description',
-                  'usda_description', 'irs_description', 'created_at', 'updated_at']
-        read_only_fields = ['id']
+                  'usda_description', 'irs_description']
+        read_only_fields = fields
 
 
 class PaymentCardSerializer(serializers.ModelSerializer):
@@ -52,29 +61,117 @@ class CreditCardMerchantCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'credit_card', 'merchant', 'mcc', 'cash_back',
                   'points_multiplier', 'rewards_type', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        validators = [UniqueTogetherValidator(  # database constraint unique_credit_card_merchant
+            queryset=CreditCardMerchantCategory.objects.all(), fields=['credit_card', 'merchant'],
+            message='Combination of credit card and merchant already exists.')]
+
+
+class CategorizationRuleSerializer(serializers.ModelSerializer):
+    """Serializer for the rules categorizing new transactions."""
+
+    class Meta:
+        model = CategorizationRule
+        fields = ['id', 'user_category', 'contains', 'pattern', 'min_amount', 'max_amount', 'priority',
+                  'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_user_category(self, value):
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError(f'Invalid pk "{value.pk}" - object does not exist.')
+        return value
+
+    def validate_pattern(self, value):
+        try:
+            re.compile(value)
+        except re.error as e:
+            raise serializers.ValidationError(f'Invalid regular expression: {e}.')
+        return value
+
+    def validate(self, attrs):
+        values = {**{field: getattr(self.instance, field) for field in self.Meta.fields if self.instance}, **attrs}
+        conditions = ('contains', 'pattern', 'min_amount', 'max_amount')
+        if all(values.get(field) in (None, '') for field in conditions):
+            raise serializers.ValidationError('A rule needs at least one condition.')
+        if None not in (values.get('min_amount'), values.get('max_amount')) \
+                and values['min_amount'] > values['max_amount']:
+            raise serializers.ValidationError('min_amount must not be greater than max_amount.')
+        return attrs
+
+
+class BudgetSerializer(serializers.ModelSerializer):
+    """Serializer for the budgets of the user categories, with their spend in the current period."""
+
+    period = serializers.ChoiceField(choices=Budget.Period.choices, default=Budget.Period.MONTH)
+    currency = serializers.ChoiceField(choices=CURRENCY_CHOICES, default='CAD')
+    period_start = serializers.DateField(read_only=True)
+    spent = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True,
+                                     help_text='Expenses of the category in the currency since period_start')
+    remaining = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Budget
+        fields = ['id', 'user_category', 'period', 'amount', 'currency', 'period_start', 'spent', 'remaining',
+                  'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+        validators = [UniqueTogetherValidator(  # database constraint unique_budget
+            queryset=Budget.objects.all(), fields=['user_category', 'period', 'currency'],
+            message='The category already has a budget for this period and currency.')]
+
+    def validate_user_category(self, value):
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError(f'Invalid pk "{value.pk}" - object does not exist.')
+        return value
+
+
+class CategorizeSerializer(serializers.Serializer):
+    """Serializer for categorizing the stored transactions with the current rules."""
+
+    overwrite = serializers.BooleanField(default=False, help_text='Also change the categorized transactions')
 
 
 class TransactionSerializer(serializers.ModelSerializer):
     """Serializer for transactions."""
 
+    merchant = TransactionMerchantSerializer(required=False, allow_null=True)
+    payment_card_detail = PaymentCardSerializer(source='payment_card', read_only=True)
+    user_category_detail = TransactionUserCategorySerializer(source='user_category', read_only=True)
+    credit_card_category = CreditCardMerchantCategorySerializer(read_only=True)
+
     class Meta:
         model = Transaction
-        fields = ['id', 'parent', 'payment_card', 'user_category', 'merchant',
-                  'type', 'amount', 'authorized_date', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'parent', 'payment_card', 'payment_card_detail', 'user_category', 'user_category_detail',
+                  'merchant', 'credit_card_category', 'type', 'amount', 'authorized_date', 'has_children',
+                  'cashback_earned', 'points_earned', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'parent', 'has_children', 'cashback_earned', 'points_earned', 'created_at',
+                            'updated_at']
+
+    def validate(self, attrs):
+        """Keep the amounts of a split transaction and of its parts adding up."""
+        instance = self.instance
+        if instance is not None and (instance.parent_id or instance.has_children):
+            amount = attrs.get('amount', instance.amount)
+            if amount != instance.amount or attrs.get('type', instance.type) != instance.type:
+                raise serializers.ValidationError(
+                    'The amount and type of a split transaction are changed through the split of its parent.'
+                    if instance.parent_id else 'Remove the split of the transaction to change its amount or type.')
+        return attrs
 
     def _get_or_create_merchant(self, merchant, transaction):
-        """Handle get or creating merchant if not existing."""
+        """Handle get or creating merchant if not existing, "STARBUCKS #1234" matching the merchant "Starbucks"."""
         auth_user = self.context['request'].user  # get authenticated user
-        merchant_obj = TransactionMerchant.objects.get_or_create(user=auth_user, **merchant)
+        merchant_obj = merchants.match(auth_user, merchant['name'], merchant.get('location'))
+        if merchant_obj is None:
+            merchant_obj, _ = TransactionMerchant.objects.get_or_create(user=auth_user, **merchant)
         transaction.merchant = merchant_obj
 
     def create(self, validated_data):
         """Override Create a Transaction."""
         merchant = validated_data.pop('merchant', None)
-        transaction = Transaction.objects.create(**validated_data)
-        self._get_or_create_merchant(merchant, transaction)
+        transaction = Transaction(**validated_data)
+        if merchant is not None:
+            self._get_or_create_merchant(merchant, transaction)
 
+        transaction.save()
         return transaction
 
     def update(self, instance, validated_data):
@@ -91,8 +188,317 @@ class TransactionSerializer(serializers.ModelSerializer):
         return instance
 
 
+class TransactionChildSerializer(serializers.ModelSerializer):
+    """Serializer for the split parts of a transaction."""
+
+    class Meta:
+        model = Transaction
+        fields = ['id', 'payment_card', 'user_category', 'merchant', 'type', 'amount', 'authorized_date', 'details']
+        read_only_fields = fields
+
+
+class TransactionTreeSerializer(TransactionChildSerializer):
+    """Serializer for a transaction of a split tree, with its position in the tree."""
+
+    depth = serializers.IntegerField(read_only=True)
+
+    class Meta(TransactionChildSerializer.Meta):
+        fields = ['id', 'parent', 'depth', 'has_children'] + TransactionChildSerializer.Meta.fields[1:]
+        read_only_fields = fields
+
+
+class TransactionSplitPartSerializer(serializers.Serializer):
+    """Serializer for one part of a transaction split, the other fields are the ones of the transaction."""
+
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    user_category = serializers.IntegerField(required=False, allow_null=True)
+    details = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class TransactionSplitSerializer(serializers.Serializer):
+    """Serializer for the parts of a transaction split, validated against the transaction of the context."""
+
+    parts = TransactionSplitPartSerializer(many=True)
+
+    def validate_parts(self, parts):
+        transaction = self.context['transaction']
+        if len(parts) == 1:
+            raise serializers.ValidationError('A split has at least two parts.')
+        if not parts:
+            return parts
+
+        amount = transaction.amount.amount
+        if any(part['amount'] == 0 or (part['amount'] > 0) != (amount > 0) for part in parts):
+            raise serializers.ValidationError('Each part must be non-zero, with the sign of the transaction amount.')
+        total = sum(part['amount'] for part in parts)
+        if total != amount:
+            raise serializers.ValidationError(f'The parts add up to {total} instead of {amount}.')
+
+        category_ids = {part['user_category'] for part in parts if part.get('user_category')}
+        owned = set(TransactionUserCategory.objects.filter(user_id=transaction.user_id, id__in=category_ids)
+                    .values_list('id', flat=True))
+        if category_ids - owned:
+            raise serializers.ValidationError(f'Invalid user categories: {sorted(category_ids - owned)}.')
+        return parts
+
+
 class TransactionDetailSerializer(TransactionSerializer):
     """Serializer for transaction detail view."""
 
+    children = TransactionChildSerializer(many=True, read_only=True)
+    home_amount = serializers.SerializerMethodField()
+
     class Meta(TransactionSerializer.Meta):
-        fields = TransactionSerializer.Meta.fields + ['details']
+        fields = TransactionSerializer.Meta.fields + ['details', 'children', 'home_amount']
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_home_amount(self, transaction):
+        """Return the amount in the home currency of the user, or None without exchange rates for its date."""
+        request = self.context.get('request')
+        if request is None or not transaction.amount:
+            return None
+        home_currency = request.user.home_currency
+        amount = fx.convert(transaction.amount.amount, str(transaction.amount.currency), home_currency,
+                            transaction.authorized_date)
+        return None if amount is None else {'amount': str(amount), 'currency': home_currency}
+
+
+class TransactionSyncSerializer(serializers.ModelSerializer):
+    """Serializer for transactions sent to syncing clients, with related objects as ids."""
+
+    class Meta:
+        model = Transaction
+        fields = ['id', 'parent', 'payment_card', 'user_category', 'merchant', 'credit_card_category', 'type',
+                  'amount', 'amount_currency', 'authorized_date', 'details', 'has_children', 'cashback_earned',
+                  'points_earned', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class BudgetSyncSerializer(serializers.ModelSerializer):
+    """Serializer for budgets sent to syncing clients, without their spend, which the synced transactions give."""
+
+    class Meta:
+        model = Budget
+        fields = ['id', 'user_category', 'period', 'amount', 'currency', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a sync: the watermark returned by the previous sync, if any."""
+
+    since = serializers.DateTimeField(required=False)
+
+
+class MerchantMergeSerializer(serializers.Serializer):
+    """Serializer for merging duplicate merchants of the user into one."""
+
+    target = serializers.IntegerField(help_text='Merchant kept')
+    sources = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=1000,
+                                    help_text='Merchants merged into the target, then deleted')
+
+    def validate(self, attrs):
+        ids = {attrs['target'], *attrs['sources']}
+        owned = TransactionMerchant.objects.filter(user=self.context['request'].user, id__in=ids).in_bulk()
+        if missing := sorted(ids - set(owned)):
+            raise serializers.ValidationError(
+                {'sources': [f'Invalid pk "{merchant_id}" - object does not exist.' for merchant_id in missing]})
+        attrs['target'] = owned[attrs['target']]
+        attrs['sources'] = [owned[merchant_id] for merchant_id in set(attrs['sources']) - {attrs['target'].id}]
+        return attrs
+
+
+class TransactionExportQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a transaction export."""
+
+    file_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+
+class TransactionBulkMerchantSerializer(serializers.Serializer):
+    """Serializer for the merchant of a bulk imported transaction, matched on name and location."""
+
+    name = serializers.CharField(max_length=100)
+    location = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True, default=None)
+
+
+class TransactionBulkRowSerializer(serializers.Serializer):
+    """Serializer for one row of a bulk transaction import.
+
+    Related objects are plain ids so that a whole batch can be checked with one query per relation.
+    """
+
+    payment_card = serializers.IntegerField(required=False, allow_null=True)
+    user_category = serializers.IntegerField(required=False, allow_null=True)
+    merchant = TransactionBulkMerchantSerializer(required=False, allow_null=True)
+    type = serializers.ChoiceField(choices=Transaction.TransactionType.choices,
+                                   default=Transaction.TransactionType.EXPENSE)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    amount_currency = serializers.ChoiceField(choices=CURRENCY_CHOICES, default='CAD')
+    authorized_date = serializers.DateField()
+    details = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class StatementImportSerializer(serializers.Serializer):
+    """Serializer for the upload of a bank statement to import."""
+
+    file = serializers.FileField()
+    layout = serializers.CharField(required=False, help_text='Layout of a CSV file, detected from its header if unset')
+    currency = serializers.ChoiceField(choices=CURRENCY_CHOICES, default='CAD',
+                                       help_text='Currency of the amounts without one in the file')
+    payment_card = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate_payment_card(self, value):
+        if value is not None and not PaymentCard.objects.filter(user=self.context['request'].user, id=value).exists():
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+
+class SpendingReportQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a spending report."""
+
+    group_by = serializers.ChoiceField(choices=list(GROUPINGS))
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    convert = serializers.BooleanField(default=False, help_text='Convert the totals to the home currency of the user')
+
+    def validate(self, attrs):
+        if attrs.get('start_date') and attrs.get('end_date') and attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError('start_date must be before end_date.')
+        return attrs
+
+
+class SpendingReportSerializer(serializers.Serializer):
+    """Serializer for one row of a spending report: the totals of a group in one currency."""
+
+    key = serializers.CharField(allow_null=True)
+    label = serializers.CharField(allow_null=True)
+    currency = serializers.CharField()
+    spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    income = serializers.DecimalField(max_digits=14, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class RewardsReportQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a rewards report."""
+
+    period = serializers.ChoiceField(choices=list(REWARD_PERIODS), default='month')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start_date') and attrs.get('end_date') and attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError('start_date must be before end_date.')
+        return attrs
+
+
+class RewardsReportSerializer(serializers.Serializer):
+    """Serializer for one row of a rewards report: the rewards earned with a card over a period, in one currency."""
+
+    period = serializers.DateField()
+    payment_card = serializers.IntegerField()
+    payment_card_name = serializers.CharField()
+    currency = serializers.CharField()
+    spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    cashback = serializers.DecimalField(max_digits=14, decimal_places=2)
+    points = serializers.DecimalField(max_digits=14, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class SpendHeatmapQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a spend map: the size of its cells in degrees and an optional bounding box."""
+
+    cell_size = serializers.FloatField(default=0.01, min_value=0.0001, max_value=10)
+    min_latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    max_latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    min_longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    max_longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    BOUNDS = ['min_latitude', 'max_latitude', 'min_longitude', 'max_longitude']
+
+    def validate(self, attrs):
+        given = [bound for bound in self.BOUNDS if bound in attrs]
+        if given and len(given) != len(self.BOUNDS):
+            raise serializers.ValidationError('Provide all of min_latitude, max_latitude, min_longitude and '
+                                              'max_longitude, or none of them.')
+        if given and attrs['min_latitude'] > attrs['max_latitude']:
+            raise serializers.ValidationError('min_latitude must be below max_latitude.')
+        if given and attrs['min_longitude'] > attrs['max_longitude']:
+            # A box crossing the antimeridian, from min_longitude east to max_longitude
+            attrs['max_longitude'] += 360
+        if attrs.get('start_date') and attrs.get('end_date') and attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError('start_date must be before end_date.')
+        return attrs
+
+
+class SpendHeatmapSerializer(serializers.Serializer):
+    """Serializer for one cell of a spend map: the expenses at the merchants in the cell, in one currency."""
+
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    currency = serializers.CharField()
+    spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    count = serializers.IntegerField()
+    merchants = serializers.IntegerField()
+
+
+class NearbyMerchantQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a nearby merchants search."""
+
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(default=1, min_value=0.01, max_value=100)
+    limit = serializers.IntegerField(default=20, min_value=1, max_value=100)
+
+
+class NearbyMerchantSerializer(TransactionMerchantSerializer):
+    """Serializer for a merchant near a point, with its coordinates and distance."""
+
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(TransactionMerchantSerializer.Meta):
+        fields = TransactionMerchantSerializer.Meta.fields + ['latitude', 'longitude', 'distance_km']
+
+
+class UpcomingChargeQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of the upcoming charges: the number of days to look ahead."""
+
+    days = serializers.IntegerField(default=30, min_value=1, max_value=366)
+
+
+class UpcomingChargeSerializer(serializers.Serializer):
+    """Serializer for a charge expected from a recurring series."""
+
+    series = serializers.IntegerField()
+    merchant = serializers.IntegerField()
+    merchant_name = serializers.CharField()
+    cadence = serializers.CharField()
+    date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    currency = serializers.CharField()
+
+
+class CardRecommendationQuerySerializer(serializers.Serializer):
+    """Serializer for the parameters of a card recommendation: a merchant id or a merchant category code."""
+
+    merchant = serializers.IntegerField(required=False)
+    mcc = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if ('merchant' in attrs) == ('mcc' in attrs):
+            raise serializers.ValidationError('Provide either merchant or mcc.')
+        return attrs
+
+
+class CardRecommendationSerializer(serializers.Serializer):
+    """Serializer for a recommended payment card, with the category giving its rewards."""
+
+    payment_card = serializers.IntegerField()
+    payment_card_name = serializers.CharField()
+    credit_card_category = serializers.IntegerField()
+    cash_back = serializers.DecimalField(max_digits=5, decimal_places=2)
+    points_multiplier = serializers.IntegerField()
+    rewards_type = serializers.CharField()
+    rate = serializers.DecimalField(max_digits=8, decimal_places=2)
@@ -0,0 +1,46 @@
+"""
+Split transactions: a transaction divided into parts, which may be split again.
+"""
+from django.db import transaction as db_transaction
+from djmoney.money import Money
+
+from core.models import Transaction, MonthlySpendRollup, CollectionVersion
+
+
+def split_transaction(parent, parts):
+    """Replace all the parts of parent, and their own parts, by parts, in one database transaction.
+
+    The parts are validated dicts of amount and optional user_category and details; they share the card, merchant,
+    type, date and currency of the parent. No parts removes the split. The rollups count the leaves of the tree:
+    the deleted parts are removed by the delete signals, the parent and the new parts are added in bulk.
+    """
+    with db_transaction.atomic():
+        parent = Transaction.objects.select_for_update().get(pk=parent.pk)
+        was_split = parent.has_children
+
+        Transaction.objects.filter(parent=parent).delete()
+        children = Transaction.objects.bulk_create(
+            Transaction(
+                user_id=parent.user_id,
+                parent=parent,
+                payment_card_id=parent.payment_card_id,
+                user_category_id=part.get('user_category', parent.user_category_id),
+                merchant_id=parent.merchant_id,
+                type=parent.type,
+                amount=Money(part['amount'], parent.amount.currency),
+                authorized_date=parent.authorized_date,
+                details=part.get('details', ''),
+            )
+            for part in parts
+        )
+
+        if not was_split and children:
+            MonthlySpendRollup.objects.add([parent], sign=-1)
+        Transaction.objects.filter(pk=parent.pk).update_has_children()
+        parent.has_children = bool(children)
+        if was_split and not children:
+            MonthlySpendRollup.objects.add([parent])
+        MonthlySpendRollup.objects.add(children)
+        CollectionVersion.objects.bump_on_commit(parent.user_id)  # bulk_create and update() send no signals
+
+    return parent
@@ -0,0 +1,53 @@
+"""
+Delta sync of the data of a user: the objects changed and deleted since a watermark.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.models import Transaction, PaymentCard, TransactionUserCategory, TransactionMerchant, \
+    CreditCardMerchantCategory, CategorizationRule, Budget, Tombstone
+from transaction import serializers
+
+# Synced resources: name in the response, model and serializer. Each is read with its (user, updated_at) index.
+RESOURCES = {
+    'payment_cards': (PaymentCard, serializers.PaymentCardSerializer),
+    'user_categories': (TransactionUserCategory, serializers.TransactionUserCategorySerializer),
+    'merchants': (TransactionMerchant, serializers.TransactionMerchantSerializer),
+    'cc_merchant_categories': (CreditCardMerchantCategory, serializers.CreditCardMerchantCategorySerializer),
+    'transactions': (Transaction, serializers.TransactionSyncSerializer),
+    'categorization_rules': (CategorizationRule, serializers.CategorizationRuleSerializer),
+    'budgets': (Budget, serializers.BudgetSyncSerializer),
+}
+
+
+class WatermarkExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The watermark is older than the deletion history, sync again without since.'
+    default_code = 'watermark_expired'
+
+
+def changes(user, since=None):
+    """Return the objects of the user changed since the watermark, the deleted ones and the next watermark.
+
+    Without watermark, every object is returned and there are no deletions.
+    """
+    now = timezone.now()
+    if since is not None and since < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        raise WatermarkExpired()
+
+    data = {'watermark': now - timedelta(seconds=settings.SYNC_WATERMARK_LAG_SECONDS)}
+    for name, (model, serializer_class) in RESOURCES.items():
+        queryset = model.objects.filter(user=user)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        data[name] = serializer_class(queryset.order_by('updated_at', 'id'), many=True).data
+
+    data['deleted'] = []
+    if since is not None:
+        data['deleted'] = list(Tombstone.objects.filter(user=user, deleted_at__gte=since)
+                               .order_by('deleted_at', 'id').values('resource', 'object_id'))
+    return data
@@ -0,0 +1,121 @@
+"""
+Tests for the async views of the hot read endpoints.
+"""
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from djmoney.money import Money
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.authentication import token_cache
+from core.models import Transaction, TransactionMerchant, TransactionUserCategory, MerchantCategoryCode
+
+
+ASYNC_TRANSACTIONS_URL = reverse('async-transaction:transaction-list')
+ASYNC_REPORT_URL = reverse('async-transaction:report')
+ASYNC_MCC_URL = reverse('async-transaction:merchantcategorycode-list')
+
+
+def async_detail_url(transaction_id):
+    return reverse('async-transaction:transaction-detail', args=[transaction_id])
+
+
+class AsyncViewTests(TestCase):
+    """Test the async views answer like the sync ones."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+        self.sync_get = sync_to_async(self.sync_client.get)
+
+        food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        merchant = TransactionMerchant.objects.create(user=self.user, name='Cafe')
+        self.transactions = [
+            Transaction.objects.create(user=self.user, amount=Money(i + 1, 'CAD'), user_category=food,
+                                       merchant=merchant, authorized_date=date(2023, 1 + i % 3, 1 + i))
+            for i in range(5)
+        ]
+
+    async def test_requires_token(self):
+        """Test the async views reject requests without a valid token, and other methods than GET."""
+        res = await self.async_client.get(ASYNC_TRANSACTIONS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = await self.async_client.get(ASYNC_TRANSACTIONS_URL, headers={'Authorization': 'Token invalid'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = await self.async_client.post(ASYNC_TRANSACTIONS_URL, headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_transaction_list_pages(self):
+        """Test the async list returns the pages of the sync list, and 304 for an unchanged list."""
+        url = f'{ASYNC_TRANSACTIONS_URL}?page_size=2'
+        res = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first_page = res.json()
+
+        sync_res = await self.sync_get(reverse('transaction:transaction-list'), {'page_size': 2})
+        self.assertEqual(first_page['results'], sync_res.json()['results'])
+
+        res = await self.async_client.get(first_page['next'], headers=self.headers)
+        self.assertEqual([row['id'] for row in res.json()['results']],
+                         [self.transactions[1].id, self.transactions[3].id])
+
+        res = await self.async_client.get(url, headers={**self.headers, 'If-None-Match': res.headers['ETag']})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)  # another page has another ETag
+        res = await self.async_client.get(url, headers=self.headers)
+        res = await self.async_client.get(url, headers={**self.headers, 'If-None-Match': res.headers['ETag']})
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_transaction_detail(self):
+        """Test the async detail returns the sync one, and 404 for the transactions of another user."""
+        transaction = self.transactions[0]
+        res = await self.async_client.get(async_detail_url(transaction.id), headers=self.headers)
+
+        sync_res = await self.sync_get(reverse('transaction:transaction-detail', args=[transaction.id]))
+        self.assertEqual(res.json(), sync_res.json())
+
+        other = await get_user_model().objects.acreate(email='other@example.com')
+        other_transaction = await Transaction.objects.acreate(user=other, amount=1, authorized_date=date(2023, 1, 1))
+        res = await self.async_client.get(async_detail_url(other_transaction.id), headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_spending_report(self):
+        """Test the async report returns the sync one, and 400 for invalid parameters."""
+        for params in ({'group_by': 'month'}, {'group_by': 'merchant', 'start_date': '2023-01-02'}):
+            res = await self.async_client.get(ASYNC_REPORT_URL, params, headers=self.headers)
+            sync_res = await self.sync_get(reverse('transaction:report'), params)
+            self.assertEqual(res.json(), sync_res.json(), params)
+
+        res = await self.async_client.get(ASYNC_REPORT_URL, {'group_by': 'day'}, headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('group_by', res.json())
+
+    async def test_mcc_search(self):
+        """Test the async codes search and retrieve from the index."""
+        await MerchantCategoryCode.objects.acreate(mcc=5411, edited_description='Grocery Stores',
+                                                   combined_description='Grocery Stores',
+                                                   usda_description='Grocery Stores',
+                                                   irs_description='Grocery Stores and Supermarkets')
+
+        res = await self.async_client.get(ASYNC_MCC_URL, {'search': 'groc'}, headers=self.headers)
+        self.assertEqual([code['mcc'] for code in res.json()], [5411])
+
+        res = await self.async_client.get(reverse('async-transaction:merchantcategorycode-detail', args=[5411]),
+                                          headers=self.headers)
+        self.assertEqual(res.json()['irs_description'], 'Grocery Stores and Supermarkets')
+        res = await self.async_client.get(reverse('async-transaction:merchantcategorycode-detail', args=[1]),
+                                          headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,115 @@
+"""
+Tests for the budgets APIs.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from djmoney.money import Money
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionUserCategory, Budget
+
+
+BUDGETS_URL = reverse('transaction:budget-list')
+
+
+def detail_url(budget_id):
+    return reverse('transaction:budget-detail', args=[budget_id])
+
+
+class BudgetApiTests(TestCase):
+    """Test managing budgets and reading their remaining amount."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        self.today = date.today()
+
+    def create(self, amount, authorized_date=None, **params):
+        return Transaction.objects.create(user=self.user, amount=amount, user_category=self.food,
+                                          authorized_date=authorized_date or self.today, **params)
+
+    def test_create_budget_returns_remaining(self):
+        """Test a created budget returns the spend of its category this month."""
+        self.create(30)
+        self.create(100, type=Transaction.TransactionType.INCOME)
+        self.create(Money(8, 'USD'))
+
+        res = self.client.post(BUDGETS_URL, {'user_category': self.food.id, 'amount': '200.00'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['period_start'], self.today.replace(day=1).isoformat())
+        self.assertEqual((res.data['spent'], res.data['remaining']), ('30.00', '170.00'))
+
+    def test_remaining_follows_transaction_writes(self):
+        """Test the remaining amount follows created, updated and deleted transactions without scanning them."""
+        budget = Budget.objects.create(user=self.user, user_category=self.food, amount=100)
+        other = TransactionUserCategory.objects.create(user=self.user, name='Other')
+        transaction = self.create(30)
+        moved = self.create(20)
+        self.create(50, date(2000, 1, 1))
+
+        transaction.amount = Money(35, 'CAD')
+        transaction.save()
+        moved.user_category = other
+        moved.save()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(budget.id))
+        self.assertEqual((res.data['spent'], res.data['remaining']), ('35.00', '65.00'))
+
+        transaction.delete()
+        res = self.client.get(detail_url(budget.id))
+        self.assertEqual(res.data['remaining'], '100.00')
+
+    def test_yearly_budget(self):
+        """Test a yearly budget counts the spend since January, in its currency."""
+        year_start = self.today.replace(month=1, day=1)
+        self.create(40, year_start)
+        self.create(Money(15, 'USD'), year_start)
+        self.create(60, year_start.replace(year=year_start.year - 1))
+        Budget.objects.create(user=self.user, user_category=self.food, period=Budget.Period.YEAR, amount=50,
+                              currency='USD')
+
+        res = self.client.get(BUDGETS_URL)
+
+        self.assertEqual(res.data['results'][0]['period_start'], year_start.isoformat())
+        self.assertEqual((res.data['results'][0]['spent'], res.data['results'][0]['remaining']), ('15.00', '35.00'))
+
+    def test_list_budgets_in_category_order(self):
+        """Test budgets are listed, page after page, by category, period and currency."""
+        rent = TransactionUserCategory.objects.create(user=self.user, name='Rent')
+        budgets = [Budget.objects.create(user=self.user, user_category=category, amount=100, period=period,
+                                         currency=currency)
+                   for category, period, currency in ((self.food, 'month', 'CAD'), (rent, 'month', 'CAD'),
+                                                      (self.food, 'year', 'CAD'), (self.food, 'month', 'USD'))]
+
+        ids, url = [], BUDGETS_URL + '?page_size=3'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [budget['id'] for budget in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(ids, [budgets[0].id, budgets[3].id, budgets[2].id, budgets[1].id])
+
+    def test_invalid_budgets(self):
+        """Test budgets of another user's category, negative or duplicated are rejected."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other_category = TransactionUserCategory.objects.create(user=other_user, name='Other food')
+        Budget.objects.create(user=self.user, user_category=self.food, amount=100)
+
+        for payload in ({'user_category': other_category.id, 'amount': '10'},
+                        {'user_category': self.food.id, 'amount': '-1', 'period': 'year'},
+                        {'user_category': self.food.id, 'amount': '10'}):
+            res = self.client.post(BUDGETS_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        self.assertEqual(Budget.objects.count(), 1)
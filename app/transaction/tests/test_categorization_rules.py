@@ -0,0 +1,84 @@
+"""
+Tests for the categorization rules APIs.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionUserCategory, CategorizationRule
+
+
+RULES_URL = reverse('transaction:categorizationrule-list')
+CATEGORIZE_URL = reverse('transaction:categorizationrule-categorize')
+TRANSACTIONS_URL = reverse('transaction:transaction-list')
+BULK_URL = reverse('transaction:transaction-bulk')
+
+
+class CategorizationRuleApiTests(TestCase):
+    """Test managing the categorization rules and applying them."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.bills = TransactionUserCategory.objects.create(user=self.user, name='Bills')
+
+    def test_create_rule_categorizes_new_transactions(self):
+        """Test a created rule categorizes the transactions created one by one or in bulk."""
+        res = self.client.post(RULES_URL, {'user_category': self.bills.id, 'contains': 'hydro'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(TRANSACTIONS_URL, {'amount': '80.00', 'authorized_date': '2023-01-01',
+                                                  'merchant': {'name': 'Hydro Quebec'}}, format='json')
+        self.assertEqual(res.data['user_category'], self.bills.id)
+
+        self.client.post(BULK_URL, [{'amount': '80.00', 'authorized_date': '2023-02-01', 'details': 'HYDRO'}],
+                         format='json')
+        self.assertEqual(Transaction.objects.filter(user=self.user, user_category=self.bills).count(), 2)
+
+    def test_list_rules_in_priority_order(self):
+        """Test rules are listed, page after page, in the order they are tried."""
+        rules = [CategorizationRule.objects.create(user=self.user, user_category=self.bills, contains=word,
+                                                   priority=priority)
+                 for word, priority in (('a', 2), ('b', 0), ('c', 1), ('d', 0), ('e', 1))]
+
+        ids, url = [], RULES_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [rule['id'] for rule in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(ids, [rule.id for rule in sorted(rules, key=lambda rule: (rule.priority, rule.id))])
+
+    def test_invalid_rules(self):
+        """Test rules without condition, with an invalid pattern or another user's category are rejected."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other_category = TransactionUserCategory.objects.create(user=other_user, name='Other')
+
+        for payload in ({'user_category': self.bills.id},
+                        {'user_category': self.bills.id, 'pattern': '('},
+                        {'user_category': self.bills.id, 'min_amount': '10', 'max_amount': '5'},
+                        {'user_category': other_category.id, 'contains': 'x'}):
+            res = self.client.post(RULES_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        self.assertFalse(CategorizationRule.objects.exists())
+
+    def test_categorize_history(self):
+        """Test applying the rules to the stored transactions."""
+        transaction = Transaction.objects.create(user=self.user, amount=80, authorized_date=date(2023, 1, 1),
+                                                 details='Hydro')
+        CategorizationRule.objects.create(user=self.user, user_category=self.bills, contains='hydro')
+
+        res = self.client.post(CATEGORIZE_URL)
+
+        self.assertEqual(res.data, {'updated': 1})
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.user_category, self.bills)
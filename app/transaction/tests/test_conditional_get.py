@@ -0,0 +1,70 @@
+"""
+Tests for the ETags of the per-user lists.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, PaymentCard, TransactionUserCategory
+
+
+TRANSACTIONS_URL = reverse('transaction:transaction-list')
+CC_MERCHANT_CATEGORIES_URL = reverse('transaction:creditcardmerchantcategory-list')
+
+
+class ConditionalGetTests(TestCase):
+    """Test list responses are not sent again while the collections of the user are unchanged."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=self.user, amount=10, authorized_date=date(2023, 1, 1))
+
+    def test_not_modified(self):
+        """Test a matching If-None-Match gets a 304 after a single query, the version."""
+        etag = self.client.get(TRANSACTIONS_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TRANSACTIONS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_etag_changes_on_write(self):
+        """Test writing any collection of the user changes the ETag of the lists."""
+        writes = [
+            lambda: Transaction.objects.create(user=self.user, amount=20, authorized_date=date(2023, 1, 2)),
+            lambda: PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234),
+            lambda: TransactionUserCategory.objects.create(user=self.user, name='Food').delete(),
+        ]
+        for write in writes:
+            etag = self.client.get(TRANSACTIONS_URL)['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+
+            res = self.client.get(TRANSACTIONS_URL, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(res['ETag'], etag)
+
+    def test_etag_per_user_and_query(self):
+        """Test the ETag differs between users, lists and query strings."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other_client = APIClient()
+        other_client.force_authenticate(other_user)
+
+        etags = {
+            self.client.get(TRANSACTIONS_URL)['ETag'],
+            self.client.get(TRANSACTIONS_URL, {'page_size': 1})['ETag'],
+            self.client.get(CC_MERCHANT_CATEGORIES_URL)['ETag'],
+            other_client.get(TRANSACTIONS_URL)['ETag'],
+        }
+
+        self.assertEqual(len(etags), 4)
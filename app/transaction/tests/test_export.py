@@ -0,0 +1,72 @@
+"""
+Tests for the transaction export API.
+"""
+import csv
+import io
+import json
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from djmoney.money import Money
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant, TransactionUserCategory, PaymentCard
+
+
+EXPORT_URL = reverse('transaction:transaction-export')
+
+
+class TransactionExportApiTests(TestCase):
+    """Test exporting the transaction history."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        merchant = TransactionMerchant.objects.create(user=self.user, name='Cafe, "Le" Bistro')
+        Transaction.objects.create(user=self.user, merchant=merchant, payment_card=card, user_category=food,
+                                   amount=Money('12.50', 'USD'), authorized_date=date(2023, 2, 1))
+        Transaction.objects.create(user=self.user, amount=5, authorized_date=date(2023, 1, 1), details='Cash')
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        Transaction.objects.create(user=other_user, amount=99, authorized_date=date(2023, 1, 1))
+
+    def export(self, **params):
+        with self.assertNumQueries(1):
+            res = self.client.get(EXPORT_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(res.streaming)
+            content = b''.join(res.streaming_content).decode()
+        return res, content
+
+    def test_export_csv(self):
+        """Test the CSV export has the user's transactions, oldest first, with the related names."""
+        res, content = self.export()
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['details'] for row in rows], ['Cash', ''])
+        columns = ('amount', 'amount_currency', 'merchant', 'payment_card', 'user_category')
+        self.assertEqual({key: rows[1][key] for key in columns},
+                         {'amount': '12.50', 'amount_currency': 'USD', 'merchant': 'Cafe, "Le" Bistro',
+                          'payment_card': 'Card', 'user_category': 'Food'})
+
+    def test_export_ndjson_date_range(self):
+        """Test the NDJSON export has one object per line, within the dates."""
+        res, content = self.export(file_format='ndjson', start_date='2023-01-15')
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['authorized_date'], rows[0]['amount']), ('2023-02-01', '12.50'))
+
+    def test_invalid_format(self):
+        """Test an unknown format is rejected."""
+        res = self.client.get(EXPORT_URL, {'file_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,124 @@
+"""
+Tests for the nearby merchants and spend map APIs.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant
+from transaction import geo
+
+
+NEARBY_URL = reverse('transaction:merchant-nearby')
+HEATMAP_URL = reverse('transaction:heatmap-report')
+
+
+class GeoTests(TestCase):
+    """Test the geospatial helpers."""
+
+    def test_haversine(self):
+        """Test the distance between Montreal and Toronto."""
+        self.assertAlmostEqual(geo.haversine_km(45.5017, -73.5673, 43.6532, -79.3832), 504, delta=2)
+
+    def test_bounding_box_contains_circle(self):
+        """Test the points at radius_km north and east of the center are in the box."""
+        min_latitude, max_latitude, min_longitude, max_longitude = geo.bounding_box(45, -73, 10)
+
+        self.assertAlmostEqual(geo.haversine_km(45, -73, max_latitude, -73), 10, places=6)
+        self.assertGreaterEqual(geo.haversine_km(45, -73, 45, max_longitude), 10)
+        self.assertAlmostEqual(45 - min_latitude, max_latitude - 45)
+        self.assertAlmostEqual(-73 - min_longitude, max_longitude + 73)
+
+    def test_bounding_box_pole(self):
+        """Test a box reaching a pole spans every longitude."""
+        self.assertEqual(geo.bounding_box(89.99, 10, 5)[2:], (-180, 180))
+
+
+class GeoApiTests(TestCase):
+    """Test the nearby merchants and spend map APIs."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def _merchant(self, name, latitude, longitude, user=None):
+        """Create a merchant with the coordinates the geocoding worker would set."""
+        merchant = TransactionMerchant.objects.create(user=user or self.user, name=name, location=f'{name} street')
+        TransactionMerchant.objects.filter(id=merchant.id).update(latitude=latitude, longitude=longitude)
+        return merchant
+
+    def test_nearby_merchants(self):
+        """Test the merchants within the radius are returned nearest first, with their distance."""
+        far = self._merchant('Far', 45.52, -73.57)  # about 2 km north
+        near = self._merchant('Near', 45.502, -73.567)
+        self._merchant('Outside', 45.6, -73.57)
+        self._merchant('Not geocoded', None, None)
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        self._merchant('Other', 45.5017, -73.5673, user=other_user)
+
+        res = self.client.get(NEARBY_URL, {'latitude': 45.5017, 'longitude': -73.5673, 'radius_km': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([merchant['id'] for merchant in res.data], [near.id, far.id])
+        self.assertLess(res.data[0]['distance_km'], 0.1)
+        self.assertAlmostEqual(res.data[1]['distance_km'], 2.05, delta=0.1)
+
+    def test_nearby_merchants_antimeridian(self):
+        """Test merchants across the antimeridian are found."""
+        merchant = self._merchant('Fiji', -17.0, -179.99)
+
+        res = self.client.get(NEARBY_URL, {'latitude': -17.0, 'longitude': 179.99, 'radius_km': 5})
+
+        self.assertEqual([merchant['id'] for merchant in res.data], [merchant.id])
+
+    def test_nearby_merchants_invalid_point(self):
+        """Test coordinates out of range are rejected."""
+        res = self.client.get(NEARBY_URL, {'latitude': 91, 'longitude': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_heatmap(self):
+        """Test the expenses are aggregated per cell and currency, split transactions through their parts."""
+        cafe = self._merchant('Cafe', 45.5012, -73.5671)
+        bakery = self._merchant('Bakery', 45.5018, -73.5679)
+        park = self._merchant('Park', 45.5512, -73.5671)
+        Transaction.objects.create(user=self.user, merchant=cafe, amount=10, authorized_date=date(2023, 1, 1))
+        Transaction.objects.create(user=self.user, merchant=bakery, amount=5, authorized_date=date(2023, 1, 2))
+        Transaction.objects.create(user=self.user, merchant=park, amount=7, authorized_date=date(2023, 1, 3))
+        Transaction.objects.create(user=self.user, merchant=park, amount=100, authorized_date=date(2023, 1, 3),
+                                   type=Transaction.TransactionType.INCOME)
+
+        res = self.client.get(HEATMAP_URL, {'cell_size': 0.01})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        cells = [(round(cell['latitude'], 3), round(cell['longitude'], 3), cell['spend'], cell['count'],
+                  cell['merchants']) for cell in res.data]
+        self.assertEqual(cells, [(45.505, -73.565, '15.00', 2, 2), (45.555, -73.565, '7.00', 1, 1)])
+
+    def test_heatmap_bounding_box(self):
+        """Test only the cells of merchants in the bounding box are returned."""
+        cafe = self._merchant('Cafe', 45.5, -73.5)
+        shop = self._merchant('Shop', 48.8, 2.3)
+        for merchant in (cafe, shop):
+            Transaction.objects.create(user=self.user, merchant=merchant, amount=1, authorized_date=date(2023, 1, 1))
+
+        res = self.client.get(HEATMAP_URL, {'min_latitude': 40, 'max_latitude': 50, 'min_longitude': -80,
+                                            'max_longitude': -70})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['spend'], '1.00')
+
+    def test_heatmap_partial_bounding_box(self):
+        """Test a bounding box needs all four bounds."""
+        res = self.client.get(HEATMAP_URL, {'min_latitude': 40})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
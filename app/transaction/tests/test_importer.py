@@ -0,0 +1,145 @@
+"""
+Tests for the bank statement import.
+"""
+import io
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant, PaymentCard, CreditCardMerchantCategory, \
+    MonthlySpendRollup, RecurringSeries
+from transaction import importer
+
+
+IMPORT_URL = reverse('transaction:transaction-import-statement')
+
+GENERIC_CSV = (
+    'Date,Description,Amount\n'
+    '2023-01-05,STARBUCKS #1234,-4.50\n'
+    '2023-01-05,STARBUCKS #1234,-4.50\n'
+    '2023-01-06,Payroll,"1,000.00"\n'
+    '2023-01-07,Grocer,abc\n'
+)
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>USD
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20230110120000<TRNAMT>-12.34<FITID>1<NAME>Corner Store 0042<MEMO>Card purchase
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20230111<TRNAMT>50.00<FITID>2<NAME>Refund
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class StatementParsingTests(TestCase):
+    """Test reading the records of statement files."""
+
+    @patch('transaction.importer.OFX_READ_SIZE', 16)
+    def test_ofx_records(self):
+        """Test OFX transactions are read across blocks, with the currency of the statement."""
+        records = [importer.parse_record(fields, 'CAD') for _, fields in importer.ofx_records(io.StringIO(OFX))]
+
+        self.assertEqual(records, [
+            {'authorized_date': date(2023, 1, 10), 'type': 'Expense', 'amount': Decimal('12.34'),
+             'amount_currency': 'USD', 'merchant_name': 'Corner Store 0042', 'details': 'Card purchase'},
+            {'authorized_date': date(2023, 1, 11), 'type': 'Income', 'amount': Decimal('50.00'),
+             'amount_currency': 'USD', 'merchant_name': 'Refund', 'details': ''},
+        ])
+
+    def test_debit_credit_layout(self):
+        """Test the layout with debit and credit columns is detected from the header."""
+        text = io.StringIO('Date,Description,Debit,Credit\n2023-02-01,Rent,1200.00,\n')
+
+        fields = [fields for _, fields in importer.csv_records(text)]
+
+        record = importer.parse_record(fields[0], 'CAD')
+        self.assertEqual((record['type'], record['amount']), ('Expense', Decimal('1200.00')))
+
+    def test_unknown_layout(self):
+        """Test a CSV file without the columns of a layout is rejected."""
+        with self.assertRaises(importer.StatementError):
+            list(importer.csv_records(io.StringIO('When,What\n2023-01-01,Rent\n')))
+
+
+class StatementImportApiTests(TestCase):
+    """Test the statement import API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        self.starbucks = TransactionMerchant.objects.create(user=self.user, name='Starbucks')
+        CreditCardMerchantCategory.objects.create(user=self.user, credit_card=self.card, merchant=self.starbucks,
+                                                  cash_back=Decimal('10'))
+
+    def upload(self, content, name='statement.csv', **params):
+        return self.client.post(IMPORT_URL, {'file': SimpleUploadedFile(name, content.encode()), **params},
+                                format='multipart')
+
+    def test_import_csv(self):
+        """Test the rows are imported with matched merchants, rewards and rollups, invalid rows being reported."""
+        res = self.upload(GENERIC_CSV, payment_card=self.card.id)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['error_count'], 1)
+        self.assertEqual(res.data['errors'][0]['row'], 5)
+        coffees = Transaction.objects.filter(user=self.user, merchant=self.starbucks)
+        self.assertEqual(coffees.count(), 2)
+        self.assertEqual(coffees[0].cashback_earned, Decimal('0.45'))
+        payroll = Transaction.objects.get(user=self.user, merchant__name='Payroll')
+        self.assertEqual((payroll.type, payroll.amount.amount), ('Income', Decimal('1000.00')))
+        self.assertEqual(MonthlySpendRollup.objects.get(user=self.user).count, 3)
+
+    @patch('transaction.importer.CHUNK_SIZE', 2)
+    def test_import_again_skips_duplicates(self):
+        """Test importing a statement again creates nothing, while repeated rows of one statement are kept."""
+        self.upload(GENERIC_CSV)
+        res = self.upload(GENERIC_CSV + '2023-01-08,Starbucks,-3.00\n')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((res.data['created'], res.data['duplicates']), (1, 3))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(TransactionMerchant.objects.filter(user=self.user).count(), 2)
+
+    def test_import_detects_recurring_charges(self):
+        """Test the recurring charges of the user are detected after an import."""
+        res = self.upload('Date,Description,Amount\n2023-01-03,Spotify,-9.99\n2023-02-03,Spotify,-9.99\n'
+                          '2023-03-03,Spotify,-9.99\n')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        series = RecurringSeries.objects.get(user=self.user)
+        self.assertEqual((series.merchant.name, series.cadence, series.next_date),
+                         ('Spotify', 'monthly', date(2023, 4, 3)))
+
+    def test_import_ofx(self):
+        """Test an OFX statement is detected and imported."""
+        res = self.upload(OFX, name='statement.ofx')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        self.assertTrue(Transaction.objects.filter(user=self.user, amount_currency='USD',
+                                                   merchant__name='Corner Store 0042').exists())
+
+    def test_invalid_statement(self):
+        """Test an unknown layout or another user's payment card is rejected."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other_card = PaymentCard.objects.create(user=other_user, name='Other', card_type='Visa', four_digits=1)
+
+        self.assertEqual(self.upload('When,What\n').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.upload(GENERIC_CSV, layout='unknown').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.upload(GENERIC_CSV, payment_card=other_card.id).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
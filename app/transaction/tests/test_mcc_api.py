@@ -0,0 +1,111 @@
+"""
+Tests for the merchant category code API.
+"""
+import os
+import tempfile
+from io import StringIO
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.mcc import get_index
+from core.models import MerchantCategoryCode, CreditCardMerchantCategory, PaymentCard, TransactionMerchant
+
+
+MCC_URL = reverse('transaction:merchantcategorycode-list')
+MCC_CSV = '''mcc,edited_description,combined_description,usda_description,irs_description,irs_reportable
+0742,Veterinary Services,Veterinary Services,Veterinary Services,Veterinary Services,Yes
+5411,Grocery Stores,Grocery Stores,Grocery Stores,Grocery Stores and Supermarkets,No
+5812,Restaurants,Eating Places and Restaurants,Restaurants,Eating Places and Restaurants,No
+'''
+
+
+def detail_url(code):
+    """Create and return a merchant category code detail URL."""
+    return reverse('transaction:merchantcategorycode-detail', args=[code])
+
+
+class MerchantCategoryCodeApiTests(TestCase):
+    """Test the merchant category code API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.populate(MCC_CSV)
+
+    def populate(self, content):
+        """Load content with the populate_mcc command."""
+        csv_file = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, csv_file.name)
+        with csv_file:
+            csv_file.write(content)
+        call_command('populate_mcc', file=csv_file.name, force=True, stdout=StringIO())
+
+    def test_auth_required(self):
+        """Test auth is required to list the codes."""
+        res = APIClient().get(MCC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_codes(self):
+        """Test listing every code, ordered by code."""
+        res = self.client.get(MCC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([code['mcc'] for code in res.data], [742, 5411, 5812])
+        self.assertEqual(res.data[0]['irs_description'], 'Veterinary Services')
+
+    def test_search(self):
+        """Test every search word must start a description word or the code."""
+        for search, expected in [('groc', [5411]), ('eating rest', [5812]), ('stores vet', []),
+                                 ('07', [742]), ('SERVICES', [742])]:
+            with self.subTest(search=search):
+                res = self.client.get(MCC_URL, {'search': search})
+
+                self.assertEqual([code['mcc'] for code in res.data], expected)
+
+    def test_retrieve_code(self):
+        """Test retrieving a code by number, and a missing one."""
+        res = self.client.get(detail_url(5411))
+        missing = self.client.get(detail_url(1234))
+
+        self.assertEqual(res.data['irs_description'], 'Grocery Stores and Supermarkets')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_etag(self):
+        """Test an unchanged list returns 304 Not Modified, and a reload changes the ETag."""
+        etag = self.client.get(MCC_URL)['ETag']
+
+        res = self.client.get(MCC_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.populate(MCC_CSV.replace('Grocery Stores,Grocery Stores,', 'Groceries,Groceries,'))
+        res = self.client.get(MCC_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual([code['mcc'] for code in self.client.get(MCC_URL, {'search': 'groceries'}).data], [5411])
+
+    def test_served_from_memory(self):
+        """Test the list only checks the version stamp once the index is loaded."""
+        get_index()
+
+        with self.assertNumQueries(2):  # the version, for the ETag and the response
+            self.client.get(MCC_URL)
+
+    def test_credit_card_category_str_from_index(self):
+        """Test the description of a credit card category is read from the index."""
+        card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        merchant = TransactionMerchant.objects.create(user=self.user, name='Market')
+        category = CreditCardMerchantCategory.objects.create(
+            user=self.user, credit_card=card, merchant=merchant, mcc=MerchantCategoryCode.objects.get(mcc=5411))
+        category = CreditCardMerchantCategory.objects.select_related('credit_card', 'merchant').get(id=category.id)
+        get_index()
+
+        with self.assertNumQueries(0):
+            self.assertIn('Grocery Stores and Supermarkets', str(category))
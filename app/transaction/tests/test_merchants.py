@@ -0,0 +1,63 @@
+"""
+Tests for the merchant matching and merging APIs.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant
+
+
+TRANSACTIONS_URL = reverse('transaction:transaction-list')
+MERGE_URL = reverse('transaction:merchant-merge')
+
+
+class MerchantApiTests(TestCase):
+    """Test the APIs resolving and merging merchants."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.starbucks = TransactionMerchant.objects.create(user=self.user, name='Starbucks')
+
+    def test_create_transaction_matches_merchant(self):
+        """Test a merchant name with a store number is resolved to the existing merchant."""
+        payload = {'amount': '4.50', 'authorized_date': '2023-01-01', 'merchant': {'name': 'STARBUCKS #1234'}}
+
+        res = self.client.post(TRANSACTIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['merchant']['id'], self.starbucks.id)
+        self.assertEqual(TransactionMerchant.objects.filter(user=self.user).count(), 1)
+
+    def test_merge_merchants(self):
+        """Test merging moves the transactions of the sources to the target."""
+        duplicates = [TransactionMerchant.objects.create(user=self.user, name=f'Starbucks {i}') for i in range(3)]
+        Transaction.objects.bulk_create([Transaction(user=self.user, merchant=merchant, amount=1,
+                                                     authorized_date=date(2023, 1, 1)) for merchant in duplicates])
+
+        res = self.client.post(MERGE_URL, {'target': self.starbucks.id,
+                                           'sources': [merchant.id for merchant in duplicates]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['transactions'], 3)
+        self.assertEqual(Transaction.objects.filter(merchant=self.starbucks).count(), 3)
+        self.assertEqual(list(TransactionMerchant.objects.filter(user=self.user)), [self.starbucks])
+
+    def test_merge_other_user_merchant(self):
+        """Test merchants of other users cannot be merged."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other = TransactionMerchant.objects.create(user=other_user, name='Starbucks')
+
+        res = self.client.post(MERGE_URL, {'target': self.starbucks.id, 'sources': [other.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(TransactionMerchant.objects.filter(id=other.id).exists())
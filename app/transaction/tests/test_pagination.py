@@ -0,0 +1,67 @@
+"""
+Tests for the keyset pagination of the transaction APIs.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction
+
+
+TRANSACTIONS_URL = reverse('transaction:transaction-list')
+
+
+class TransactionPaginationTests(TestCase):
+    """Test paginating transactions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        # Several transactions per day so that pages split groups of equal dates
+        self.transactions = Transaction.objects.bulk_create(
+            Transaction(user=self.user, amount=i, authorized_date=date(2023, 1, i % 4 + 1)) for i in range(11))
+        self.expected = [t.id for t in sorted(self.transactions, key=lambda t: (t.authorized_date, t.id),
+                                              reverse=True)]
+
+    def test_pages_follow_date_and_id_order(self):
+        """Test following next links returns every transaction once, newest first."""
+        ids, url = [], f'{TRANSACTIONS_URL}?page_size=3'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 3)
+            ids += [transaction['id'] for transaction in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(ids, self.expected)
+
+    def test_previous_link(self):
+        """Test the previous link of the second page returns the first page."""
+        first = self.client.get(f'{TRANSACTIONS_URL}?page_size=4')
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual([t['id'] for t in second.data['results']], self.expected[4:8])
+        self.assertEqual(previous.data['results'], first.data['results'])
+
+    def test_page_size_capped(self):
+        """Test clients cannot request pages larger than the maximum page size."""
+        Transaction.objects.bulk_create(
+            Transaction(user=self.user, amount=1, authorized_date=date(2023, 2, 1)) for _ in range(250))
+
+        res = self.client.get(f'{TRANSACTIONS_URL}?page_size=1000')
+
+        self.assertEqual(len(res.data['results']), 200)
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor returns a 404."""
+        res = self.client.get(f'{TRANSACTIONS_URL}?cursor=invalid')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
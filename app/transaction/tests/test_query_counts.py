@@ -0,0 +1,92 @@
+"""
+Tests bounding the number of queries of the transaction endpoints, to catch N+1 regressions.
+"""
+from datetime import date
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant, TransactionUserCategory, \
+    PaymentCard, CreditCardMerchantCategory
+
+
+TRANSACTIONS_URL = reverse('transaction:transaction-list')
+CC_MERCHANT_CATEGORIES_URL = reverse('transaction:creditcardmerchantcategory-list')
+
+# Queries allowed for a whole response, whatever the number of rows. Lists also read the collection version.
+MAX_LIST_QUERIES = 2
+MAX_DETAIL_QUERIES = 2
+
+
+def detail_url(transaction_id):
+    """Create and return a transaction detail URL."""
+    return reverse('transaction:transaction-detail', args=[transaction_id])
+
+
+class QueryCountTests(TestCase):
+    """Test the number of queries does not grow with the number of rows."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        self.category = TransactionUserCategory.objects.create(user=self.user, name='Food')
+
+    def create_transactions(self, count):
+        """Create count transactions, each with its own merchant and credit card category."""
+        merchants = TransactionMerchant.objects.bulk_create(
+            TransactionMerchant(user=self.user, name=f'Merchant {i}') for i in range(count))
+        categories = CreditCardMerchantCategory.objects.bulk_create(
+            CreditCardMerchantCategory(user=self.user, credit_card=self.card, merchant=merchant)
+            for merchant in merchants)
+        return Transaction.objects.bulk_create(
+            Transaction(user=self.user, merchant=merchant, payment_card=self.card, user_category=self.category,
+                        credit_card_category=category, amount=i, authorized_date=date(2023, 1, 1))
+            for i, (merchant, category) in enumerate(zip(merchants, categories)))
+
+    def assertMaxQueries(self, max_queries, url):
+        """Get the url and assert it succeeded with at most max_queries queries."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), max_queries, '\n'.join(query['sql'] for query in queries))
+        return res
+
+    def test_list_queries_bounded(self):
+        """Test listing 10, 100 and 1,000 transactions runs the same bounded number of queries per page."""
+        created = 0
+        for count in (10, 100, 1000):
+            self.create_transactions(count - created)
+            created = count
+            with self.subTest(rows=count):
+                rows, url = 0, f'{TRANSACTIONS_URL}?page_size=200'
+                while url:
+                    res = self.assertMaxQueries(MAX_LIST_QUERIES, url)
+                    rows += len(res.data['results'])
+                    url = res.data['next']
+                self.assertEqual(rows, count)
+
+    def test_detail_queries_bounded(self):
+        """Test retrieving a transaction with its split parts runs a bounded number of queries."""
+        parent = self.create_transactions(1)[0]
+        Transaction.objects.bulk_create(
+            Transaction(user=self.user, parent=parent, amount=1, authorized_date=date(2023, 1, 1)) for _ in range(20))
+
+        res = self.assertMaxQueries(MAX_DETAIL_QUERIES, detail_url(parent.id))
+
+        self.assertEqual(len(res.data['children']), 20)
+        self.assertEqual(res.data['merchant']['name'], 'Merchant 0')
+
+    def test_cc_merchant_category_list_queries_bounded(self):
+        """Test listing credit card categories runs a bounded number of queries."""
+        self.create_transactions(100)
+
+        self.assertMaxQueries(MAX_LIST_QUERIES, CC_MERCHANT_CATEGORIES_URL)
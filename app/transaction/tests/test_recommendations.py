@@ -0,0 +1,133 @@
+"""
+Tests for the payment card recommendations.
+"""
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import recommendations
+from core.models import TransactionMerchant, PaymentCard, MerchantCategoryCode, CreditCardMerchantCategory
+
+
+RECOMMENDATIONS_URL = reverse('transaction:recommendation')
+
+
+@override_settings(REWARDS_POINT_VALUE_PERCENT=Decimal('0.5'))
+class CardRecommendationTests(TestCase):
+    """Test recommending the best payment card."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.grocery = MerchantCategoryCode.objects.create(mcc=5411, edited_description='Grocery',
+                                                           combined_description='', usda_description='',
+                                                           irs_description='Grocery Stores')
+        self.grocer = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        self.market = TransactionMerchant.objects.create(user=self.user, name='Market')
+        self.cashback = PaymentCard.objects.create(user=self.user, name='Cashback', card_type='Visa', four_digits=1)
+        self.points = PaymentCard.objects.create(user=self.user, name='Points', card_type='Amex', four_digits=2)
+
+    def create_category(self, card, merchant, **params):
+        return CreditCardMerchantCategory.objects.create(user=self.user, credit_card=card, merchant=merchant,
+                                                         mcc=self.grocery, **params)
+
+    def recommend(self, **params):
+        res = self.client.get(RECOMMENDATIONS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [card['payment_card_name'] for card in res.data]
+
+    def test_cards_ranked_by_rate(self):
+        """Test the cards are ranked by cashback plus the value of their points, for a merchant and an MCC."""
+        self.create_category(self.cashback, self.grocer, cash_back=Decimal('2'))
+        self.create_category(self.points, self.grocer, points_multiplier=5)
+        self.create_category(self.cashback, self.market, cash_back=Decimal('3'))
+
+        self.assertEqual(self.recommend(merchant=self.grocer.id), ['Points', 'Cashback'])
+        self.assertEqual(self.recommend(merchant=self.market.id), ['Cashback'])
+        self.assertEqual(self.recommend(mcc=5411), ['Cashback', 'Points'])
+        self.assertEqual(self.recommend(mcc=1234), [])
+
+    def test_served_from_cache(self):
+        """Test a recommendation runs no query once the index is cached."""
+        self.create_category(self.cashback, self.grocer, cash_back=Decimal('2'))
+        recommendations.get_index(self.user.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.recommend(merchant=self.grocer.id), ['Cashback'])
+            self.assertEqual(self.recommend(mcc=5411), ['Cashback'])
+
+    def test_index_refreshed_on_category_change(self):
+        """Test saving and deleting categories updates the cached index."""
+        category = self.create_category(self.cashback, self.grocer, cash_back=Decimal('2'))
+        self.create_category(self.points, self.grocer, points_multiplier=1)
+        self.assertEqual(self.recommend(merchant=self.grocer.id), ['Cashback', 'Points'])
+
+        category.cash_back = 0
+        category.mcc = None
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        self.assertEqual(self.recommend(merchant=self.grocer.id), ['Points', 'Cashback'])
+        self.assertEqual(self.recommend(mcc=5411), ['Points'])
+
+        category.mcc = self.grocery
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        self.assertEqual(self.recommend(mcc=5411), ['Points', 'Cashback'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            category.delete()
+        self.assertEqual(self.recommend(merchant=self.grocer.id), ['Points'])
+        self.assertEqual(recommendations.get_index(self.user.id), recommendations.build_index(self.user.id))
+
+    def test_index_not_refreshed_on_rollback(self):
+        """Test a category change rolled back leaves the cached index as it was."""
+        self.create_category(self.cashback, self.grocer, cash_back=Decimal('2'))
+        index = recommendations.get_index(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.create_category(self.points, self.grocer, points_multiplier=10)
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(recommendations.get_index(self.user.id), index)
+        self.assertEqual(self.recommend(merchant=self.grocer.id), ['Cashback'])
+
+    def test_concurrent_refresh_drops_index(self):
+        """Test a refresh while another one holds the lock drops the index rather than racing it."""
+        category = self.create_category(self.cashback, self.grocer, cash_back=Decimal('2'))
+        recommendations.get_index(self.user.id)
+        cache.add(f'{recommendations.cache_key(self.user.id)}:lock', True)
+
+        recommendations.refresh_category(self.user.id, category.id, category.merchant_id, category.mcc_id)
+
+        self.assertIsNone(cache.get(recommendations.cache_key(self.user.id)))
+
+    def test_other_users_merchant(self):
+        """Test the cards of another user are not recommended."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other_card = PaymentCard.objects.create(user=other_user, name='Other', card_type='Visa', four_digits=3)
+        other_merchant = TransactionMerchant.objects.create(user=other_user, name='Other')
+        CreditCardMerchantCategory.objects.create(user=other_user, credit_card=other_card, merchant=other_merchant)
+
+        self.assertEqual(self.recommend(merchant=other_merchant.id), [])
+
+    def test_merchant_or_mcc_required(self):
+        """Test exactly one of merchant and mcc is required."""
+        for params in ({}, {'merchant': self.grocer.id, 'mcc': 5411}):
+            with self.subTest(params=params):
+                res = self.client.get(RECOMMENDATIONS_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
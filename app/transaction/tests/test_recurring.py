@@ -0,0 +1,53 @@
+"""
+Tests for the upcoming charges API.
+"""
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import TransactionMerchant, RecurringSeries
+
+
+UPCOMING_URL = reverse('transaction:upcoming-charges')
+
+
+class UpcomingChargesApiTests(TestCase):
+    """Test the API listing the charges expected from the recurring series."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def create_series(self, user, name, next_date, cadence=RecurringSeries.Cadence.WEEKLY):
+        merchant = TransactionMerchant.objects.create(user=user, name=name)
+        return RecurringSeries.objects.create(user=user, merchant=merchant, currency='CAD', cadence=cadence,
+                                              amount=10, occurrences=5, first_date=next_date - timedelta(days=35),
+                                              last_date=next_date - timedelta(days=7), next_date=next_date)
+
+    def test_upcoming_charges(self):
+        """Test the expected charges of the user in the next days are listed by date."""
+        today = date.today()
+        weekly = self.create_series(self.user, 'Gym', today + timedelta(days=2))
+        self.create_series(self.user, 'Ended', today - timedelta(days=30))
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        self.create_series(other_user, 'Gym', today + timedelta(days=1))
+
+        res = self.client.get(UPCOMING_URL, {'days': 10})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([charge['date'] for charge in res.data],
+                         [str(today + timedelta(days=2)), str(today + timedelta(days=9))])
+        self.assertEqual({charge['series'] for charge in res.data}, {weekly.id})
+        self.assertEqual(res.data[0]['merchant_name'], 'Gym')
+
+    def test_invalid_days(self):
+        """Test the number of days is bounded."""
+        res = self.client.get(UPCOMING_URL, {'days': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
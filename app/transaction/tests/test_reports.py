@@ -0,0 +1,117 @@
+"""
+Tests for the spending reports API.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from djmoney.money import Money
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant, TransactionUserCategory, PaymentCard, \
+    MerchantCategoryCode, CreditCardMerchantCategory, ExchangeRate
+
+
+REPORTS_URL = reverse('transaction:report')
+
+
+class SpendingReportApiTests(TestCase):
+    """Test the spending reports."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        self.grocer = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        mcc = MerchantCategoryCode.objects.create(mcc=5411, edited_description='Grocery', combined_description='',
+                                                  usda_description='', irs_description='Grocery Stores')
+        CreditCardMerchantCategory.objects.create(user=self.user, credit_card=self.card, merchant=self.grocer,
+                                                  mcc=mcc)
+
+        self.create(10, date(2023, 1, 5), user_category=self.food, merchant=self.grocer, payment_card=self.card)
+        self.create(20, date(2023, 1, 20), user_category=self.food)
+        self.create(1000, date(2023, 1, 31), type=Transaction.TransactionType.INCOME)
+        self.create(5, date(2023, 2, 1), currency='USD', merchant=self.grocer, payment_card=self.card)
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        Transaction.objects.create(user=other_user, amount=99, authorized_date=date(2023, 1, 1))
+
+    def create(self, amount, authorized_date, currency='CAD', **params):
+        return Transaction.objects.create(user=self.user, amount=Money(amount, currency),
+                                          authorized_date=authorized_date, **params)
+
+    def get_report(self, **params):
+        with self.assertNumQueries(2):  # the collection version, for the ETag, and the report
+            res = self.client.get(REPORTS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_report_by_month(self):
+        """Test totals per month are split by currency."""
+        rows = self.get_report(group_by='month')
+
+        self.assertEqual([(row['key'], row['currency']) for row in rows],
+                         [('2023-01-01', 'CAD'), ('2023-02-01', 'USD')])
+        self.assertEqual(Decimal(rows[0]['spend']), Decimal('30.00'))
+        self.assertEqual(Decimal(rows[0]['income']), Decimal('1000.00'))
+        self.assertEqual(rows[0]['count'], 3)
+        self.assertEqual(Decimal(rows[1]['spend']), Decimal('5.00'))
+
+    def test_report_by_user_category(self):
+        """Test totals per user category carry the category name."""
+        rows = self.get_report(group_by='user_category', end_date='2023-01-31')
+
+        food = next(row for row in rows if row['label'] == 'Food')
+        self.assertEqual(Decimal(food['spend']), Decimal('30.00'))
+        self.assertEqual(food['key'], str(self.food.id))
+
+    def test_report_by_mcc_with_date_range(self):
+        """Test totals per MCC within a date range."""
+        rows = self.get_report(group_by='mcc', start_date='2023-01-02', end_date='2023-01-31')
+
+        grocery = next(row for row in rows if row['key'] == '5411')
+        self.assertEqual(grocery['label'], 'Grocery Stores')
+        self.assertEqual(Decimal(grocery['spend']), Decimal('10.00'))
+
+    def test_split_transactions_counted_once(self):
+        """Test a split transaction is counted through its parts only."""
+        parent = self.create(50, date(2023, 3, 1), has_children=True)
+        self.create(30, date(2023, 3, 1), parent=parent)
+        self.create(20, date(2023, 3, 1), parent=parent)
+
+        rows = self.get_report(group_by='month', start_date='2023-03-01')
+
+        self.assertEqual(Decimal(rows[0]['spend']), Decimal('50.00'))
+        self.assertEqual(rows[0]['count'], 2)
+
+    def test_report_converted_to_home_currency(self):
+        """Test totals are converted to the home currency of the user with the rates of each date, in one query."""
+        ExchangeRate.objects.bulk_create([ExchangeRate(date=date(2023, 1, 31), currency='CAD', rate=Decimal('1.5')),
+                                          ExchangeRate(date=date(2023, 1, 31), currency='USD', rate=Decimal('1.2'))])
+        self.create(8, date(2023, 2, 1), currency='GBP')  # no GBP rates
+
+        rows = self.get_report(group_by='month', start_date='2023-02-01', convert='true')
+
+        self.assertEqual([(row['currency'], Decimal(row['spend']), row['count']) for row in rows],
+                         [('CAD', Decimal('6.25'), 1), ('GBP', Decimal('8.00'), 1)])
+
+    def test_invalid_group_by(self):
+        """Test an unknown grouping returns an error."""
+        res = self.client.get(REPORTS_URL, {'group_by': 'colour'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_month_aligned_report_reads_rollups(self):
+        """Test a report over whole months is read from the rollups, and a partial one from transactions."""
+        with self.assertNumQueries(2) as queries:
+            self.client.get(REPORTS_URL, {'group_by': 'month', 'start_date': '2023-01-01', 'end_date': '2023-01-31'})
+        self.assertIn('core_monthlyspendrollup', queries.captured_queries[-1]['sql'])
+
+        with self.assertNumQueries(2) as queries:
+            self.client.get(REPORTS_URL, {'group_by': 'month', 'start_date': '2023-01-02'})
+        self.assertNotIn('core_monthlyspendrollup', queries.captured_queries[-1]['sql'])
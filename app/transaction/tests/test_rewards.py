@@ -0,0 +1,104 @@
+"""
+Tests for the rewards earned with the credit card categories.
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from djmoney.money import Money
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionMerchant, PaymentCard, CreditCardMerchantCategory
+
+
+REWARDS_URL = reverse('transaction:rewards-report')
+BULK_URL = reverse('transaction:transaction-bulk')
+
+
+class RewardsTests(TestCase):
+    """Test computing and reporting the rewards."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        self.grocer = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        self.category = CreditCardMerchantCategory.objects.create(
+            user=self.user, credit_card=self.card, merchant=self.grocer, cash_back=Decimal('1.5'),
+            points_multiplier=3)
+
+    def create(self, amount, authorized_date=date(2023, 1, 5), **params):
+        return Transaction.objects.create(user=self.user, amount=Money(amount, 'CAD'), merchant=self.grocer,
+                                          payment_card=self.card, authorized_date=authorized_date, **params)
+
+    def test_rewards_computed_on_save(self):
+        """Test an expense earns the rewards of its category, rounded to the cent, and an income none."""
+        expense = self.create('10.99')
+        income = self.create('10.99', type=Transaction.TransactionType.INCOME)
+
+        self.assertEqual((expense.cashback_earned, expense.points_earned), (Decimal('0.16'), Decimal('32.97')))
+        self.assertEqual((income.cashback_earned, income.points_earned), (Decimal(0), Decimal(0)))
+
+    def test_update_rewards_matches_save(self):
+        """Test the bulk UPDATE computes the same rewards as save()."""
+        transactions = [self.create(amount) for amount in ('10.99', '0.33', '1234.56', '-20.10')]
+        expected = [(t.cashback_earned, t.points_earned) for t in transactions]
+        Transaction.objects.update(cashback_earned=0, points_earned=0)
+
+        call_command('backfill_rewards', batch_size=3, stdout=StringIO())
+
+        stored = Transaction.objects.order_by('id').values_list('cashback_earned', 'points_earned')
+        self.assertEqual([(Decimal(cashback), Decimal(points)) for cashback, points in stored], expected)
+
+    def test_category_change_updates_rewards(self):
+        """Test changing the rates of a category updates its transactions, and deleting it clears them."""
+        transaction = self.create(100)
+
+        self.category.cash_back = 2
+        self.category.save()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.cashback_earned, Decimal('2.00'))
+
+        self.category.delete()
+        transaction.refresh_from_db()
+        self.assertEqual((transaction.cashback_earned, transaction.points_earned), (Decimal(0), Decimal(0)))
+
+    def test_bulk_create_computes_rewards(self):
+        """Test transactions created in bulk earn their rewards."""
+        payload = [{'payment_card': self.card.id, 'merchant': {'name': 'Grocer'}, 'amount': '200.00',
+                    'authorized_date': '2023-01-05'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        transaction = Transaction.objects.get(id=res.data['created'][0])
+        self.assertEqual((transaction.cashback_earned, transaction.points_earned),
+                         (Decimal('3.00'), Decimal('600.00')))
+
+    def test_rewards_report(self):
+        """Test the rewards are summed per month and card, in one query."""
+        self.create(100, date(2023, 1, 5))
+        self.create(50, date(2023, 1, 25))
+        self.create(10, date(2023, 2, 1))
+        self.create(10, date(2023, 2, 1), type=Transaction.TransactionType.INCOME)
+
+        with self.assertNumQueries(2):  # the collection version, for the ETag, and the report
+            res = self.client.get(REWARDS_URL, {'period': 'month'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['period'], row['payment_card_name'], row['cashback'], row['points'], row['count'])
+                          for row in res.data],
+                         [('2023-01-01', 'Card', '2.25', '450.00', 2), ('2023-02-01', 'Card', '0.15', '30.00', 1)])
+
+    def test_rewards_report_invalid_period(self):
+        """Test an unknown period is rejected."""
+        res = self.client.get(REWARDS_URL, {'period': 'year'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
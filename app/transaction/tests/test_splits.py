@@ -0,0 +1,142 @@
+"""
+Tests for the split transactions API.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from djmoney.money import Money
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, TransactionUserCategory, PaymentCard, MonthlySpendRollup
+
+
+def split_url(transaction_id):
+    """Create and return a transaction split URL."""
+    return reverse('transaction:transaction-split', args=[transaction_id])
+
+
+def tree_url(transaction_id):
+    """Create and return a transaction tree URL."""
+    return reverse('transaction:transaction-tree', args=[transaction_id])
+
+
+def detail_url(transaction_id):
+    """Create and return a transaction detail URL."""
+    return reverse('transaction:transaction-detail', args=[transaction_id])
+
+
+class SplitTransactionApiTests(TestCase):
+    """Test splitting transactions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        self.food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        self.home = TransactionUserCategory.objects.create(user=self.user, name='Home')
+        self.transaction = Transaction.objects.create(user=self.user, payment_card=self.card, user_category=self.food,
+                                                      amount=Money(100, 'CAD'), authorized_date=date(2023, 3, 1))
+
+    def split(self, *parts):
+        return self.client.put(split_url(self.transaction.id), {'parts': list(parts)}, format='json')
+
+    def assertRollupsConsistent(self):
+        """Assert the incrementally maintained rollups match a rebuild."""
+        fields = ['month', 'user_category', 'payment_card', 'currency', 'spend', 'income', 'count']
+        maintained = sorted(MonthlySpendRollup.objects.filter(count__gt=0).values_list(*fields))
+        MonthlySpendRollup.objects.rebuild()
+        self.assertEqual(maintained, sorted(MonthlySpendRollup.objects.values_list(*fields)))
+
+    def test_split_transaction(self):
+        """Test splitting creates the parts with the fields of the transaction."""
+        res = self.split({'amount': '60.00'}, {'amount': '40.00', 'user_category': self.home.id, 'details': 'Lamp'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['has_children'])
+        self.assertEqual(len(res.data['children']), 2)
+        children = self.transaction.children.order_by('id')
+        self.assertEqual([child.user_category for child in children], [self.food, self.home])
+        self.assertEqual({(child.payment_card, child.authorized_date) for child in children},
+                         {(self.card, date(2023, 3, 1))})
+        self.assertEqual(sum(child.amount.amount for child in children), Decimal('100.00'))
+        self.assertRollupsConsistent()
+
+    def test_replace_and_remove_split(self):
+        """Test a new split replaces the parts and their own parts, and deleting the split restores the parent."""
+        self.split({'amount': '60.00'}, {'amount': '40.00'})
+        part = self.transaction.children.first()
+        self.client.put(split_url(part.id), {'parts': [{'amount': '30.00'}, {'amount': '30.00'}]}, format='json')
+
+        res = self.split({'amount': '50.00'}, {'amount': '25.00'}, {'amount': '25.00'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+        self.assertRollupsConsistent()
+
+        res = self.client.delete(split_url(self.transaction.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.data['has_children'])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+        self.assertRollupsConsistent()
+
+    def test_invalid_splits(self):
+        """Test parts must add up to the amount, have its sign, be owned and be more than one."""
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        other_category = TransactionUserCategory.objects.create(user=other_user, name='Other')
+        for parts in ([{'amount': '60.00'}, {'amount': '30.00'}],
+                      [{'amount': '120.00'}, {'amount': '-20.00'}],
+                      [{'amount': '100.00'}],
+                      [{'amount': '60.00'}, {'amount': '40.00', 'user_category': other_category.id}]):
+            with self.subTest(parts=parts):
+                res = self.split(*parts)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.filter(parent=self.transaction).exists())
+
+    def test_split_amount_locked(self):
+        """Test the amount of a split transaction and of its parts cannot be changed directly."""
+        self.split({'amount': '60.00'}, {'amount': '40.00'})
+        part = self.transaction.children.first()
+
+        for transaction in (self.transaction, part):
+            with self.subTest(transaction=transaction):
+                res = self.client.patch(detail_url(transaction.id), {'amount': '10.00'}, format='json')
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.patch(detail_url(part.id), {'details': 'Lunch'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_part_rejected(self):
+        """Test a part cannot be deleted on its own, deleting the parent deletes its parts."""
+        self.split({'amount': '60.00'}, {'amount': '40.00'})
+        part = self.transaction.children.order_by('id').first()
+
+        res = self.client.delete(detail_url(part.id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(split_url(self.transaction.id), res.data['detail'])
+        self.assertEqual(self.transaction.children.count(), 2)
+        self.assertEqual(MonthlySpendRollup.objects.get(count__gt=0).spend, Decimal('100.00'))
+
+        res = self.client.delete(detail_url(self.transaction.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertRollupsConsistent()
+
+    def test_tree(self):
+        """Test the tree of a transaction is read with one query, parents first."""
+        self.split({'amount': '60.00'}, {'amount': '40.00'})
+        part = self.transaction.children.order_by('id').first()
+        self.client.put(split_url(part.id), {'parts': [{'amount': '30.00'}, {'amount': '30.00'}]}, format='json')
+
+        with self.assertNumQueries(2):  # the transaction, then its tree
+            res = self.client.get(tree_url(self.transaction.id))
+
+        self.assertEqual([(node['depth'], node['parent']) for node in res.data],
+                         [(0, None), (1, self.transaction.id), (1, self.transaction.id), (2, part.id), (2, part.id)])
@@ -0,0 +1,124 @@
+"""
+Tests for the delta sync API.
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Transaction, PaymentCard, TransactionUserCategory, Tombstone, CategorizationRule, \
+    Budget
+
+
+SYNC_URL = reverse('transaction:sync')
+
+
+class SyncApiTests(TestCase):
+    """Test syncing the data of a user."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.card = PaymentCard.objects.create(user=self.user, name='Card', card_type='Visa', four_digits=1234)
+        self.food = TransactionUserCategory.objects.create(user=self.user, name='Food')
+        self.transaction = Transaction.objects.create(user=self.user, payment_card=self.card,
+                                                      amount=10, authorized_date=date(2023, 1, 1))
+        other_user = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        PaymentCard.objects.create(user=other_user, name='Other', card_type='Visa', four_digits=1234)
+
+    def sync(self, since=None):
+        res = self.client.get(SYNC_URL, {'since': since} if since else {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_full_sync(self):
+        """Test a sync without watermark returns every object of the user."""
+        data = self.sync()
+
+        self.assertEqual([card['name'] for card in data['payment_cards']], ['Card'])
+        self.assertEqual([category['name'] for category in data['user_categories']], ['Food'])
+        self.assertEqual(data['transactions'][0]['payment_card'], self.card.id)
+        self.assertEqual(data['transactions'][0]['amount_currency'], 'CAD')
+        self.assertEqual(data['deleted'], [])
+
+    def test_delta_sync(self):
+        """Test a sync from a watermark returns the changed and deleted objects, with one query per resource."""
+        since = timezone.now()
+        self.transaction.details = 'Changed'
+        self.transaction.save()
+        food_id = self.food.id
+        self.food.delete()
+
+        with self.assertNumQueries(8):
+            data = self.sync(since.isoformat())
+
+        self.assertEqual([transaction['details'] for transaction in data['transactions']], ['Changed'])
+        self.assertEqual(data['payment_cards'], [])
+        self.assertEqual(data['deleted'], [{'resource': 'user_category', 'object_id': food_id}])
+        self.assertLess(data['watermark'], timezone.now())
+
+    def test_rules_synced(self):
+        """Test the changed and deleted categorization rules are synced."""
+        rule = CategorizationRule.objects.create(user=self.user, user_category=self.food, contains='grocer')
+        deleted = CategorizationRule.objects.create(user=self.user, user_category=self.food, contains='hydro')
+        self.assertEqual(len(self.sync()['categorization_rules']), 2)
+        since = timezone.now()
+        rule.priority = 1
+        rule.save()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        data = self.sync(since.isoformat())
+
+        self.assertEqual([(r['id'], r['priority']) for r in data['categorization_rules']], [(rule.id, 1)])
+        self.assertEqual(data['deleted'], [{'resource': 'categorization_rule', 'object_id': deleted_id}])
+
+    def test_budgets_synced(self):
+        """Test the changed and deleted budgets are synced, without their spend."""
+        budget = Budget.objects.create(user=self.user, user_category=self.food, amount=200)
+        deleted = Budget.objects.create(user=self.user, user_category=self.food, amount=2000, period='year')
+        self.assertEqual([b['amount'] for b in self.sync()['budgets']], ['200.00', '2000.00'])
+        since = timezone.now()
+        budget.amount = 300
+        budget.save()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        data = self.sync(since.isoformat())
+
+        self.assertEqual([(b['id'], b['amount']) for b in data['budgets']], [(budget.id, '300.00')])
+        self.assertNotIn('spent', data['budgets'][0])
+        self.assertEqual(data['deleted'], [{'resource': 'budget', 'object_id': deleted_id}])
+
+    def test_set_based_updates_synced(self):
+        """Test the transactions changed by set-based updates are synced."""
+        since = timezone.now()
+
+        Transaction.objects.filter(pk=self.transaction.pk).update_rewards()
+
+        self.assertEqual(len(self.sync(since.isoformat())['transactions']), 1)
+
+    def test_expired_watermark(self):
+        """Test a watermark older than the tombstones retention asks for a full sync."""
+        res = self.client.get(SYNC_URL, {'since': (timezone.now() - timedelta(days=365)).isoformat()})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_prune_tombstones(self):
+        """Test the expired tombstones are pruned."""
+        self.transaction.delete()
+        Tombstone.objects.create(user=self.user, resource=Tombstone.Resource.MERCHANT, object_id=1)
+        Tombstone.objects.filter(resource=Tombstone.Resource.MERCHANT).update(
+            deleted_at=timezone.now() - timedelta(days=365))
+
+        call_command('prune_tombstones', stdout=StringIO())
+
+        self.assertEqual(list(Tombstone.objects.values_list('resource', flat=True)), ['transaction'])
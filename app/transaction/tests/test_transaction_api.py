@@ -0,0 +1,152 @@
+"""
+Tests for the transaction API.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import fx
+from core.models import Transaction, TransactionMerchant, PaymentCard, CreditCardMerchantCategory, ExchangeRate
+
+
+TRANSACTIONS_URL = reverse('transaction:transaction-list')
+BULK_URL = reverse('transaction:transaction-bulk')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_payment_card(user, name='Card', **params):
+    """Create and return a payment card."""
+    defaults = {'card_type': PaymentCard.CardType.VISA, 'four_digits': 1234}
+    defaults.update(params)
+    return PaymentCard.objects.create(user=user, name=name, **defaults)
+
+
+class PublicTransactionApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call API."""
+        res = self.client.get(TRANSACTIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateTransactionApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_create_transaction_with_new_merchant(self):
+        """Test creating a transaction creates its merchant."""
+        payload = {'amount': '12.50', 'authorized_date': '2023-07-01', 'merchant': {'name': 'Cafe'}}
+        res = self.client.post(TRANSACTIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        transaction = Transaction.objects.get(id=res.data['id'])
+        self.assertEqual(transaction.merchant.name, 'Cafe')
+        self.assertEqual(transaction.merchant.user, self.user)
+
+    def test_create_transaction_in_home_currency(self):
+        """Test a transaction in a foreign currency is also returned in the home currency of the user."""
+        fx._rates.clear()
+        ExchangeRate.objects.bulk_create([ExchangeRate(date=date(2023, 6, 30), currency='CAD', rate=Decimal('1.44')),
+                                          ExchangeRate(date=date(2023, 6, 30), currency='USD', rate=Decimal('1.08'))])
+        payload = {'amount': '30.00', 'amount_currency': 'USD', 'authorized_date': '2023-07-01'}
+
+        res = self.client.post(TRANSACTIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['home_amount'], {'amount': '40.00', 'currency': 'CAD'})
+
+    def test_bulk_create_json(self):
+        """Test bulk creating transactions resolves merchants and credit card categories."""
+        card = create_payment_card(self.user)
+        merchant = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        category = CreditCardMerchantCategory.objects.create(user=self.user, credit_card=card, merchant=merchant)
+        payload = [
+            {'amount': '10.00', 'authorized_date': '2023-07-01', 'payment_card': card.id,
+             'merchant': {'name': 'Grocer'}},
+            {'amount': '20.00', 'authorized_date': '2023-07-02', 'payment_card': card.id,
+             'merchant': {'name': 'Bakery'}},
+            {'amount': '30.00', 'authorized_date': '2023-07-03', 'merchant': {'name': 'Bakery'}},
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 3)
+        self.assertEqual(res.data['errors'], [])
+        transactions = Transaction.objects.filter(user=self.user).order_by('authorized_date')
+        self.assertEqual(transactions[0].credit_card_category, category)
+        self.assertIsNone(transactions[1].credit_card_category)
+        self.assertEqual(transactions[1].merchant, transactions[2].merchant)
+        self.assertEqual(TransactionMerchant.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(transactions[2].amount.amount, Decimal('30.00'))
+
+    def test_bulk_create_reports_row_errors(self):
+        """Test invalid rows are reported without aborting the batch."""
+        other_card = create_payment_card(create_user(email='other@example.com'), name='Other')
+        payload = [
+            {'amount': '10.00', 'authorized_date': '2023-07-01'},
+            {'amount': 'abc', 'authorized_date': '2023-07-01'},
+            {'amount': '10.00', 'authorized_date': '2023-07-01', 'payment_card': other_card.id},
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 1)
+        self.assertEqual([error['row'] for error in res.data['errors']], [1, 2])
+        self.assertIn('amount', res.data['errors'][0]['errors'])
+        self.assertIn('payment_card', res.data['errors'][1]['errors'])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_csv(self):
+        """Test bulk creating transactions from an uploaded CSV file."""
+        content = (
+            'authorized_date,amount,amount_currency,type,merchant_name,details\n'
+            '2023-07-01,5.25,USD,Expense,Bakery,croissant\n'
+            '2023-07-02,1000,CAD,Income,,salary\n'
+        )
+        csv_file = SimpleUploadedFile('statement.csv', content.encode(), content_type='text/csv')
+        res = self.client.post(BULK_URL, {'file': csv_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        transactions = Transaction.objects.filter(user=self.user).order_by('authorized_date')
+        self.assertEqual(transactions[0].merchant.name, 'Bakery')
+        self.assertEqual(str(transactions[0].amount.currency), 'USD')
+        self.assertEqual(transactions[0].authorized_date, date(2023, 7, 1))
+        self.assertIsNone(transactions[1].merchant)
+        self.assertEqual(transactions[1].type, Transaction.TransactionType.INCOME)
+
+    def test_bulk_create_requires_list(self):
+        """Test bulk create rejects a payload that is not a list."""
+        res = self.client.post(BULK_URL, {'amount': '10.00'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_duplicate_cc_merchant_category_error(self):
+        """Test creating a second category for the same credit card and merchant returns an error."""
+        card = create_payment_card(self.user)
+        merchant = TransactionMerchant.objects.create(user=self.user, name='Grocer')
+        CreditCardMerchantCategory.objects.create(user=self.user, credit_card=card, merchant=merchant)
+        payload = {'credit_card': card.id, 'merchant': merchant.id, 'cash_back': '2.00'}
+
+        res = self.client.post(reverse('transaction:creditcardmerchantcategory-list'), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
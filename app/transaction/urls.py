@@ -10,9 +10,20 @@ from transaction import views
 router = DefaultRouter()
 router.register('transactions', views.TransactionViewSet)
 router.register('cc-merchant-categories', views.CreditCardMerchantCategoryViewSet)
+router.register('categorization-rules', views.CategorizationRuleViewSet)
+router.register('budgets', views.BudgetViewSet)
+router.register('merchant-category-codes', views.MerchantCategoryCodeViewSet, basename='merchantcategorycode')
 
 app_name = 'transaction'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('reports/', views.SpendingReportView.as_view(), name='report'),
+    path('reports/rewards/', views.RewardsReportView.as_view(), name='rewards-report'),
+    path('reports/heatmap/', views.SpendHeatmapView.as_view(), name='heatmap-report'),
+    path('recommendations/', views.CardRecommendationView.as_view(), name='recommendation'),
+    path('recurring/upcoming/', views.UpcomingChargesView.as_view(), name='upcoming-charges'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('merchants/merge/', views.MerchantMergeView.as_view(), name='merchant-merge'),
+    path('merchants/nearby/', views.NearbyMerchantsView.as_view(), name='merchant-nearby'),
 ]
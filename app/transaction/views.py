@@ -1,24 +1,91 @@
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+import csv
+import hashlib
+
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import etag
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import viewsets, generics, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Transaction, CreditCardMerchantCategory
-from transaction import serializers
+from core import categorization, merchants, recommendations, recurring
+from core.authentication import CachedTokenAuthentication
+from core.mcc import get_index as get_mcc_index
+from core.models import Transaction, CreditCardMerchantCategory, CollectionVersion, CategorizationRule, \
+    Budget
+from transaction import serializers, bulk, reports, splits, sync, export, importer, geo
 
 # Create your views here.
 
 
+def mcc_etag(request, *args, **kwargs):
+    """Return the ETag of the merchant category codes, which changes only when populate_mcc reloads them."""
+    return get_mcc_index().etag
+
+
+def format_collection_etag(user_id, version, representation):
+    """Return the ETag of a representation of the collections of a user at a version."""
+    return f'"{user_id}-{version}-{hashlib.md5(representation.encode()).hexdigest()[:16]}"'
+
+
+def collection_etag(request, *args, **kwargs):
+    """Return the ETag of a response built from the collections of the user, which any write to them changes.
+
+    Computing it costs one query, so that a 304 Not Modified response runs neither the list query nor the serializer.
+    """
+    version = CollectionVersion.objects.get_version(request.user.id)
+    return format_collection_etag(request.user.id, version,
+                                  f'{request.get_full_path()} {request.accepted_renderer.format}')
+
+
+@method_decorator(etag(mcc_etag), name='list')
+@method_decorator(etag(mcc_etag), name='retrieve')
+class MerchantCategoryCodeViewSet(viewsets.GenericViewSet):
+    """View for the merchant category codes, read only and served from the in-memory index."""
+
+    serializer_class = serializers.MerchantCategoryCodeSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+    lookup_field = 'mcc'
+    lookup_value_regex = r'\d+'
+
+    @extend_schema(parameters=[OpenApiParameter(
+        'search', OpenApiTypes.STR,
+        description='Words matching the start of a description word or of the code, all of them required.',
+    )])
+    def list(self, request):
+        """List the codes, all of them or those matching the search."""
+        return Response(get_mcc_index().search(request.query_params.get('search', '')))
+
+    def retrieve(self, request, mcc=None):
+        """Retrieve a code by its number."""
+        code = get_mcc_index().by_mcc.get(int(mcc))
+        if code is None:
+            raise NotFound()
+        return Response(code)
+
+
+@method_decorator(etag(collection_etag), name='list')
 class CreditCardMerchantCategoryViewSet(viewsets.ModelViewSet):
     """View for manage Credit Card Merchants Categories APIs."""
 
     serializer_class = serializers.CreditCardMerchantCategorySerializer
     queryset = CreditCardMerchantCategory.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    ordering = ('-id',)
 
     def get_queryset(self):
         """Retrieves credit card merchant categories for authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-id').distinct()
+        return self.queryset.filter(user=self.request.user).order_by(*self.ordering)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -32,6 +99,74 @@ class CreditCardMerchantCategoryViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
+class BudgetViewSet(viewsets.ModelViewSet):
+    """View for manage the budgets of the user categories.
+
+    The spend of a budget is read from the monthly rollups, which the transaction writes keep up to date: it costs
+    one subquery over a few rollups, whatever the number of transactions.
+    """
+
+    serializer_class = serializers.BudgetSerializer
+    queryset = Budget.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    ordering = ('user_category_id', 'period', 'currency', 'id')  # the pagination cursors hold these values
+
+    def get_queryset(self):
+        """Retrieves the budgets of the authenticated user, with their spend in the current period."""
+        return self.queryset.filter(user=self.request.user).with_spent(timezone.localdate()).order_by(*self.ordering)
+
+    def _refresh(self, serializer):
+        """Return the saved budget with its spend."""
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    def perform_create(self, serializer):
+        """Create a new budget."""
+        serializer.save(user=self.request.user)
+        self._refresh(serializer)
+
+    def perform_update(self, serializer):
+        """Update a budget."""
+        serializer.save()
+        self._refresh(serializer)
+
+
+class CategorizationRuleViewSet(viewsets.ModelViewSet):
+    """View for manage the rules categorizing new transactions."""
+
+    serializer_class = serializers.CategorizationRuleSerializer
+    queryset = CategorizationRule.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    ordering = ('priority', 'id')  # the order the rules are tried in
+
+    def get_queryset(self):
+        """Retrieves the rules of the authenticated user, in the order they are tried."""
+        return self.queryset.filter(user=self.request.user).order_by(*self.ordering)
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'categorize':
+            return serializers.CategorizeSerializer
+
+        return self.serializer_class
+
+    def perform_create(self, serializer):
+        """Create a new rule."""
+        serializer.save(user=self.request.user)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='categorize')
+    def categorize(self, request):
+        """Categorize the stored transactions with the merchant defaults, the rules and the trained classifier."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = categorization.recategorize(request.user.id, overwrite=serializer.validated_data['overwrite'])
+
+        return Response({'updated': updated})
+
+
+@method_decorator(etag(collection_etag), name='list')
 class TransactionViewSet(viewsets.ModelViewSet):
     """View for manage transaction APIs."""
 
@@ -39,20 +174,272 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
     serializer_class = serializers.TransactionDetailSerializer
     queryset = Transaction.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    ordering = ('-authorized_date', '-id')  # keyset pagination, backed by the transaction_user_date_idx index
 
     def get_queryset(self):
-        """Retrieves transactions for authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-id').distinct()
+        """Retrieves transactions for authenticated user, with the relations serialized by the action."""
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve', 'split'):
+            queryset = queryset.select_related('merchant', 'payment_card', 'user_category', 'credit_card_category')
+        if self.action in ('retrieve', 'split'):
+            queryset = queryset.prefetch_related('children')
+
+        return queryset.order_by(*self.ordering)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
             return serializers.TransactionSerializer
+        elif self.action == 'bulk':
+            return serializers.TransactionBulkRowSerializer
+        elif self.action == 'import_statement':
+            return serializers.StatementImportSerializer
+        elif self.action == 'split':
+            return serializers.TransactionSplitSerializer
+        elif self.action == 'tree':
+            return serializers.TransactionTreeSerializer
 
         return self.serializer_class
 
     def perform_create(self, serializer):
         """Create a new transaction."""
         serializer.save(user=self.request.user)
+
+    def destroy(self, request, *args, **kwargs):
+        """Delete a transaction and its split parts. A part is only deleted through the split of its parent, which
+        keeps the parts adding up to the parent and the rollups counting them."""
+        transaction = self.get_object()
+        if transaction.parent_id:
+            split_url = reverse('transaction:transaction-split', args=[transaction.parent_id])
+            return Response({'detail': f'A split part cannot be deleted on its own, change the split of its parent '
+                                       f'with PUT or DELETE {split_url}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        self.perform_destroy(transaction)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create many transactions at once from a JSON array or an uploaded CSV file."""
+        if 'file' in request.FILES:
+            rows = bulk.rows_from_csv(request.FILES['file'])
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response({'detail': 'Expected a JSON array of transactions or a CSV file.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            created, errors = bulk.bulk_create_transactions(request.user, rows)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'detail': f'Invalid CSV file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {'created': [transaction.id for transaction in created], 'errors': errors},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='import', parser_classes=[MultiPartParser])
+    def import_statement(self, request):
+        """Import the transactions of a bank statement, a CSV or OFX/QFX file, skipping the ones already recorded."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            result = importer.import_statement(request.user, data['file'], layout=data.get('layout'),
+                                               default_currency=data['currency'],
+                                               payment_card_id=data.get('payment_card'))
+        except importer.StatementError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @extend_schema(responses=serializers.TransactionDetailSerializer)
+    @action(methods=['PUT', 'DELETE'], detail=True, url_path='split')
+    def split(self, request, pk=None):
+        """Replace the parts of a transaction split (PUT), or remove the split (DELETE)."""
+        transaction = self.get_object()
+        serializer = self.get_serializer(data=request.data if request.method == 'PUT' else {'parts': []},
+                                         context={'request': request, 'transaction': transaction})
+        serializer.is_valid(raise_exception=True)
+        splits.split_transaction(transaction, serializer.validated_data['parts'])
+
+        transaction = self.get_queryset().get(pk=transaction.pk)
+        return Response(serializers.TransactionDetailSerializer(transaction, context={'request': request}).data)
+
+    @extend_schema(parameters=[serializers.TransactionExportQuerySerializer], responses=OpenApiTypes.BINARY)
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream the transaction history as CSV or newline delimited JSON."""
+        params = serializers.TransactionExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        file_format = params.validated_data.pop('file_format')
+        content_type, stream = export.FORMATS[file_format]
+
+        rows = export.export_rows(request.user, **params.validated_data)
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="transactions.{file_format}"'
+        return response
+
+    @action(methods=['GET'], detail=True, url_path='tree')
+    def tree(self, request, pk=None):
+        """Return a transaction and all its split parts, at any depth."""
+        transaction = self.get_object()
+        nodes = Transaction.objects.tree(transaction)
+
+        return Response(self.get_serializer(nodes, many=True).data)
+
+
+@method_decorator(etag(collection_etag), name='get')
+class SpendingReportView(generics.GenericAPIView):
+    """View for spend and income totals grouped by period, category, merchant, card or MCC."""
+
+    serializer_class = serializers.SpendingReportSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get(self, request):
+        """Return the report rows, one per group and currency."""
+        params = serializers.SpendingReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        convert = params.validated_data.pop('convert')
+        rows = reports.spending_report(request.user, currency=request.user.home_currency if convert else None,
+                                       **params.validated_data)
+
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+@method_decorator(etag(collection_etag), name='get')
+class RewardsReportView(generics.GenericAPIView):
+    """View for the cashback and points earned with each payment card, per period."""
+
+    serializer_class = serializers.RewardsReportSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get(self, request):
+        """Return the report rows, one per period, payment card and currency."""
+        params = serializers.RewardsReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        rows = reports.rewards_report(request.user, **params.validated_data)
+
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+@method_decorator(etag(collection_etag), name='get')
+class SpendHeatmapView(generics.GenericAPIView):
+    """View for the expenses aggregated per cell of a grid over the merchant locations, for a spend map."""
+
+    serializer_class = serializers.SpendHeatmapSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    @extend_schema(parameters=[serializers.SpendHeatmapQuerySerializer])
+    def get(self, request):
+        """Return the cells with expenses, one row per cell and currency."""
+        params = serializers.SpendHeatmapQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        cells = geo.spend_heatmap(request.user, **params.validated_data)
+
+        return Response(self.get_serializer(cells, many=True).data)
+
+
+class NearbyMerchantsView(generics.GenericAPIView):
+    """View for the geocoded merchants of the user around a point, nearest first."""
+
+    serializer_class = serializers.NearbyMerchantSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    @extend_schema(parameters=[serializers.NearbyMerchantQuerySerializer])
+    def get(self, request):
+        """Return the merchants within radius_km of the point."""
+        params = serializers.NearbyMerchantQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        nearby = geo.nearby_merchants(request.user, **params.validated_data)
+
+        return Response(self.get_serializer(nearby, many=True).data)
+
+
+class UpcomingChargesView(generics.GenericAPIView):
+    """View for the charges expected from the recurring series of the user, such as subscriptions."""
+
+    serializer_class = serializers.UpcomingChargeSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    @extend_schema(parameters=[serializers.UpcomingChargeQuerySerializer])
+    def get(self, request):
+        """Return the charges expected in the next days, by date."""
+        params = serializers.UpcomingChargeQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        charges = recurring.upcoming_charges(request.user, **params.validated_data)
+
+        return Response(self.get_serializer(charges, many=True).data)
+
+
+class CardRecommendationView(generics.GenericAPIView):
+    """View for the payment cards earning the most at a merchant or merchant category code, best first."""
+
+    serializer_class = serializers.CardRecommendationSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    @extend_schema(parameters=[serializers.CardRecommendationQuerySerializer])
+    def get(self, request):
+        """Return the ranked cards, from the cached index of the user."""
+        params = serializers.CardRecommendationQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        cards = recommendations.recommend(request.user.id, merchant_id=params.validated_data.get('merchant'),
+                                          mcc=params.validated_data.get('mcc'))
+
+        return Response(self.get_serializer(cards, many=True).data)
+
+
+class SyncView(generics.GenericAPIView):
+    """View for the changes to the data of the user since the watermark of the previous sync."""
+
+    serializer_class = serializers.SyncQuerySerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    @extend_schema(parameters=[serializers.SyncQuerySerializer], responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        """Return the changed objects per resource, the deleted ones and the watermark of the next sync."""
+        params = serializers.SyncQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        return Response(sync.changes(request.user, params.validated_data.get('since')))
+
+
+class MerchantMergeView(generics.GenericAPIView):
+    """View for merging duplicate merchants of the user into one."""
+
+    serializer_class = serializers.MerchantMergeSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def post(self, request):
+        """Move the transactions and credit card categories of the sources to the target, and delete the sources."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target, sources = serializer.validated_data['target'], serializer.validated_data['sources']
+        moved = merchants.merge(request.user, target, sources)
+
+        return Response({
+            'merchant': serializers.TransactionMerchantSerializer(target).data,
+            'merged': sorted(source.id for source in sources),
+            'transactions': moved,
+        })
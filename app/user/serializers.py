@@ -3,6 +3,7 @@ Serializers for the user API View.
 """
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext as _
+from djmoney.settings import CURRENCY_CHOICES
 
 from rest_framework import serializers
 
@@ -10,9 +11,11 @@ from rest_framework import serializers
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
 
+    home_currency = serializers.ChoiceField(choices=CURRENCY_CHOICES, required=False)
+
     class Meta:
         model = get_user_model()
-        fields = ['email', 'password', 'name']
+        fields = ['email', 'password', 'name', 'home_currency']
         extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
 
     def create(self, validated_data):
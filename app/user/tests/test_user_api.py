@@ -118,7 +118,7 @@ class PrivateUserApiTests(TestCase):
         res = self.client.get(ME_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, {'name': self.user.name, 'email': self.user.email})
+        self.assertEqual(res.data, {'name': self.user.name, 'email': self.user.email, 'home_currency': 'CAD'})
 
     def test_post_me_not_allowed(self):
         """Test POST is not allowed for the endpoint."""
@@ -136,3 +136,15 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_home_currency(self):
+        """Test the home currency must be a currency code."""
+        res = self.client.patch(ME_URL, {'home_currency': 'USD'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.home_currency, 'USD')
+
+        res = self.client.patch(ME_URL, {'home_currency': 'XYZ'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)